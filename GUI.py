@@ -1,160 +1,128 @@
-import random
+import getpass
 import itertools
-from tkinter import *
-from tkinter import scrolledtext, messagebox, ttk
-
-class Atom:
-    """Representerar ett grundämne med dess grundläggande egenskaper.
-
-    Attribut:
-        beteckning: Kort beteckning (t.ex. 'H').
-        namn: Fullständigt namn (t.ex. 'Väte').
-        atomnummer: Atomens nummer i periodiska systemet.
-        massa: Atomens relativa atommassa (float).
-        period: Periodnummer i periodiska systemet eller None om okänt.
-        grupp: Gruppnummer i periodiska systemet eller None om okänt.
-    """
-    def __init__(self, beteckning, namn, atomnummer, massa, period, grupp):
-        self.beteckning = beteckning
-        self.namn = namn
-        self.atomnummer = atomnummer
-        self.massa = massa
-        self.period = period
-        self.grupp = grupp
-
-class PeriodiskaSystemet:
-    """Håller och laddar en lista av Atom-objekt från två textfiler.
-
-    Konstruktorn laddar data från filnamn och extra_filnamn och fyller attributet `atomer`.
-    """
-    def __init__(self, filnamn='avikt.txt', extra_filnamn='period_group.txt'):
-        self.atomer = []
-        self.läs_in_data(filnamn, extra_filnamn)
-
-    def läs_in_data(self, filnamn, extra_filnamn):
-        """Läser in atomdata från två filer och skapar Atom-objekt.
-
-        Parametrar:
-            filnamn: Sökväg till huvudfilen med beteckning, namn, atomnummer och massa.
-            extra_filnamn: Sökväg till filen som kan innehålla period och grupp.
-        Funktionen parar ihop rader från båda filer med zip_longest och lägger till varje Atom i self.atomer.
-        """
-        with open(filnamn, 'r', encoding="utf-8") as file1, \
-             open(extra_filnamn, 'r', encoding="utf-8") as file2:
-            for rad1, rad2 in itertools.zip_longest(file1, file2, fillvalue=""):
-                komma_till_pukt = str.maketrans(",", ".")
-                rad1 = rad1.rstrip("\n")
-                rad2 = rad2.rstrip("\n")
-                en_atom = (rad1 + " " + rad2).split()
-                if len(en_atom) > 4:
-                    atom = Atom(
-                        beteckning=en_atom[0],
-                        namn=en_atom[1],
-                        atomnummer=int(en_atom[2]),
-                        massa=float(en_atom[3].translate(komma_till_pukt)),
-                        period=int(en_atom[4]),
-                        grupp=int(en_atom[5])
-                    )
-                else:
-                    atom = Atom(
-                        beteckning=en_atom[0],
-                        namn=en_atom[1],
-                        atomnummer=int(en_atom[2]),
-                        massa=float(en_atom[3].translate(komma_till_pukt)),
-                        period=None,
-                        grupp=None
-                    )
-                self.atomer.append(atom)
-
-    def hitta_atom(self, sokterm):
-        """Söker efter en atom utifrån namn eller beteckning och returnerar Atom-objekt eller None.
-
-        Parametrar:
-            sokterm: Sträng med antingen beteckning eller namn (case-insensitiv).
-        Returnerar:
-            Atom-objekt om träff finns, annars None.
-        """
-        for atom in self.atomer:
-            if atom.beteckning.lower() == sokterm.lower() or atom.namn.lower() == sokterm.lower():
-                return atom
-        return None
+import math
+import os
+import queue
+import statistics
+import threading
+import time
+import uuid
+from tkinter import (Tk, Toplevel, Frame, Label, Canvas, Listbox, StringVar, Misc, END, LEFT, RIGHT, VERTICAL,
+                     W, X, Y, messagebox, ttk)
+from p_uppgift import (skapa_argumentparser, ladda_system, skapa_slump, öppna_framsteg, öppna_inspelning,
+                       starta_mätvärden, skriv_mätvärden)
+from session import Träningssession, Reaktionstider, LÄGEN, RÄTT, FEL, SLUT, OGILTIG, ANTAL_ALTERNATIV
+from repetition import skapa_schema
+import instrumentering
 
 class Träning:
-    """Logik för övningar som använder ett PeriodiskaSystemet och en GUI-instans.
+    """Koppling mellan en Träningssession och GUI:t.
 
-    Objektet håller träningsläge, antal försök, aktuell fråga och referenser till GUI och system.
+    Objektet håller träningsläge och aktuell session och översätter sessionens utfall till
+    meddelanden och anrop på GUI-instansen; själva fråge- och rättningslogiken finns i session.py.
     """
-    def __init__(self, system, gui):
+    def __init__(self, system, gui, slump=None, repetition=False, framsteg=None, användare=None,
+                 positionsfil=None, antal_alternativ=ANTAL_ALTERNATIV, inspelare=None):
         """Initierar träningsobjektet.
 
         Parametrar:
-            system: Instans av PeriodiskaSystemet som innehåller atomdata.
+            system: Instans av PeriodiskaSystemet som innehåller atomdata, eller None tills
+                GUI.ladda_data har läst in den.
             gui: GUI-instans som används för att visa frågor och resultat.
+            slump: Slumpgenerator som skickas till varje Träningssession (None = modulen random).
+            repetition: Om True väljs frågor med ett Repetitionsschema per läge.
+            framsteg: Valfritt Framstegslager där varje besvarad fråga sparas.
+            användare: Namnet som svaren sparas under.
+            positionsfil: Fil där positionslägets framsteg sparas efter varje besvarad fråga och
+                som läses in nästa gång läget startas (None = spara inte).
+            antal_alternativ: Antal svarsalternativ i flervalsfrågorna.
+            inspelare: Valfri inspelning.Inspelare som alla sessioner spelas in med.
         """
         self.system = system
         self.gui = gui
-        self.försök_kvar = 3
-        self.aktuell_lista = None
-        self.rätt_atom = None
-        self.återstående_atomer = None
+        self.slump = slump
+        self.scheman = {} if repetition else None
+        self.framsteg = framsteg
+        self.användare = användare or getpass.getuser()
+        self.körning = uuid.uuid4().hex
+        self.positionsfil = positionsfil
+        self.antal_alternativ = antal_alternativ
+        self.inspelare = inspelare
+        self.träningstyp = None
+        self.session = None
+
+    @property
+    def rätt_atom(self):
+        """Atomen som den aktuella frågan gäller."""
+        return self.session.atom if self.session else None
 
     def starta_träning(self, träningstyp):
         """Startar en träningssession av angiven typ.
 
         Parametrar:
             träningstyp: Sträng som anger läge ('atomlista','atomnummer','beteckning','namn','massa','position').
-        Funktionen initierar interna strukturer beroende på valt läge och visar första frågan eller listan.
+        Funktionen skapar en ny Träningssession för valt läge och visar första frågan eller listan.
         """
         self.träningstyp = träningstyp
         if träningstyp == 'atomlista':
             self.träna_på_alla_atomer()
-        elif träningstyp == 'position':
+            return
+        self.session = self.skapa_session(träningstyp)
+        if träningstyp == 'position':
             self.gui.position_läge()
-            full_atom = [a for a in self.system.atomer if a.period is not None and a.grupp is not None]
-            self.återstående_atomer = full_atom[:]
-            self.ny_fråga()
+            if self.positionsfil is not None and self.session.återställ(self.positionsfil):
+                for atom in self.session.besvarade():
+                    self.gui.uppdatera_tabell(atom)
+        self.ny_fråga()
+
+    def skapa_session(self, läge):
+        """Skapar en Träningssession för läge, med Repetitionsschema, framstegslagring och inspelning om de är påslagna."""
+        schema = None
+        if self.scheman is not None:
+            schema = self.scheman.get(läge)
+            if schema is None:
+                schema = self.scheman[läge] = skapa_schema(self.system, läge, self.slump)
+        lyssnare = self.registrera_svar if self.framsteg is not None else None
+        session = Träningssession(self.system, läge, self.slump, antal_alternativ=self.antal_alternativ,
+                                  schema=schema, lyssnare=lyssnare)
+        if self.inspelare is not None:
+            session = self.inspelare.spela_in(session)
+        return session
+
+    def registrera_svar(self, session, rätt, försök, latens):
+        """Sparar en färdigbesvarad fråga i framstegslagret."""
+        self.framsteg.registrera(self.användare, self.körning, session.atom.atomnummer,
+                                 session.läge, rätt, försök, latens)
+
+    def spara_position(self):
+        """Sparar positionslägets framsteg i positionsfil, eller tar bort filen när tabellen är full."""
+        if self.positionsfil is None or self.session.återstående is None:
+            return
+        if self.session.klar:
+            try:
+                os.remove(self.positionsfil)
+            except FileNotFoundError:
+                pass
         else:
-            self.ny_fråga()
+            self.session.spara(self.positionsfil)
 
     def träna_på_alla_atomer(self):
-        """Genererar och visar en textlista över alla atomer sorterade efter atomnummer.
-
-        Listan skickas till GUI:t via gui.visa_alla_atomer.
-        """
-        atomlist = sorted(self.system.atomer, key=lambda x: x.atomnummer)
-        text = ""
-        for atom in atomlist:
-            text += f"{atom.beteckning} | {atom.namn} | {atom.atomnummer} | {atom.massa} | {atom.period} | {atom.grupp}\n"
-        self.gui.visa_alla_atomer(text)
+        """Visar tabellen över alla atomer (sorterad efter atomnummer) och sökfönstret."""
+        self.gui.visa_alla_atomer()
         self.gui.visa_sökt_atom()
 
     def ny_fråga(self):
-        """Förbereder och visar nästa fråga beroende på aktuellt träningsläge.
+        """Hämtar nästa fråga från sessionen och visar den med passande GUI-metod.
 
-        Funktionen väljer slumpmässigt en Atom eller en lista av alternativ och anropar passande GUI-metod.
+        När positionsläget har gått igenom alla atomer visas i stället gui.tabell_ifylld.
         """
-        self.försök_kvar = 3
-        if self.träningstyp == 'position':
-            if not self.återstående_atomer:
-                self.gui.tabell_ifylld()
-                return
-            self.rätt_atom = random.choice(self.återstående_atomer)
-            self.gui.visa_position_fråga(f"Vilken period och grupp tillhör {self.rätt_atom.namn} ({self.rätt_atom.beteckning})")
+        fråga = self.session.nästa_fråga()
+        if fråga is None:
+            self.gui.tabell_ifylld()
+        elif self.träningstyp == 'position':
+            self.gui.visa_position_fråga(fråga.text)
         else:
-            self.aktuell_lista = random.sample(self.system.atomer, 3)
-            self.rätt_atom = random.choice(self.aktuell_lista)
-            if self.träningstyp == 'atomnummer':
-                self.gui.visa_fråga(f"Vilket atomnummer har {self.rätt_atom.namn} ({self.rätt_atom.beteckning})",
-                                       [str(atom.atomnummer) for atom in self.aktuell_lista])
-            elif self.träningstyp == 'beteckning':
-                self.gui.visa_fråga(f"Vilken beteckning har {self.rätt_atom.namn}",
-                                       [atom.beteckning for atom in self.aktuell_lista])
-            elif self.träningstyp == 'namn':
-                self.gui.visa_fråga(f"Vilket namn har grundämnet med beteckningen ({self.rätt_atom.beteckning})",
-                                       [atom.namn for atom in self.aktuell_lista])
-            elif self.träningstyp == 'massa':
-                self.gui.visa_fråga(f"Vilken atommassa har {self.rätt_atom.namn} ({self.rätt_atom.beteckning})",
-                                       [str(atom.massa) for atom in self.aktuell_lista])
+            self.gui.visa_fråga(fråga.text, fråga.alternativ)
 
     def checka_svar(self, val):
         """Kontrollerar svaret från användaren för icke-position-lägen och hanterar poäng/fel.
@@ -165,29 +133,17 @@ class Träning:
         """
         if self.träningstyp == 'position':
             return self.checka_position_svar(val)
-        else:
-            rätt_svar = None
-            if self.träningstyp == 'atomnummer':
-                rätt_svar = str(self.rätt_atom.atomnummer)
-            elif self.träningstyp == 'beteckning':
-                rätt_svar = self.rätt_atom.beteckning
-            elif self.träningstyp == 'namn':
-                rätt_svar = self.rätt_atom.namn
-            elif self.träningstyp == 'massa':
-                rätt_svar = str(self.rätt_atom.massa)
-
-            if val == rätt_svar:
-                messagebox.showinfo("Rätt!", "Rätt Svar")
-                self.ny_fråga()
-                return True
-            else:
-                self.försök_kvar -= 1
-                if self.försök_kvar > 0:
-                    messagebox.showerror("Fel", f"Fel Svar. Försök kvar: {self.försök_kvar}")
-                else:
-                    messagebox.showerror("Fel", f"Inga fler försök. Rätt svar är {rätt_svar}")
-                    self.gui.fråga_om_fortsätt()
-                return False
+        resultat = self.session.svara(val)
+        if resultat.utfall == RÄTT:
+            messagebox.showinfo("Rätt!", "Rätt Svar")
+            self.ny_fråga()
+            return True
+        if resultat.utfall == FEL:
+            messagebox.showerror("Fel", f"Fel Svar. Försök kvar: {resultat.försök_kvar}")
+        elif resultat.utfall == SLUT:
+            messagebox.showerror("Fel", f"Inga fler försök. Rätt svar är {resultat.rätt_svar}")
+            self.gui.fråga_om_fortsätt()
+        return False
 
     def checka_position_svar(self, svar):
         """Kontrollerar användarens svar för position-frågor (period, grupp) och uppdaterar tabellen.
@@ -196,46 +152,336 @@ class Träning:
             svar: Sträng i formatet 'period,grupp' (t.ex. '2,8').
         Returnerar True om korrekt, False annars; visar lämpliga meddelanden vid felformat eller slut på försök.
         """
-        try:
-            period, grupp = map(int, svar.split(','))
-            if period == self.rätt_atom.period and grupp == self.rätt_atom.grupp:
-                messagebox.showinfo("Rätt!", "Rätt Svar")
-                self.återstående_atomer.remove(self.rätt_atom)
-                self.gui.uppdatera_tabell(self.rätt_atom)
-                self.ny_fråga()
-                return True
-            else:
-                self.försök_kvar -= 1
-                if self.försök_kvar > 0:
-                    messagebox.showerror("Fel", f"Fel Svar. Försök kvar: {self.försök_kvar}")
-                else:
-                    messagebox.showerror("Fel", f"Inga fler försök. Rätt svar är Period: {self.rätt_atom.period}, Grupp: {self.rätt_atom.grupp}")
-                    self.gui.uppdatera_tabell(self.rätt_atom)
-                    self.återstående_atomer.remove(self.rätt_atom)
-                    self.ny_fråga()
-                return False
-        except Exception:
+        resultat = self.session.svara(svar)
+        if resultat.utfall == OGILTIG:
             messagebox.showerror("Ogiltig", "Ange period och grupp som siffror, separerade med kommatecken (t.ex. 1,1)")
             return False
+        if resultat.utfall == RÄTT:
+            self.spara_position()
+            messagebox.showinfo("Rätt!", "Rätt Svar")
+            self.gui.uppdatera_tabell(self.rätt_atom)
+            self.ny_fråga()
+            return True
+        if resultat.utfall == FEL:
+            messagebox.showerror("Fel", f"Fel Svar. Försök kvar: {resultat.försök_kvar}")
+        else:
+            period, grupp = resultat.rätt_svar
+            self.spara_position()
+            messagebox.showerror("Fel", f"Inga fler försök. Rätt svar är Period: {period}, Grupp: {grupp}")
+            self.gui.uppdatera_tabell(self.rätt_atom)
+            self.ny_fråga()
+        return False
+
+class Snabbträning:
+    """Tidsbegränsad snabbträning: så många flervalsfrågor som möjligt innan tiden tar slut.
+
+    Nedräkningen drivs av rot.after och återkopplingen visas i en etikett under frågan i
+    stället för i dialogrutor, så händelseloopen blockeras aldrig. Reaktionstiden för varje
+    svar mäts med time.perf_counter_ns från att frågan (eller förra återkopplingen) visades.
+    När tiden är slut visas antal svar per minut och median (p50) och p95 av reaktionstiden.
+    Alternativen kan också väljas med sifferknapparna och Escape avbryter.
+    """
+    def __init__(self, gui, läge, sekunder):
+        """Förbereder en omgång; den startar med starta().
+
+        Parametrar:
+            gui: GUI-instans vars fönster och Träning används.
+            läge: Flervalsläge ur LÄGEN (inte 'position').
+            sekunder: Omgångens längd.
+        """
+        self.gui = gui
+        self.rot = gui.rot
+        self.läge = läge
+        self.sekunder = sekunder
+        self.session = gui.träning.skapa_session(läge)
+        self.tider = Reaktionstider()
+        self.start_ns = 0
+        self.slut_ns = 0
+        self.visad_ns = 0
+        self.nedräkning = None
+        self.tangentbindning = None
+        self.aktiv = False
+        self.tid_text = StringVar(self.rot)
+        self.fråga_text = StringVar(self.rot)
+        self.återkoppling_text = StringVar(self.rot)
+        self.alternativ_text = []
+        self.återkoppling = None
+
+    def starta(self):
+        """Visar frågevyn, startar nedräkningen och ställer första frågan."""
+        gui = self.gui
+        gui.rensa_frame()
+        frame = gui.nuvarande_frame
+        Label(frame, textvariable=self.tid_text, font=("Century Gothic", 14)).pack(pady=5)
+        Label(frame, textvariable=self.fråga_text, font=("Century Gothic", 12), wraplength=400).pack(pady=10)
+        for _ in range(self.session.antal_alternativ):
+            text = StringVar(self.rot)
+            ttk.Button(frame, textvariable=text, command=lambda t=text: self.svara(t.get())).pack(pady=3)
+            self.alternativ_text.append(text)
+        self.återkoppling = Label(frame, textvariable=self.återkoppling_text, font=("Century Gothic", 11))
+        self.återkoppling.pack(pady=5)
+        ttk.Button(frame, text="Avsluta", command=gui.visa_huvudmeny).pack(pady=10)
+        self.tangentbindning = self.rot.bind('<Key>', self.tangent)
+        self.aktiv = True
+        self.start_ns = time.perf_counter_ns()
+        self.slut_ns = self.start_ns + self.sekunder * 1_000_000_000
+        self.ny_fråga()
+        self.ticka()
+
+    def ticka(self):
+        """Uppdaterar nedräkningen och schemalägger nästa uppdatering vid nästa hela sekund,
+        räknat från sluttiden så att nedräkningen inte glider; avslutar när tiden är slut."""
+        kvar_ns = self.slut_ns - time.perf_counter_ns()
+        if kvar_ns <= 0:
+            self.nedräkning = None
+            self.avsluta()
+            return
+        self.tid_text.set(f"Tid kvar: {math.ceil(kvar_ns / 1e9)} s")
+        self.nedräkning = self.rot.after((kvar_ns - 1) % 1_000_000_000 // 1_000_000 + 1, self.ticka)
+
+    def ny_fråga(self):
+        """Ställer nästa fråga och startar tidtagningen för den."""
+        fråga = self.session.nästa_fråga()
+        self.fråga_text.set(fråga.text)
+        for text, alternativ in zip(self.alternativ_text, fråga.alternativ):
+            text.set(alternativ)
+        self.visad_ns = time.perf_counter_ns()
+
+    def tangent(self, händelse):
+        """Sifferknapparna 1-N väljer motsvarande alternativ och Escape avbryter omgången."""
+        if händelse.keysym == 'Escape':
+            self.gui.visa_huvudmeny()
+        elif händelse.char and händelse.char in "123456789"[:len(self.alternativ_text)]:
+            self.svara(self.alternativ_text[int(händelse.char) - 1].get())
+
+    def svara(self, val):
+        """Rättar ett svar, registrerar reaktionstiden och visar återkopplingen i fönstret."""
+        if not self.aktiv:
+            return
+        nu = time.perf_counter_ns()
+        resultat = self.session.svara(val)
+        if resultat.utfall == OGILTIG:
+            return
+        self.tider.registrera(nu - self.visad_ns, resultat.utfall == RÄTT)
+        if resultat.utfall == RÄTT:
+            self.återkoppling.configure(foreground='dark green')
+            self.återkoppling_text.set(f"Rätt! {val}")
+            self.ny_fråga()
+        elif resultat.utfall == FEL:
+            self.återkoppling.configure(foreground='red')
+            self.återkoppling_text.set(f"Fel. Försök kvar: {resultat.försök_kvar}")
+            self.visad_ns = time.perf_counter_ns()
+        else:
+            self.återkoppling.configure(foreground='red')
+            self.återkoppling_text.set(f"Fel. Rätt svar var {resultat.rätt_svar}")
+            self.ny_fråga()
+
+    def avbryt(self):
+        """Stoppar nedräkningen och slutar ta emot svar, utan att visa någon sammanfattning."""
+        self.aktiv = False
+        if self.nedräkning is not None:
+            self.rot.after_cancel(self.nedräkning)
+            self.nedräkning = None
+        if self.tangentbindning is not None:
+            self.rot.unbind('<Key>', self.tangentbindning)
+            self.tangentbindning = None
+
+    def avsluta(self):
+        """Avslutar omgången när tiden är slut och visar sammanfattningen."""
+        self.avbryt()
+        sammanfattning = self.tider.sammanfattning(self.slut_ns - self.start_ns)
+        gui = self.gui
+        gui.rensa_frame()
+        frame = gui.nuvarande_frame
+        Label(frame, text="Tiden är slut!", font=("Century Gothic", 14)).pack(pady=10)
+        Label(frame, text=f"{sammanfattning.antal} svar på {self.sekunder} s, varav {sammanfattning.rätt} rätt\n"
+                          f"{sammanfattning.per_minut:.1f} svar per minut\n"
+                          f"Reaktionstid: median {sammanfattning.p50_ms:.0f} ms, "
+                          f"p95 {sammanfattning.p95_ms:.0f} ms").pack(pady=5)
+        ttk.Button(frame, text="Kör igen", command=lambda: gui.starta_snabbträning(self.läge, self.sekunder)).pack(pady=5)
+        ttk.Button(frame, text="Tillbaka till meny", command=gui.visa_huvudmeny).pack(pady=10)
+        return sammanfattning
+
+class Atomtabell:
+    """Virtualiserad tabell över alla atomer i en ttk.Treeview, med sortering och filter.
+
+    Treeview-widgeten har bara så många rader som syns (synliga_rader); när man rullar
+    skrivs nya värden in i samma rader. Sorteringsordningen för varje kolumn räknas ut en
+    gång och sparas. Filtret söker i beteckning, namn och atomnummer och snävar in den
+    aktuella träfflistan när man skriver vidare på samma text.
+    """
+    KOLUMNER = ('beteckning', 'namn', 'atomnummer', 'massa', 'period', 'grupp')
+    RUBRIKER = ("Beteckning", "Namn", "Atomnummer", "Massa", "Period", "Grupp")
+
+    def __init__(self, master, system, synliga_rader=20):
+        """Skapar tabellen som en frame med filterfält, Treeview och scrollbar.
+
+        Parametrar:
+            master: Förälder till tabellens frame.
+            system: PeriodiskaSystemet vars kolumner visas.
+            synliga_rader: Antal rader som Treeview-widgeten har och visar åt gången.
+        """
+        self.system = system
+        self.synliga_rader = synliga_rader
+        self.sorteringar = {}
+        self.sortering = ('atomnummer', False)
+        self.filtertext = ""
+        kolumner = [system.kolumn(k) for k in ('beteckning', 'namn', 'atomnummer')]
+        self.söktexter = [f"{b}\0{n}\0{a}".casefold() for b, n, a in zip(*kolumner)]
+        self.sätt_rader(self.ordning(*self.sortering))
+        self.start = 0
+
+        self.frame = Frame(master)
+        filter_rad = Frame(self.frame)
+        filter_rad.pack(fill=X, pady=5)
+        Label(filter_rad, text="Filter:").pack(side=LEFT)
+        self.filter = StringVar(master)
+        self.filter.trace_add('write', lambda *_: self.filtrera(self.filter.get()))
+        ttk.Entry(filter_rad, textvariable=self.filter).pack(side=LEFT, fill=X, expand=True)
+
+        self.träd = ttk.Treeview(self.frame, columns=self.KOLUMNER, show='headings', height=synliga_rader)
+        for kolumn, rubrik in zip(self.KOLUMNER, self.RUBRIKER):
+            self.träd.heading(kolumn, text=rubrik, command=lambda k=kolumn: self.sortera(k))
+            self.träd.column(kolumn, width=90, anchor=W)
+        self.rad_id = [self.träd.insert('', END, values=()) for _ in range(synliga_rader)]
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=VERTICAL, command=self.rulla)
+        self.träd.pack(side=LEFT)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        for händelse in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.träd.bind(händelse, self.mushjul)
+        self.visa()
+
+    def ordning(self, kolumn, omvänd):
+        """Returnerar radindex sorterade efter kolumn; räknas ut en gång per kolumn och sparas."""
+        ordning = self.sorteringar.get(kolumn)
+        if ordning is None:
+            värden = self.system.kolumn(kolumn)
+            if kolumn in ('period', 'grupp'):
+                nyckel = lambda i: (värden[i] == 0, värden[i])
+            elif kolumn in ('beteckning', 'namn'):
+                nyckel = lambda i: värden[i].casefold()
+            else:
+                nyckel = värden.__getitem__
+            ordning = self.sorteringar[kolumn] = sorted(range(len(värden)), key=nyckel)
+        return reversed(ordning) if omvänd else ordning
+
+    def sortera(self, kolumn):
+        """Sorterar efter kolumn; ett nytt klick på samma rubrik vänder ordningen."""
+        aktuell, omvänd = self.sortering
+        self.sortering = (kolumn, not omvänd if kolumn == aktuell else False)
+        träffar = self.plats
+        self.sätt_rader([i for i in self.ordning(*self.sortering) if i in träffar])
+        self.gå_till(0)
+
+    def filtrera(self, text):
+        """Visar bara rader vars beteckning, namn eller atomnummer innehåller text."""
+        text = text.strip().casefold()
+        kandidater = self.rader if text.startswith(self.filtertext) else self.ordning(*self.sortering)
+        söktexter = self.söktexter
+        self.sätt_rader([i for i in kandidater if text in söktexter[i]] if text else kandidater)
+        self.filtertext = text
+        self.gå_till(0)
+
+    def sätt_rader(self, rader):
+        """Byter de visade raderna och bygger plats, som mappar radindex till plats i rader."""
+        self.rader = list(rader)
+        self.plats = {i: position for position, i in enumerate(self.rader)}
+
+    def gå_till(self, start):
+        """Rullar så att rad start (i den sorterade och filtrerade listan) står överst."""
+        self.start = max(0, min(start, len(self.rader) - self.synliga_rader))
+        self.visa()
+
+    def rulla(self, åtgärd, mängd, enhet=None):
+        """Kommando för scrollbaren: 'moveto' med andel eller 'scroll' med antal rader/sidor."""
+        if åtgärd == 'moveto':
+            self.gå_till(int(float(mängd) * len(self.rader)))
+        else:
+            steg = int(mängd) * (self.synliga_rader if enhet == 'pages' else 1)
+            self.gå_till(self.start + steg)
+
+    def mushjul(self, händelse):
+        """Rullar tre rader per hjulsteg (Button-4/5 på X11, delta på Windows och macOS)."""
+        if getattr(händelse, 'num', None) == 4 or getattr(händelse, 'delta', 0) > 0:
+            self.gå_till(self.start - 3)
+        else:
+            self.gå_till(self.start + 3)
+        return "break"
+
+    def visa(self):
+        """Skriver in värdena för de synliga raderna i Treeview-raderna och uppdaterar scrollbaren."""
+        kolumner = [self.system.kolumn(k) for k in self.KOLUMNER]
+        synliga = self.rader[self.start:self.start + self.synliga_rader]
+        for rad_id, i in itertools.zip_longest(self.rad_id, synliga):
+            if i is None:
+                self.träd.item(rad_id, values=())
+            else:
+                värden = [kolumn[i] for kolumn in kolumner]
+                värden[4] = värden[4] or None
+                värden[5] = värden[5] or None
+                self.träd.item(rad_id, values=värden)
+        totalt = max(len(self.rader), 1)
+        self.scrollbar.set(self.start / totalt, min(1.0, (self.start + self.synliga_rader) / totalt))
+
+    def visa_atom(self, atom):
+        """Rullar till atomen och markerar den, om den finns bland de filtrerade raderna."""
+        position = self.plats.get(atom.index)
+        if position is None:
+            self.filter.set("")
+            position = self.plats[atom.index]
+        self.gå_till(position)
+        self.träd.selection_set(self.rad_id[position - self.start])
+
+# Hur länge sökfönstret väntar efter en tangenttryckning innan förslagen uppdateras.
+SÖK_FÖRDRÖJNING_MS = 120
+
+# Standardnamn på filen med positionslägets sparade framsteg, som sparas bredvid cachefilen.
+POSITIONSFIL = 'position_sparad.json'
+
+# Hur ofta (ms) huvudtråden tittar efter datan från inläsningstråden.
+INLÄSNING_INTERVALL_MS = 15
+
+# Standardläge och standardlängd (sekunder) för snabbträningen.
+SNABBLÄGE = 'beteckning'
+SNABBTID_S = 60
+
+# Storlek i pixlar på en cell i den periodiska tabellen.
+CELL_BREDD = 38
+CELL_HÖJD = 30
+
 
 class GUI:
     """Grafiskt gränssnitt för att interagera med Träning-objektet och visa periodiska systemet.
 
     GUI-exponering sker via metoder som visar frågor, listor och uppdaterar tabellen.
     """
-    def __init__(self, rot, träning):
+    def __init__(self, rot, träning, snabbläge=SNABBLÄGE, snabbtid=SNABBTID_S):
         """Initierar GUI-komponenter och visar huvudmenyn.
 
         Parametrar:
             rot: Tk-root-fönstret.
             träning: Träning-instans som GUI:t kommer att styra.
+            snabbläge: Flervalsläge som snabbträningen frågar i.
+            snabbtid: Snabbträningens längd i sekunder.
         """
         self.rot = rot
         self.träning = träning
+        self.snabbläge = snabbläge
+        self.snabbtid = snabbtid
+        self.snabbträning = None
         self.nuvarande_frame = None
         self.periodiska_systemet_frame = None
         self.periodiska_systemet_labels = None
         self.fråga_frame = None
+        self.flerval_frame = None
+        self.atomtabell = None
+        self.menyknappar = []
+        self.status_text = StringVar(rot, "" if träning.system is not None else "Läser in grundämnen...")
+        self.flerval_knappar = []
+        self.antal_synliga_knappar = 0
+        self.fråga_text = StringVar(rot)
+        self.alternativ_text = []
+        self.position_svar = StringVar(rot)
         self.visa_huvudmeny()
 
     def rensa_frame(self):
@@ -246,14 +492,28 @@ class GUI:
         self.nuvarande_frame.pack(pady=20)
 
     def rensa_fråga_frame(self):
-        """Tar bort det specifika fråga-frame om det finns, så nytt fråga-frame kan skapas."""
+        """Döljer positionsfrågans frame om den visas; widgetarna finns kvar och återanvänds."""
         if self.fråga_frame:
-            self.fråga_frame.destroy()
-        self.fråga_frame = None
+            self.fråga_frame.pack_forget()
+
+    def visa_i_nuvarande_frame(self, widget, **pack_argument):
+        """Packar en bestående widget (barn till rot) i nuvarande frame om den inte redan visas.
+
+        Returnerar True om widgeten redan visades, så att anroparen bara behöver byta texter.
+        """
+        if widget.winfo_manager():
+            return True
+        widget.pack(in_=self.nuvarande_frame, **pack_argument)
+        # Canvas.lift flyttar canvas-objekt, så fönstrets stapelordning höjs via Misc.
+        Misc.tkraise(widget, self.nuvarande_frame)
+        return False
 
     def visa_huvudmeny(self):
         """Visar huvudmenyn med val för olika träningslägen och återställer periodiska systemets vy."""
         self.rot.title("Periodiska Systemet Träning")
+        if self.snabbträning is not None:
+            self.snabbträning.avbryt()
+            self.snabbträning = None
         self.rensa_frame()
         self.återställ_periodiska_systemet()
         Label(self.nuvarande_frame, text="Välj träningsläge:", font=("Century Gothic", 14)).pack(pady=10)
@@ -265,18 +525,66 @@ class GUI:
             ("4. Träna på atomnamn", 'namn'),
             ("5. Träna på atommassor", 'massa'),
             ("6. Träna på atompositioner", 'position'),
-            ("7. Avsluta", 'lämna')
+            (f"7. Snabbträning ({self.snabbtid} s)", 'snabb'),
+            ("8. Avsluta", 'lämna')
         ]
 
+        self.menyknappar = []
         for text, läge in knappar:
-            ttk.Button(self.nuvarande_frame, text=text, command=lambda m=läge: self.välj_läge(m)).pack(pady=5)
+            knapp = ttk.Button(self.nuvarande_frame, text=text, command=lambda m=läge: self.välj_läge(m))
+            if läge != 'lämna' and self.träning.system is None:
+                knapp.configure(state='disabled')
+            knapp.pack(pady=5)
+            self.menyknappar.append(knapp)
+        Label(self.nuvarande_frame, textvariable=self.status_text).pack(pady=5)
+
+    def ladda_data(self, ladda, klar=None):
+        """Läser in datan på en arbetstråd medan fönstret och huvudmenyn redan visas.
+
+        ladda() körs på arbetstråden och ska returnera ett PeriodiskaSystemet. Resultatet
+        lämnas över via en trådsäker kö som huvudtråden tittar i med rot.after, så alla
+        Tk-anrop görs på huvudtråden. När datan kommit sätts träning.system, menyknapparna
+        aktiveras och klar() anropas om den angetts.
+        """
+        kö = queue.SimpleQueue()
+
+        def arbeta():
+            try:
+                kö.put((True, ladda()))
+            except Exception as fel:
+                kö.put((False, fel))
+
+        threading.Thread(target=arbeta, name="inläsning", daemon=True).start()
+        self.rot.after(INLÄSNING_INTERVALL_MS, self._ta_emot_data, kö, klar)
+
+    def _ta_emot_data(self, kö, klar):
+        try:
+            lyckades, resultat = kö.get_nowait()
+        except queue.Empty:
+            self.rot.after(INLÄSNING_INTERVALL_MS, self._ta_emot_data, kö, klar)
+            return
+        if not lyckades:
+            self.status_text.set("Kunde inte läsa in grundämnena.")
+            messagebox.showerror("Fel", f"Kunde inte läsa in grundämnena: {resultat}")
+            return
+        self.träning.system = resultat
+        self.status_text.set("")
+        for knapp in self.menyknappar:
+            if knapp.winfo_exists():
+                knapp.configure(state='normal')
+        if klar is not None:
+            klar()
 
     def återställ_periodiska_systemet(self):
-        """Tar bort eventuell befintlig periodisk system-tabell från GUI:t och återställer referenser."""
+        """Tömmer den periodiska tabellen och döljer den; själva tabellen finns kvar och återanvänds."""
+        if self.periodiska_systemet_frame:
+            self.töm_periodiska_systemet()
+            self.periodiska_systemet_frame.pack_forget()
+
+    def töm_periodiska_systemet(self):
+        """Tar bort alla ifyllda beteckningar ur tabellen med en enda canvas-operation."""
         if self.periodiska_systemet_frame:
-            self.periodiska_systemet_frame.destroy()
-            self.periodiska_systemet_frame = None
-            self.periodiska_systemet_labels = None
+            self.periodiska_systemet_frame.itemconfigure('cell', text="")
 
     def välj_läge(self, läge):
         """Anropas när användaren väljer ett menyalternativ; antingen avslutas programmet eller startar träning.
@@ -285,37 +593,94 @@ class GUI:
         """
         if läge == 'lämna':
             self.rot.quit()
+        elif self.träning.system is None:
+            return
+        elif läge == 'snabb':
+            self.starta_snabbträning(self.snabbläge, self.snabbtid)
         else:
             self.träning.starta_träning(läge)
 
-    def visa_alla_atomer(self, text):
-        """Visar en scrollbar-text med alla atomer (texten genereras av Träning.träna_på_alla_atomer)."""
+    def starta_snabbträning(self, läge, sekunder):
+        """Startar en ny omgång snabbträning (se Snabbträning) och returnerar den."""
+        if self.snabbträning is not None:
+            self.snabbträning.avbryt()
+        self.rensa_fråga_frame()
+        self.återställ_periodiska_systemet()
+        self.snabbträning = Snabbträning(self, läge, sekunder)
+        self.snabbträning.starta()
+        return self.snabbträning
+
+    def visa_alla_atomer(self):
+        """Visar en sorterbar och filtrerbar tabell med alla atomer (se Atomtabell).
+
+        Tabellen skapas första gången och återanvänds sedan, med sortering och filter kvar.
+        """
         self.rensa_frame()
         Label(self.nuvarande_frame, text="Alla atomer:", font=("Century Gothic", 14)).pack(pady=10)
-        st = scrolledtext.ScrolledText(self.nuvarande_frame, width=60, height=20)
-        st.insert(INSERT, text)
-        st.pack()
+        if self.atomtabell is None:
+            self.atomtabell = Atomtabell(self.rot, self.träning.system)
+        self.visa_i_nuvarande_frame(self.atomtabell.frame)
         ttk.Button(self.nuvarande_frame, text="Tillbaka till meny", command=self.visa_huvudmeny).pack(pady=10)
 
     def visa_sökt_atom(self):
-        """Öppnar ett nytt fönster som låter användaren söka en atom efter namn eller beteckning."""
+        """Öppnar ett nytt fönster där man söker en atom och får förslag medan man skriver.
 
+        Varje ändring i sökfältet schemalägger en sökning med rot.after och avbryter den förra,
+        så sökningen görs först efter en kort paus (SÖK_FÖRDRÖJNING_MS). Förslagen kommer från
+        PeriodiskaSystemet.föreslå och tål felstavningar. Enter, dubbelklick eller knappen Sök
+        visar det valda (eller bästa) förslaget och markerar atomen i tabellen.
+        """
+        system = self.träning.system
+        system.bygg_sökindex()
         sök_fönster = Toplevel(self.rot)
         sök_fönster.title("Sök atom")
         Label(sök_fönster, text="Ange ett grundämne (namn eller beteckning):").pack(pady=10)
-        entry = ttk.Entry(sök_fönster)
+        sökterm = StringVar(sök_fönster)
+        entry = ttk.Entry(sök_fönster, textvariable=sökterm)
         entry.pack()
-
-        def sök():
-            atom = self.träning.system.hitta_atom(entry.get().strip())
+        lista = Listbox(sök_fönster, height=8, width=50)
+        lista.pack(pady=5)
+        förslag = []
+        väntande = None
+
+        def uppdatera_förslag():
+            nonlocal väntande
+            väntande = None
+            if not lista.winfo_exists():
+                return
+            förslag[:] = system.föreslå(sökterm.get())
+            lista.delete(0, END)
+            for atom in förslag:
+                lista.insert(END, f"{atom.beteckning} | {atom.namn} | {atom.atomnummer}")
+
+        def vid_ändring(*_):
+            nonlocal väntande
+            if väntande is not None:
+                self.rot.after_cancel(väntande)
+            väntande = self.rot.after(SÖK_FÖRDRÖJNING_MS, uppdatera_förslag)
+
+        def sök(*_):
+            if väntande is not None:
+                self.rot.after_cancel(väntande)
+                uppdatera_förslag()
+            valda = lista.curselection()
+            if valda:
+                atom = förslag[valda[0]]
+            else:
+                atom = system.hitta_atom(sökterm.get()) or (förslag[0] if förslag else None)
             if atom:
                 info = f"{atom.beteckning} | {atom.namn} | {atom.atomnummer} | {atom.massa} | {atom.period} | {atom.grupp}"
                 messagebox.showinfo("Atom Info", info)
             else:
                 messagebox.showerror("Error", "Den sökta atomen finns inte")
             sök_fönster.destroy()
-            self.träning.träna_på_alla_atomer()
+            if atom and self.atomtabell is not None:
+                self.atomtabell.visa_atom(atom)
 
+        sökterm.trace_add('write', vid_ändring)
+        entry.bind('<Return>', sök)
+        lista.bind('<Return>', sök)
+        lista.bind('<Double-Button-1>', sök)
         ttk.Button(sök_fönster, text="Sök", command=sök).pack(pady=10)
 
     def visa_fråga(self, fråga, alternativ):
@@ -323,37 +688,76 @@ class GUI:
         Parametrar:
             fråga: Textsträng med frågetext.
             alternativ: Lista med strängar som representerar val; vid klick skickas valet till träning.checka_svar.
+
+        Widgetarna skapas första gången och återanvänds sedan; en ny fråga byter bara texterna
+        i de StringVar som label och knappar är bundna till.
         """
-        self.rensa_frame()
-        Label(self.nuvarande_frame, text=fråga, font=("Century Gothic", 12), wraplength=400).pack(pady=10)
-        for i, opt in enumerate(alternativ, 1):
-            ttk.Button(self.nuvarande_frame, text=f"{opt}", command=lambda o=opt: self.träning.checka_svar(o)).pack(pady=5)
-        ttk.Button(self.nuvarande_frame, text="Avsluta", command=self.visa_huvudmeny).pack(pady=10)
+        if self.flerval_frame is None:
+            self.flerval_frame = Frame(self.rot)
+            Label(self.flerval_frame, textvariable=self.fråga_text, font=("Century Gothic", 12), wraplength=400).pack(pady=10)
+            self.flerval_avsluta = ttk.Button(self.flerval_frame, text="Avsluta", command=self.visa_huvudmeny)
+        while len(self.flerval_knappar) < len(alternativ):
+            text = StringVar(self.rot)
+            knapp = ttk.Button(self.flerval_frame, textvariable=text, command=lambda t=text: self.träning.checka_svar(t.get()))
+            self.alternativ_text.append(text)
+            self.flerval_knappar.append(knapp)
+        if self.antal_synliga_knappar != len(alternativ):
+            for knapp in self.flerval_knappar:
+                knapp.pack_forget()
+            self.flerval_avsluta.pack_forget()
+            for knapp in self.flerval_knappar[:len(alternativ)]:
+                knapp.pack(pady=5)
+            self.flerval_avsluta.pack(pady=10)
+            self.antal_synliga_knappar = len(alternativ)
+        if not self.flerval_frame.winfo_manager():
+            self.rensa_frame()
+            self.visa_i_nuvarande_frame(self.flerval_frame)
+        self.fråga_text.set(fråga)
+        for text, opt in zip(self.alternativ_text, alternativ):
+            text.set(opt)
 
     def skapa_periodiskt_system(self):
-        """Skapar en tom visuell tabell (7x18) för periodiska systemets positioner och returnerar frame.
+        """Skapar första gången en tom visuell tabell (7x18) för periodiska systemets positioner och returnerar den.
+
+        Tabellen är en enda Canvas som är barn till rot-fönstret, så den överlever rensa_frame och
+        återanvänds varje gång positionsläget startar. periodiska_systemet_labels[rad][kolumn] är
+        id för textobjektet i respektive cell; alla celltexter har taggen 'cell'.
 
         Returnerar:
-            tabell_frame: Frame som innehåller label-celler som senare kan uppdateras med beteckningar.
+            Canvas med tabellen.
         """
-        tabell_frame = Frame(self.nuvarande_frame)
+        if self.periodiska_systemet_frame is not None:
+            return self.periodiska_systemet_frame
+        tabell = Canvas(self.rot, width=19 * CELL_BREDD, height=8 * CELL_HÖJD, highlightthickness=0)
         self.periodiska_systemet_labels = [[None for _ in range(18)] for _ in range(7)]
         for row in range(7):
             for col in range(18):
-                label = Label(tabell_frame, text="", borderwidth=1, relief="solid", width=5, height=2, font=("Britannic Bold", 8))
-                label.grid(row=row, column=col, padx=1, pady=1)
-                self.periodiska_systemet_labels[row][col] = label
+                x = col * CELL_BREDD
+                y = row * CELL_HÖJD
+                tabell.create_rectangle(x + 1, y + 1, x + CELL_BREDD - 1, y + CELL_HÖJD - 1)
+                self.periodiska_systemet_labels[row][col] = tabell.create_text(
+                    x + CELL_BREDD // 2, y + CELL_HÖJD // 2, text="", font=("Britannic Bold", 8), tags=('cell',))
         for col in range(18):
-            Label(tabell_frame, text=str(col+1), font=("Britannic Bold", 8)).grid(row=7, column=col)
+            tabell.create_text(col * CELL_BREDD + CELL_BREDD // 2, 7 * CELL_HÖJD + CELL_HÖJD // 2,
+                               text=str(col+1), font=("Britannic Bold", 8))
         for row in range(7):
-            Label(tabell_frame, text=str(row+1), font=("Britannic Bold", 8)).grid(row=row, column=18)
-        return tabell_frame
+            tabell.create_text(18 * CELL_BREDD + CELL_BREDD // 2, row * CELL_HÖJD + CELL_HÖJD // 2,
+                               text=str(row+1), font=("Britannic Bold", 8))
+        self.periodiska_systemet_frame = tabell
+        return tabell
 
     def position_läge(self):
-        """Sätter upp vy för positionsträning genom att skapa och visa en tom periodisk tabell i GUI:t."""
+        """Sätter upp vy för positionsträning med en tom periodisk tabell i GUI:t.
+
+        Visas tabellen redan (t.ex. när en ny omgång startas) töms den bara; annars packas den
+        befintliga tabellen in i ett nytt huvudframe.
+        """
+        tabell = self.skapa_periodiskt_system()
+        if tabell.winfo_manager():
+            self.töm_periodiska_systemet()
+            return
         self.rensa_frame()
-        self.periodiska_systemet_frame = self.skapa_periodiskt_system()
-        self.periodiska_systemet_frame.pack(side=LEFT, padx=10)
+        self.visa_i_nuvarande_frame(tabell, side=LEFT, padx=10)
 
     def visa_position_fråga(self, fråga):
         """Visar ett inmatningsfält för att svara med 'period,grupp' bredvid tabellen.
@@ -361,15 +765,17 @@ class GUI:
         Parametrar:
             fråga: Textsträng som beskriver vilken atom som ska positioneras.
         """
-        self.rensa_fråga_frame()
-        self.fråga_frame = Frame(self.nuvarande_frame)
-        self.fråga_frame.pack(side=RIGHT, padx=10)
-        Label(self.fråga_frame, text=fråga, font=("Century Gothic", 12), wraplength=400).pack(pady=10)
-        Label(self.fråga_frame, text="Ange period,grupp (t.ex. 1,1):").pack()
-        entry = ttk.Entry(self.fråga_frame)
-        entry.pack()
-        ttk.Button(self.fråga_frame, text="Svara", command=lambda: self.träning.checka_svar(entry.get().strip())).pack(pady=5)
-        ttk.Button(self.fråga_frame, text="Avsluta", command=self.visa_huvudmeny).pack(pady=10)
+        if self.fråga_frame is None:
+            self.fråga_frame = Frame(self.rot)
+            self.position_fråga_text = StringVar(self.rot)
+            Label(self.fråga_frame, textvariable=self.position_fråga_text, font=("Century Gothic", 12), wraplength=400).pack(pady=10)
+            Label(self.fråga_frame, text="Ange period,grupp (t.ex. 1,1):").pack()
+            ttk.Entry(self.fråga_frame, textvariable=self.position_svar).pack()
+            ttk.Button(self.fråga_frame, text="Svara", command=lambda: self.träning.checka_svar(self.position_svar.get().strip())).pack(pady=5)
+            ttk.Button(self.fråga_frame, text="Avsluta", command=self.visa_huvudmeny).pack(pady=10)
+        self.visa_i_nuvarande_frame(self.fråga_frame, side=RIGHT, padx=10)
+        self.position_fråga_text.set(fråga)
+        self.position_svar.set("")
 
     def uppdatera_tabell(self, atom):
         """Fyller i en cell i den periodiska tabellen med atomens beteckning om period och grupp finns.
@@ -381,7 +787,7 @@ class GUI:
             row = atom.period - 1
             col = atom.grupp - 1
             if 0 <= row < 7 and 0 <= col < 18:
-                self.periodiska_systemet_labels[row][col].config(text=atom.beteckning)
+                self.periodiska_systemet_frame.itemconfigure(self.periodiska_systemet_labels[row][col], text=atom.beteckning)
 
     def tabell_ifylld(self):
         """Visar ett meddelande när hela tabellen är ifylld och frågar användaren om de vill fortsätta."""
@@ -390,13 +796,9 @@ class GUI:
 
     def fråga_om_fortsätt(self):
         """Frågar användaren om de vill fortsätta och återställer eller avslutar beroende på svar och läge."""
-        if self.träning.träningstyp == 'position' and not self.träning.återstående_atomer:
+        if self.träning.träningstyp == 'position' and self.träning.session.klar:
             if messagebox.askyesno("Fortsätt?", "Vill du fortsätta spela?"):
-                full_atom = [a for a in self.träning.system.atomer if a.period is not None and a.grupp is not None]
-                self.träning.återstående_atomer = full_atom[:]
-                self.återställ_periodiska_systemet()
-                self.position_läge()
-                self.träning.ny_fråga()
+                self.träning.starta_träning('position')
             else:
                 self.visa_huvudmeny()
         else:
@@ -408,14 +810,89 @@ class GUI:
             else:
                 self.visa_huvudmeny()
 
-def main():
-    """Skapar huvudfönster, initierar PeriodiskaSystemet, Träning och GUI och startar huvudloopen."""
-    rot = Tk()
-    p_s = PeriodiskaSystemet()
-    träning = Träning(p_s, None)
-    gui = GUI(rot, träning)
-    träning.gui = gui
-    rot.mainloop()
+instrumentering.mätpunkt(Träning, 'ny_fråga')
+instrumentering.mätpunkt(Snabbträning, 'svara')
+instrumentering.mätpunkt(GUI, 'rensa_frame', 'skapa_periodiskt_system')
+
+def mät_tid_till_första_fråga(gui, läge='position', antal=10):
+    """Mäter hur lång tid det tar från att ett läge väljs i menyn tills första frågan är ritad.
+
+    Parametrar:
+        gui: GUI-instans med ett riktigt Tk-fönster.
+        läge: Träningsläge som startas.
+        antal: Antal mätningar; GUI:t går tillbaka till huvudmenyn mellan varje.
+    Returnerar:
+        Lista med tider i sekunder, den första inklusive att tabellen skapas.
+    """
+    tider = []
+    for _ in range(antal):
+        start = time.perf_counter()
+        gui.välj_läge(läge)
+        gui.rot.update_idletasks()
+        tider.append(time.perf_counter() - start)
+        gui.visa_huvudmeny()
+    return tider
+
+def main(argv=None):
+    """Skapar huvudfönstret och visar huvudmenyn direkt; PeriodiskaSystemet läses in på en
+    arbetstråd (se GUI.ladda_data) och menyknapparna aktiveras när datan är klar."""
+    start = time.perf_counter()
+    parser = skapa_argumentparser("Träna på det periodiska systemet i ett fönster.")
+    parser.add_argument('--mät-start', type=int, metavar='N', default=None,
+                        help="mät tid till första fråga i positionsläget N gånger och avsluta")
+    parser.add_argument('--positionsfil', metavar='FIL', default=None,
+                        help=f"spara positionslägets framsteg i FIL och fortsätt därifrån nästa gång "
+                             f"(standard: {POSITIONSFIL} i samma katalog som cachefilen)")
+    parser.add_argument('--ingen-positionsfil', action='store_true',
+                        help="spara inte positionslägets framsteg")
+    parser.add_argument('--mät-uppstart', action='store_true',
+                        help="mät tid tills huvudmenyn visas och tills datan är inläst, och avsluta")
+    parser.add_argument('--snabbläge', choices=[läge for läge in LÄGEN if läge != 'position'], default=SNABBLÄGE,
+                        help=f"läge för snabbträningen (standard: {SNABBLÄGE})")
+    parser.add_argument('--snabbtid', type=int, metavar='SEKUNDER', default=SNABBTID_S,
+                        help=f"snabbträningens längd i sekunder (standard: {SNABBTID_S})")
+    argument = parser.parse_args(argv)
+    starta_mätvärden(argument)
+    framsteg = None
+    inspelare = None
+    try:
+        if argument.kompilera:
+            ladda_system(argument)
+            return
+        framsteg = öppna_framsteg(argument)
+        inspelare = öppna_inspelning(argument)
+        slump = inspelare.slump if inspelare is not None else skapa_slump(argument)
+        rot = Tk()
+        positionsfil = None if argument.ingen_positionsfil else (
+            argument.positionsfil or os.path.join(os.path.dirname(os.path.abspath(argument.cache)), POSITIONSFIL))
+        träning = Träning(None, None, slump, argument.repetition, framsteg, argument.användare,
+                          positionsfil, argument.alternativ, inspelare)
+        gui = GUI(rot, träning, argument.snabbläge, argument.snabbtid)
+        träning.gui = gui
+        rot.update_idletasks()
+        meny_tid = time.perf_counter() - start
+
+        def data_klar():
+            if argument.mät_start:
+                tider = mät_tid_till_första_fråga(gui, 'position', argument.mät_start)
+                print(f"Tid till första fråga: första {tider[0] * 1000:.2f} ms, "
+                      f"därefter median {statistics.median(tider[1:] or tider) * 1000:.2f} ms")
+            if argument.mät_uppstart:
+                print(f"Huvudmenyn visas efter {meny_tid * 1000:.1f} ms, "
+                      f"datan är inläst efter {(time.perf_counter() - start) * 1000:.1f} ms")
+            if argument.mät_start or argument.mät_uppstart:
+                rot.quit()
+
+        gui.ladda_data(lambda: ladda_system(argument), data_klar)
+        rot.mainloop()
+        if argument.mät_start or argument.mät_uppstart:
+            rot.destroy()
+    finally:
+        if framsteg is not None:
+            framsteg.stäng()
+        if inspelare is not None:
+            inspelare.stäng()
+        skriv_mätvärden(argument)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""Analys av loggade svar: vilka grundämnen och lägen eleverna har svårast för.
+
+Loggarna kan vara framstegsdatabaser från --framsteg (SQLite, tabellen svar) eller JSON Lines
+där varje rad har atomnummer, läge och antingen rätt (true/false, 1/0 eller samma som text)
+eller utfall ('rätt', 'fel' eller 'obesvarad') som i utdatan från --batch, och gärna försök.
+Obesvarade frågor räknas för sig och påverkar inte felandelen. Rader som inte går att tolka
+hoppas över. Varje logg delas i delar (intervall
+av id i databasen, byteintervall i textfilen) som räknas ihop var för sig i en processpool;
+delresultaten är små (en rad per grundämne och läge) och slås sedan ihop. Ingen del av
+loggen behöver få plats i minnet, så även loggar med tiotals miljoner svar går bra.
+
+Resultatet skrivs som en värmekarta över felandelen per grundämne, utlagd i samma 7x18-rutnät
+av perioder och grupper som GUI.skapa_periodiskt_system ritar, följt av de svåraste
+grundämnena per läge. Med --format json skrivs i stället alla siffror.
+
+    python analys.py framsteg.db svar.jsonl --läge massa --processer 4
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sqlite3
+import sys
+
+from p_uppgift import PeriodiskaSystemet, CACHEFIL
+from session import LÄGEN
+from batch import OBESVARAD
+
+
+# Ungefärlig storlek på en del: antal id i databasen respektive byte i en textfil.
+DEL_ID = 1_000_000
+DEL_BYTE = 32 * 1024 * 1024
+
+_SQLITE_HUVUD = b"SQLite format 3\x00"
+
+# Tillåtna värden för rätt i en textlogg (se tolka_rätt).
+_SANNINGSVÄRDEN = {'true': True, 'false': False, '1': True, '0': False}
+
+# Tecken för felandelen 0-100 % i värmekartan, från ljust till mörkt.
+NYANSER = " .:-=+*#%@"
+
+
+def är_sqlite(filnamn):
+    with open(filnamn, 'rb') as fil:
+        return fil.read(len(_SQLITE_HUVUD)) == _SQLITE_HUVUD
+
+
+def dela_upp(filnamn, del_id=DEL_ID, del_byte=DEL_BYTE):
+    """Delar upp en logg i delar som kan räknas var för sig.
+    Returnerar en lista med (filnamn, typ, början, slut)."""
+
+    if är_sqlite(filnamn):
+        anslutning = sqlite3.connect(f"file:{filnamn}?mode=ro", uri=True)
+        try:
+            minst, störst = anslutning.execute("SELECT MIN(id), MAX(id) FROM svar").fetchone()
+        finally:
+            anslutning.close()
+        if minst is None:
+            return []
+        return [(filnamn, 'sqlite', början, min(början + del_id - 1, störst))
+                for början in range(minst, störst + 1, del_id)]
+    storlek = os.path.getsize(filnamn)
+    return [(filnamn, 'jsonl', början, min(början + del_byte, storlek)) for början in range(0, storlek, del_byte)]
+
+
+def tolka_rätt(värde):
+    """Tolkar fältet rätt strikt: True/False, 1/0 eller texterna 'true', 'false', '1' och '0'.
+    Ger ValueError för allt annat, t.ex. 'ja' eller 2."""
+
+    if isinstance(värde, bool):
+        return värde
+    if isinstance(värde, int) and värde in (0, 1):
+        return bool(värde)
+    if isinstance(värde, str) and värde.strip().lower() in _SANNINGSVÄRDEN:
+        return _SANNINGSVÄRDEN[värde.strip().lower()]
+    raise ValueError(f"ogiltigt värde för rätt: {värde!r}")
+
+
+def tolka_utfall(händelse):
+    """True (rätt), False (fel) eller None (obesvarad) för en händelse i en textlogg."""
+
+    if 'rätt' in händelse:
+        return tolka_rätt(händelse['rätt'])
+    utfall = händelse['utfall']
+    if utfall == OBESVARAD:
+        return None
+    if utfall not in ('rätt', 'fel'):
+        raise ValueError(f"okänt utfall {utfall!r}")
+    return utfall == 'rätt'
+
+
+def räkna_del(filnamn, typ, början, slut):
+    """Räknar ihop en del av en logg.
+
+    Returnerar en dict (atomnummer, läge) -> [antal besvarade, antal fel, summa försök, antal
+    obesvarade]. En del av en textfil omfattar raderna som börjar i byteintervallet
+    [början, slut)."""
+
+    delsummor = {}
+    if typ == 'sqlite':
+        anslutning = sqlite3.connect(f"file:{filnamn}?mode=ro", uri=True)
+        try:
+            for atomnummer, läge, antal, rätt, försök in anslutning.execute(
+                    """SELECT atomnummer, läge, COUNT(*), SUM(rätt), SUM(försök) FROM svar
+                       WHERE id BETWEEN ? AND ? GROUP BY atomnummer, läge""", (början, slut)):
+                delsummor[(atomnummer, läge)] = [antal, antal - rätt, försök, 0]
+        finally:
+            anslutning.close()
+        return delsummor
+
+    loads = json.loads
+    with open(filnamn, 'rb') as fil:
+        if början > 0:
+            fil.seek(början - 1)
+            fil.readline()
+        position = fil.tell()
+        for rad in fil:
+            if position >= slut:
+                break
+            position += len(rad)
+            try:
+                händelse = loads(rad)
+                nyckel = (int(händelse['atomnummer']), händelse['läge'])
+                rätt = tolka_utfall(händelse)
+                försök = int(händelse.get('försök', 1))
+            except (ValueError, KeyError, TypeError):
+                continue
+            summa = delsummor.get(nyckel)
+            if summa is None:
+                summa = delsummor[nyckel] = [0, 0, 0, 0]
+            if rätt is None:
+                summa[3] += 1
+                continue
+            summa[0] += 1
+            summa[1] += not rätt
+            summa[2] += försök
+    return delsummor
+
+
+def slå_ihop(summor, delsummor):
+    """Lägger delsummor till summor (samma form som räkna_del returnerar)."""
+
+    for nyckel, delsumma in delsummor.items():
+        summa = summor.get(nyckel)
+        if summa is None:
+            summor[nyckel] = list(delsumma)
+        else:
+            for i, värde in enumerate(delsumma):
+                summa[i] += värde
+    return summor
+
+
+def analysera(loggar, processer=None):
+    """Räknar ihop alla loggar, parallellt i processer processer (standard: en per kärna)."""
+
+    delar = [del_ for logg in loggar for del_ in dela_upp(logg)]
+    summor = {}
+    if (processer or os.cpu_count() or 1) <= 1 or len(delar) <= 1:
+        for del_ in delar:
+            slå_ihop(summor, räkna_del(*del_))
+        return summor
+    with concurrent.futures.ProcessPoolExecutor(processer) as pool:
+        for delsummor in pool.map(räkna_del, *zip(*delar)):
+            slå_ihop(summor, delsummor)
+    return summor
+
+
+def per_grundämne(summor, lägen=LÄGEN):
+    """Summerar över lägena i lägen: atomnummer -> [antal besvarade, fel, summa försök, obesvarade]."""
+
+    resultat = {}
+    for (atomnummer, läge), summa in summor.items():
+        if läge in lägen:
+            slå_ihop(resultat, {atomnummer: summa})
+    return resultat
+
+
+def värmekarta(system, summor, lägen=LÄGEN):
+    """Värmekartan som text: en cell per period och grupp med beteckning, felandel i procent
+    och en nyans ur NYANSER. Grundämnen utan position (eller utan svar) visas inte i rutnätet."""
+
+    per_atom = per_grundämne(summor, lägen)
+    celler = [[None] * 18 for _ in range(7)]
+    for atom in system.atomer:
+        summa = per_atom.get(atom.atomnummer)
+        if summa and summa[0] and atom.period and atom.grupp:
+            celler[atom.period - 1][atom.grupp - 1] = (atom.beteckning, summa[1] / summa[0])
+    rader = ["    " + "".join(f"{grupp:^7}" for grupp in range(1, 19))]
+    for period, rad in enumerate(celler, 1):
+        text = f"{period:>3} "
+        for cell in rad:
+            if cell is None:
+                text += " " * 7
+            else:
+                beteckning, andel = cell
+                nyans = NYANSER[min(len(NYANSER) - 1, int(andel * len(NYANSER)))]
+                text += f"{nyans}{beteckning:<2}{round(andel * 100):>3}%"
+        rader.append(text)
+    rader.append(f"Felandel i procent per grundämne ({', '.join(lägen)}); nyans från '{NYANSER[0]}' "
+                 f"(0 %) till '{NYANSER[-1]}' (100 %).")
+    return "\n".join(rader)
+
+
+def svåraste(system, summor, läge, antal=10):
+    """De antal grundämnen med högst felandel i läge: lista med (Atom, antal besvarade,
+    felandel, medelantal försök, antal obesvarade)."""
+
+    atomer = {atom.atomnummer: atom for atom in system.atomer}
+    rader = [(atomer[atomnummer], summa[0], summa[1] / summa[0], summa[2] / summa[0], summa[3])
+             for (atomnummer, l), summa in summor.items()
+             if l == läge and atomnummer in atomer and summa[0]]
+    rader.sort(key=lambda rad: (-rad[2], -rad[1]))
+    return rader[:antal]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analysera loggade svar och visa var eleverna gör fel.")
+    parser.add_argument('loggar', nargs='+', metavar='LOGG',
+                        help="framstegsdatabas (SQLite) eller JSON Lines-fil med svar")
+    parser.add_argument('--läge', action='append', choices=LÄGEN, default=None,
+                        help="ta bara med detta läge i värmekartan (kan anges flera gånger)")
+    parser.add_argument('--topp', type=int, default=10, help="antal svåraste grundämnen per läge (standard: 10)")
+    parser.add_argument('--processer', type=int, metavar='N', default=None,
+                        help="antal arbetsprocesser (standard: en per kärna)")
+    parser.add_argument('--format', choices=('text', 'json'), default='text')
+    parser.add_argument('--cache', default=CACHEFIL,
+                        help=f"kompilerad cachefil för grundämnena (standard: {CACHEFIL})")
+    argument = parser.parse_args(argv)
+
+    system = PeriodiskaSystemet(cachefil=argument.cache)
+    summor = analysera(argument.loggar, argument.processer)
+    lägen = tuple(argument.läge or LÄGEN)
+    if argument.format == 'json':
+        json.dump([{'atomnummer': atomnummer, 'läge': läge, 'antal': antal, 'fel': fel,
+                    'obesvarade': obesvarade, 'felandel': fel / antal if antal else None,
+                    'medel_försök': försök / antal if antal else None}
+                   for (atomnummer, läge), (antal, fel, försök, obesvarade) in sorted(summor.items())],
+                  sys.stdout, ensure_ascii=False, indent=1)
+        print()
+        return
+    print(värmekarta(system, summor, lägen))
+    for läge in lägen:
+        rader = svåraste(system, summor, läge, argument.topp)
+        if not rader:
+            continue
+        print()
+        print(f"Svårast i läget {läge}:")
+        for atom, antal, andel, försök, obesvarade in rader:
+            print(f"  {atom.beteckning:<3} {atom.namn:<15} {andel:6.1%} fel av {antal:>8} svar, "
+                  f"{försök:.2f} försök i snitt" + (f", {obesvarade} obesvarade" if obesvarade else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""Attrapper för de delar av tkinter som GUI.py använder.
+
+Med installerad(GUI) kan GUI-klassen köras utan skärm, t.ex. i mätningar. Attrapperna gör
+bara det arbete som behövs för att GUI-koden ska fungera (spara inställningar, hålla reda på
+packning och textvariabler), så tiderna visar Python-sidans kostnad och inte Tk:s ritande."""
+
+import contextlib
+import itertools
+import types
+
+
+# Funktioner som schemalagts med after(), tills kör_väntande() körs.
+väntande = {}
+_after_id = itertools.count(1)
+
+
+# Sätts av quit() så att mainloop() slutar köra schemalagda funktioner.
+_avslutad = False
+
+
+def kör_väntande():
+    """Kör alla funktioner som schemalagts med after() (i den ordning de lades till)
+    tills inga finns kvar eller quit() anropats."""
+
+    global _avslutad
+    _avslutad = False
+    while väntande and not _avslutad:
+        id = next(iter(väntande))
+        funktion, argument = väntande.pop(id)
+        funktion(*argument)
+
+
+class Widget:
+    """Gemensam attrapp för alla widgets: sparar inställningar, barn och packningsstatus."""
+
+    def __init__(self, master=None, **inställningar):
+        self.master = master
+        self.inställningar = inställningar
+        self.barn = []
+        self.hanterare = ""
+        self.förstörd = False
+        if isinstance(master, Widget):
+            master.barn.append(self)
+
+    def pack(self, in_=None, **inställningar):
+        self.hanterare = "pack"
+        if in_ is not None:
+            in_.barn.append(self)
+
+    def grid(self, **inställningar):
+        self.hanterare = "grid"
+
+    def place(self, **inställningar):
+        self.hanterare = "place"
+
+    def pack_forget(self):
+        self.hanterare = ""
+
+    grid_remove = grid_forget = place_forget = pack_forget
+
+    def winfo_manager(self):
+        return self.hanterare
+
+    def destroy(self):
+        self.förstörd = True
+        for barn in self.barn:
+            if barn.master is self:
+                barn.destroy()
+            else:
+                barn.hanterare = ""
+        self.barn = []
+
+    def config(self, **inställningar):
+        self.inställningar.update(inställningar)
+
+    configure = config
+
+    def cget(self, namn):
+        return self.inställningar.get(namn)
+
+    def bind(self, *argument, **inställningar):
+        pass
+
+    def unbind(self, *argument):
+        pass
+
+    def focus_set(self):
+        pass
+
+    def title(self, *argument):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    update = update_idletasks
+
+    def after(self, ms, funktion=None, *argument):
+        id = f"after#{next(_after_id)}"
+        if funktion is not None:
+            väntande[id] = (funktion, argument)
+        return id
+
+    def after_cancel(self, id):
+        väntande.pop(id, None)
+
+    def winfo_exists(self):
+        return not self.förstörd
+
+    def quit(self):
+        global _avslutad
+        _avslutad = True
+
+    def mainloop(self):
+        kör_väntande()
+
+    def withdraw(self):
+        pass
+
+
+class Tk(Widget):
+    pass
+
+
+class Toplevel(Widget):
+    pass
+
+
+class Frame(Widget):
+    pass
+
+
+class Label(Widget):
+    pass
+
+
+class Button(Widget):
+    pass
+
+
+class Entry(Widget):
+    def get(self):
+        variabel = self.inställningar.get('textvariable')
+        return variabel.get() if variabel is not None else ""
+
+    def delete(self, *argument):
+        pass
+
+    def insert(self, *argument):
+        pass
+
+
+class Canvas(Widget):
+    """Canvas-attrapp som sparar objektens inställningar och taggar."""
+
+    def __init__(self, master=None, **inställningar):
+        super().__init__(master, **inställningar)
+        self.objekt = {}
+        self._id = itertools.count(1)
+
+    def _skapa(self, *koordinater, **inställningar):
+        id = next(self._id)
+        self.objekt[id] = inställningar
+        return id
+
+    create_text = create_rectangle = create_line = create_oval = _skapa
+
+    def itemconfigure(self, tagg_eller_id, **inställningar):
+        if tagg_eller_id in self.objekt:
+            self.objekt[tagg_eller_id].update(inställningar)
+            return
+        for objekt in self.objekt.values():
+            if tagg_eller_id in objekt.get('tags', ()):
+                objekt.update(inställningar)
+
+    itemconfig = itemconfigure
+
+    def itemcget(self, id, namn):
+        return self.objekt[id].get(namn)
+
+
+class Treeview(Widget):
+    """Treeview-attrapp som sparar rubriker och radernas värden."""
+
+    def __init__(self, master=None, **inställningar):
+        super().__init__(master, **inställningar)
+        self.rubriker = {}
+        self.rader = {}
+        self.markerade = ()
+        self._id = itertools.count(1)
+
+    def heading(self, kolumn, **inställningar):
+        self.rubriker.setdefault(kolumn, {}).update(inställningar)
+
+    def column(self, kolumn, **inställningar):
+        pass
+
+    def insert(self, förälder, index, iid=None, **inställningar):
+        iid = iid or f"I{next(self._id):03X}"
+        self.rader[iid] = inställningar
+        return iid
+
+    def item(self, iid, **inställningar):
+        if not inställningar:
+            return self.rader[iid]
+        self.rader[iid].update(inställningar)
+
+    def delete(self, *iid):
+        for i in iid:
+            del self.rader[i]
+
+    def get_children(self, förälder=""):
+        return tuple(self.rader)
+
+    def selection_set(self, *iid):
+        self.markerade = iid
+
+
+class Scrollbar(Widget):
+    def set(self, första, sista):
+        self.inställningar['läge'] = (float(första), float(sista))
+
+
+class Listbox(Widget):
+    def __init__(self, master=None, **inställningar):
+        super().__init__(master, **inställningar)
+        self.rader = []
+        self.markerade = ()
+
+    def delete(self, första, sista=None):
+        self.rader = []
+
+    def insert(self, index, *rader):
+        self.rader.extend(rader)
+
+    def get(self, index):
+        return self.rader[index]
+
+    def curselection(self):
+        return self.markerade
+
+    def selection_set(self, index):
+        self.markerade = (index,)
+
+
+class ScrolledText(Widget):
+    def insert(self, *argument):
+        pass
+
+    def delete(self, *argument):
+        pass
+
+
+class StringVar:
+    def __init__(self, master=None, value=""):
+        self._värde = value
+        self._bevakare = []
+
+    def set(self, värde):
+        self._värde = värde
+        for funktion in self._bevakare:
+            funktion("", "", "write")
+
+    def trace_add(self, läge, funktion):
+        self._bevakare.append(funktion)
+        return str(len(self._bevakare))
+
+    def get(self):
+        return self._värde
+
+
+class Misc:
+    @staticmethod
+    def tkraise(widget, ovanför=None):
+        pass
+
+
+def _ingenting(*argument, **inställningar):
+    return None
+
+
+def _ja(*argument, **inställningar):
+    return True
+
+
+ttk = types.SimpleNamespace(Button=Button, Entry=Entry, Label=Label, Frame=Frame, Treeview=Treeview,
+                            Scrollbar=Scrollbar)
+scrolledtext = types.SimpleNamespace(ScrolledText=ScrolledText)
+messagebox = types.SimpleNamespace(showinfo=_ingenting, showerror=_ingenting, showwarning=_ingenting,
+                                   askyesno=_ja)
+
+_NAMN = ('Tk', 'Toplevel', 'Frame', 'Label', 'Button', 'Entry', 'Canvas', 'Listbox', 'StringVar', 'Misc',
+         'ttk', 'scrolledtext', 'messagebox')
+
+
+@contextlib.contextmanager
+def installerad(modul):
+    """Byter ut tkinter-namnen i modul mot attrapperna så länge with-blocket pågår."""
+
+    tidigare = {namn: getattr(modul, namn) for namn in _NAMN if hasattr(modul, namn)}
+    for namn in _NAMN:
+        setattr(modul, namn, globals()[namn])
+    try:
+        yield modul
+    finally:
+        for namn in _NAMN:
+            if namn in tidigare:
+                setattr(modul, namn, tidigare[namn])
+            else:
+                delattr(modul, namn)
@@ -0,0 +1,199 @@
+"""Rättning av inskickade elevsvar i stora mängder, utan input() och utan terminal.
+
+Indata är JSON Lines med ett svar per rad:
+
+    {"elev": "anna", "läge": "massa", "frö": 17, "svar": [2, 3]}
+
+Frågan bestäms helt av läge och frö: det är den första fråga som en ny Träningssession med
+random.Random(frö) ställer. Svaren rättas i ordning med samma regler som frågorna i
+terminalen: i flervalslägena är ett svar alternativets nummer (1-N), i positionsläget
+[period, grupp] eller "period,grupp". svar är en lista med försök i tur och ordning; en
+ensam text eller ett ensamt tal räknas som ett enda försök. Ett ogiltigt svar kostar inget
+försök och svar efter att frågan avgjorts räknas inte.
+
+Utdata är en rad per indatarad, i samma ordning:
+
+    {"elev": "anna", "läge": "massa", "frö": 17, "utfall": "rätt", "försök": 2, "rätt_svar": "12.011",
+     "atomnummer": 6}
+
+utfall är 'rätt', 'fel' (försöken tog slut) eller 'obesvarad' (svaren tog slut innan frågan
+avgjordes). En rad som inte går att rätta ger {"rad": n, "fel": "..."}. Utdatan kan
+analyseras med analys.py. Raderna läses och skrivs en i taget, eller i block om flera
+processer används, så minnet är konstant oavsett hur lång strömmen är."""
+
+import concurrent.futures
+import functools
+import itertools
+import json
+import random
+from collections import deque
+
+from session import Träningssession, RÄTT, SLUT, OGILTIG, ANTAL_ALTERNATIV
+
+
+# Antal rader som skickas till en arbetsprocess åt gången.
+BLOCKSTORLEK = 20000
+
+OBESVARAD = 'obesvarad'
+
+
+class Rättare:
+    """Rättar svarsposter mot ett delat PeriodiskaSystemet.
+
+    En Träningssession per läge återanvänds för alla poster. Frågan för (läge, frö) dras en
+    gång genom att så om slumpgeneratorn och återställa positionslägets kortlek, så den blir
+    exakt den som en ny session med random.Random(frö) hade ställt. Den sparas sedan i en
+    LRU-cache om högst cachestorlek frågor och ställs med Träningssession.ställ_fråga när
+    samma frö kommer igen, vilket är det vanliga när en hel klass svarar på samma frågor.
+    """
+
+    def __init__(self, system, antal_alternativ=ANTAL_ALTERNATIV, max_försök=3, cachestorlek=65536):
+        self.system = system
+        self.antal_alternativ = antal_alternativ
+        self.max_försök = max_försök
+        self.slump = random.Random()
+        self.sessioner = {}
+        self.orörda_lekar = {}
+        self.fråga = functools.lru_cache(maxsize=cachestorlek)(self._dra_fråga)
+
+    def _session(self, läge):
+        session = self.sessioner.get(läge)
+        if session is None:
+            session = Träningssession(self.system, läge, self.slump, self.max_försök, self.antal_alternativ)
+            self.sessioner[läge] = session
+            if session.återstående is not None:
+                self.orörda_lekar[läge] = session.återstående.kopia()
+        return session
+
+    def _förbered(self, läge):
+        session = self._session(läge)
+        if läge in self.orörda_lekar:
+            session.återstående = self.orörda_lekar[läge].kopia()
+        return session
+
+    def _dra_fråga(self, läge, frö):
+        """(rätt_index, alternativ) för första frågan i läge med random.Random(frö)."""
+
+        session = self._förbered(läge)
+        self.slump.seed(frö)
+        session.nästa_fråga()
+        return session.rätt_index, session.alternativ
+
+    def rätta(self, post):
+        """Rättar en post (dict med läge, frö och svar) och returnerar resultatet som dict."""
+
+        läge = post['läge']
+        frö = post['frö']
+        rätt_index, alternativ = self.fråga(läge, frö)
+        session = self._förbered(läge)
+        fråga = session.ställ_fråga(rätt_index, alternativ)
+        svarslista = post['svar']
+        if isinstance(svarslista, (str, int)):
+            svarslista = [svarslista]
+        utfall = OBESVARAD
+        försök = 0
+        for svar in svarslista:
+            if fråga.alternativ:
+                svar = _alternativ(svar, fråga.alternativ)
+                if svar is None:
+                    continue
+            resultat = session.svara(svar)
+            if resultat.utfall == OGILTIG:
+                continue
+            försök += 1
+            if resultat.utfall == RÄTT:
+                utfall = 'rätt'
+                break
+            if resultat.utfall == SLUT:
+                utfall = 'fel'
+                break
+        return {'elev': post.get('elev'), 'läge': läge, 'frö': frö, 'utfall': utfall, 'försök': försök,
+                'rätt_svar': session.rätt_svar(), 'atomnummer': session.atom.atomnummer}
+
+
+def _alternativ(svar, alternativ):
+    """Texten för alternativ nummer svar (1-N), eller None om svaret inte är ett giltigt nummer."""
+
+    if isinstance(svar, bool):
+        return None
+    try:
+        nummer = int(svar)
+    except (TypeError, ValueError):
+        return None
+    return alternativ[nummer - 1] if 1 <= nummer <= len(alternativ) else None
+
+
+def rätta_rader(rättare, rader, första_radnummer=1):
+    """Rättar JSON-rader och returnerar utdataraderna (utan radbrytning) som en lista."""
+
+    loads = json.loads
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    rätta = rättare.rätta
+    utdata = []
+    for radnummer, rad in enumerate(rader, första_radnummer):
+        if not rad.strip():
+            continue
+        try:
+            resultat = rätta(loads(rad))
+        except (ValueError, KeyError, TypeError, AttributeError) as fel:
+            resultat = {'rad': radnummer, 'fel': str(fel)}
+        utdata.append(dumps(resultat))
+    return utdata
+
+
+# Rättaren i en arbetsprocess, skapad av _starta_arbetare.
+_rättare = None
+
+
+def _starta_arbetare(cachefil, antal_alternativ):
+    global _rättare
+    from p_uppgift import PeriodiskaSystemet
+    _rättare = Rättare(PeriodiskaSystemet(cachefil=cachefil), antal_alternativ)
+
+
+def _rätta_block(rader, första_radnummer):
+    return rätta_rader(_rättare, rader, första_radnummer)
+
+
+def rätta_ström(system, indata, utdata, antal_alternativ=ANTAL_ALTERNATIV, processer=1, cachefil=None):
+    """Läser svarsposter rad för rad från filobjektet indata och skriver resultaten till utdata.
+
+    Med processer > 1 rättas block om BLOCKSTORLEK rader i så många arbetsprocesser; var och
+    en läser in sitt eget PeriodiskaSystemet från cachefil. Högst två block per process är
+    ute samtidigt och resultaten skrivs i indatans ordning. Returnerar antalet rättade rader."""
+
+    antal = 0
+    if processer <= 1:
+        rättare = Rättare(system, antal_alternativ)
+        radnummer = 1
+        while True:
+            rader = list(itertools.islice(indata, BLOCKSTORLEK))
+            if not rader:
+                return antal
+            resultat = rätta_rader(rättare, rader, radnummer)
+            radnummer += len(rader)
+            antal += len(resultat)
+            utdata.write("\n".join(resultat))
+            if resultat:
+                utdata.write("\n")
+
+    with concurrent.futures.ProcessPoolExecutor(processer, initializer=_starta_arbetare,
+                                                initargs=(cachefil, antal_alternativ)) as pool:
+        pågående = deque()
+        radnummer = 1
+        slut = False
+        while not slut or pågående:
+            while not slut and len(pågående) < 2 * processer:
+                rader = list(itertools.islice(indata, BLOCKSTORLEK))
+                if not rader:
+                    slut = True
+                    break
+                pågående.append(pool.submit(_rätta_block, rader, radnummer))
+                radnummer += len(rader)
+            if pågående:
+                resultat = pågående.popleft().result()
+                antal += len(resultat)
+                utdata.write("\n".join(resultat))
+                if resultat:
+                    utdata.write("\n")
+    return antal
@@ -0,0 +1,364 @@
+"""Mätningar av programmets prestanda.
+
+`python benchmark.py svit` kör hela mätsviten (inläsning, sökning, frågegenerering, rättning
+och uppbyggnad av GUI:t) och skriver median, min och spridning per anrop. Med
+--spara-baslinje sparas resultatet som JSON, och med --baslinje jämförs det mot en sparad
+baslinje; programmet avslutas då med felkod 1 om någon mätning blivit mer än --tröskel
+långsammare. `python benchmark.py övergångar --antal 10000` mäter fördelningen av tiden för
+en frågeövergång i GUI:t.
+
+Allt körs utan nätverk. GUI:t körs mot attrapperna i attrapp_tk när det saknas skärm (och
+alltid i sviten), och messagebox är då ersatt så att inga dialogrutor visas."""
+
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import GUI
+import attrapp_tk
+import p_uppgift
+from p_uppgift import PeriodiskaSystemet
+from session import generera_frågor, percentil
+
+
+BASLINJEFIL = 'benchmark_baslinje.json'
+
+
+def skriv_fördelning(namn, tider_ns):
+    """Skriver ut medel, median, p95, p99 och max för en lista med tider i nanosekunder."""
+
+    tider = sorted(tider_ns)
+    print(f"{namn}: n={len(tider)} medel={statistics.fmean(tider) / 1000:.1f} µs "
+          f"p50={percentil(tider, 0.50) / 1000:.1f} µs p95={percentil(tider, 0.95) / 1000:.1f} µs "
+          f"p99={percentil(tider, 0.99) / 1000:.1f} µs max={tider[-1] / 1000:.1f} µs")
+
+
+def har_skärm():
+    return sys.platform.startswith("win") or sys.platform == "darwin" or bool(os.environ.get("DISPLAY"))
+
+
+def mät_frågeövergångar(system, läge='namn', antal=10000, attrapp=True):
+    """Mäter tiden för Träning.ny_fråga, dvs. att dra en ny fråga och visa den i GUI:t.
+
+    I positionsläget används spridd repetition så att omgången aldrig tar slut.
+    Returnerar en lista med tider i nanosekunder, en per övergång."""
+
+    def kör():
+        rot = GUI.Tk()
+        rot.withdraw()
+        träning = GUI.Träning(system, None, random.Random(0), repetition=(läge == 'position'))
+        gui = GUI.GUI(rot, träning)
+        träning.gui = gui
+        träning.starta_träning(läge)
+        tider = []
+        klocka = time.perf_counter_ns
+        for _ in range(antal):
+            start = klocka()
+            träning.ny_fråga()
+            rot.update_idletasks()
+            tider.append(klocka() - start)
+        rot.destroy()
+        return tider
+
+    if attrapp:
+        with attrapp_tk.installerad(GUI):
+            return kör()
+    return kör()
+
+
+# Mätsviten: namn -> funktion som tar PeriodiskaSystemet och returnerar funktionen som mäts.
+MÄTNINGAR = {}
+
+
+# Tillfälliga resurser som mätningarnas förberedelser öppnar, t.ex. kataloger. kör_svit
+# stänger dem när sviten är klar så att inget blir kvar.
+_städning = contextlib.ExitStack()
+
+
+def mätning(namn):
+    """Dekorator som registrerar en förberedelsefunktion i MÄTNINGAR under namn."""
+
+    def registrera(förbered):
+        MÄTNINGAR[namn] = förbered
+        return förbered
+    return registrera
+
+
+@mätning("läs_in_data (textfiler)")
+def _läs_in_text(system):
+    return lambda: PeriodiskaSystemet()
+
+
+@mätning("läs_in_data (cache)")
+def _läs_in_cache(system):
+    katalog = _städning.enter_context(tempfile.TemporaryDirectory())
+    cachefil = os.path.join(katalog, p_uppgift.CACHEFIL)
+    PeriodiskaSystemet(cachefil=cachefil)
+    return lambda: PeriodiskaSystemet(cachefil=cachefil)
+
+
+@mätning("hitta_atom träff")
+def _hitta_träff(system):
+    termer = [atom.beteckning for atom in system.atomer] + [atom.namn for atom in system.atomer]
+    hitta = system.hitta_atom
+    return lambda: [hitta(term) for term in termer]
+
+
+@mätning("hitta_atom miss")
+def _hitta_miss(system):
+    termer = [f"Xx{i}" for i in range(2 * len(system))]
+    hitta = system.hitta_atom
+    return lambda: [hitta(term) for term in termer]
+
+
+@mätning("hitta_atom versalvarianter")
+def _hitta_versaler(system):
+    termer = []
+    for atom in system.atomer:
+        termer += [atom.namn.upper(), atom.namn.lower(), atom.beteckning.swapcase()]
+    hitta = system.hitta_atom
+    return lambda: [hitta(term) for term in termer]
+
+
+@mätning("hitta_atomer (batch)")
+def _hitta_batch(system):
+    termer = [atom.namn.upper() for atom in system.atomer] * 10
+    return lambda: system.hitta_atomer(termer)
+
+
+@mätning("föreslå (felstavat)")
+def _föreslå(system):
+    system.bygg_sökindex()
+    return lambda: [system.föreslå(term) for term in ("jarn", "slvr", "kvicksilvr", "xenn")]
+
+
+@mätning("generera_frågor 1000 (namn)")
+def _generera(system):
+    return lambda: generera_frågor(system, 'namn', 1000, frö=1)
+
+
+@mätning("terminal: frågor_om_atom_egenskaper")
+def _terminal_flerval(system):
+    träning = p_uppgift.Träning(system, random.Random(0))
+    return _utan_terminal(lambda: träning.frågor_om_atom_egenskaper('massa'), "1")
+
+
+@mätning("terminal: frågor_om_position")
+def _terminal_position(system):
+    träning = p_uppgift.Träning(system, random.Random(0))
+    return _utan_terminal(träning.frågor_om_position, "1")
+
+
+def _utan_terminal(funktion, svar):
+    """Kör funktion med input() som alltid svarar svar och utskrifter som slängs."""
+
+    def kör():
+        tidigare = builtins.input
+        builtins.input = lambda *_: svar
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                funktion()
+        finally:
+            builtins.input = tidigare
+    return kör
+
+
+def _gui_träning(system, läge, repetition=False):
+    rot = GUI.Tk()
+    träning = GUI.Träning(system, None, random.Random(0), repetition=repetition)
+    gui = GUI.GUI(rot, träning)
+    träning.gui = gui
+    träning.starta_träning(läge)
+    return träning
+
+
+@mätning("GUI: ny_fråga (namn)")
+def _gui_ny_fråga(system):
+    return _gui_träning(system, 'namn').ny_fråga
+
+
+@mätning("GUI: checka_svar rätt")
+def _gui_rätt(system):
+    träning = _gui_träning(system, 'massa')
+    return lambda: träning.checka_svar(träning.session.rätt_svar())
+
+
+@mätning("GUI: checka_svar fel")
+def _gui_fel(system):
+    träning = _gui_träning(system, 'massa')
+    return lambda: träning.checka_svar("-1")
+
+
+@mätning("GUI: checka_position_svar")
+def _gui_position(system):
+    träning = _gui_träning(system, 'position')
+
+    def svara():
+        atom = träning.rätt_atom
+        träning.checka_svar(f"{atom.period},{atom.grupp}")
+    return svara
+
+
+@mätning("GUI: snabbträning svar")
+def _gui_snabbträning(system):
+    rot = GUI.Tk()
+    träning = GUI.Träning(system, None, random.Random(0))
+    gui = GUI.GUI(rot, träning)
+    träning.gui = gui
+    snabbträning = gui.starta_snabbträning('massa', 3600)
+    return lambda: snabbträning.svara(snabbträning.session.rätt_svar())
+
+
+@mätning("GUI: huvudmeny")
+def _gui_huvudmeny(system):
+    rot = GUI.Tk()
+    gui = GUI.GUI(rot, GUI.Träning(system, None))
+    return gui.visa_huvudmeny
+
+
+@mätning("GUI: skapa_periodiskt_system")
+def _gui_tabell(system):
+    rot = GUI.Tk()
+    gui = GUI.GUI(rot, GUI.Träning(system, None))
+
+    def skapa():
+        gui.periodiska_systemet_frame = None
+        gui.skapa_periodiskt_system()
+    return skapa
+
+
+@mätning("GUI: Atomtabell")
+def _gui_atomtabell(system):
+    rot = GUI.Tk()
+    return lambda: GUI.Atomtabell(rot, system)
+
+
+def mät(funktion, upprepningar=7, min_tid=0.05):
+    """Kalibrerar antalet anrop så att en omgång tar minst min_tid sekunder och mäter sedan
+    upprepningar omgångar. Returnerar tiden per anrop i nanosekunder för varje omgång."""
+
+    klocka = time.perf_counter_ns
+    antal = 1
+    while True:
+        start = klocka()
+        for _ in range(antal):
+            funktion()
+        tid = klocka() - start
+        if tid >= min_tid * 1e9:
+            break
+        antal *= 2 if tid == 0 else max(2, min(10, int(min_tid * 1e9 / tid) + 1))
+    tider = []
+    for _ in range(upprepningar):
+        start = klocka()
+        for _ in range(antal):
+            funktion()
+        tider.append((klocka() - start) / antal)
+    return tider
+
+
+def formatera(ns):
+    """Formaterar en tid i nanosekunder med lämplig enhet."""
+
+    for enhet, faktor in (("s", 1e9), ("ms", 1e6), ("µs", 1e3)):
+        if ns >= faktor:
+            return f"{ns / faktor:.2f} {enhet}"
+    return f"{ns:.0f} ns"
+
+
+def kör_svit(filter=None, upprepningar=7, min_tid=0.05):
+    """Kör mätningarna i MÄTNINGAR (vars namn innehåller filter) och returnerar en dict
+    namn -> {median, min, medel, stdav} i nanosekunder per anrop."""
+
+    system = PeriodiskaSystemet()
+    resultat = {}
+    with _städning, attrapp_tk.installerad(GUI):
+        for namn, förbered in MÄTNINGAR.items():
+            if filter and filter not in namn:
+                continue
+            tider = mät(förbered(system), upprepningar, min_tid)
+            resultat[namn] = {
+                'median': statistics.median(tider),
+                'min': min(tider),
+                'medel': statistics.fmean(tider),
+                'stdav': statistics.stdev(tider) if len(tider) > 1 else 0.0,
+            }
+    return resultat
+
+
+def jämför(resultat, baslinje, tröskel):
+    """Skriver resultatet i tabellform, jämfört med baslinjen om den finns.
+    Returnerar namnen på mätningar vars median ökat mer än tröskel (t.ex. 0.25 = 25 %)."""
+
+    regressioner = []
+    bredd = max(len(namn) for namn in resultat)
+    for namn, värden in resultat.items():
+        spridning = 100 * värden['stdav'] / värden['medel'] if värden['medel'] else 0.0
+        rad = (f"{namn:<{bredd}}  median {formatera(värden['median']):>10}  "
+               f"min {formatera(värden['min']):>10}  ±{spridning:4.1f} %")
+        tidigare = baslinje.get(namn)
+        if tidigare:
+            kvot = värden['median'] / tidigare['median']
+            status = "OK"
+            if kvot > 1 + tröskel:
+                status = "REGRESSION"
+                regressioner.append(namn)
+            rad += f"  {kvot:5.2f}x baslinjen  {status}"
+        print(rad)
+    return regressioner
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prestandamätningar för periodiska systemet-träningen.")
+    delkommandon = parser.add_subparsers(dest='kommando', required=True)
+
+    svit = delkommandon.add_parser('svit', help="kör hela mätsviten")
+    svit.add_argument('--filter', default=None, help="kör bara mätningar vars namn innehåller texten")
+    svit.add_argument('--upprepningar', type=int, default=7)
+    svit.add_argument('--min-tid', type=float, default=0.05, help="minsta tid per omgång i sekunder")
+    svit.add_argument('--baslinje', metavar='FIL', default=None,
+                      help=f"jämför mot en sparad baslinje, t.ex. {BASLINJEFIL}")
+    svit.add_argument('--spara-baslinje', metavar='FIL', default=None, help="spara resultatet som baslinje")
+    svit.add_argument('--tröskel', type=float, default=0.25,
+                      help="tillåten ökning av medianen jämfört med baslinjen (standard 0.25 = 25 %%)")
+
+    övergångar = delkommandon.add_parser('övergångar', help="tid per frågeövergång i GUI:t")
+    övergångar.add_argument('--antal', type=int, default=10000)
+    övergångar.add_argument('--läge', default='namn', choices=['atomnummer', 'beteckning', 'namn', 'massa', 'position'])
+    övergångar.add_argument('--attrapp', action='store_true', help="använd attrapp-Tk även om det finns en skärm")
+    argument = parser.parse_args(argv)
+
+    if argument.kommando == 'övergångar':
+        attrapp = argument.attrapp or not har_skärm()
+        tider = mät_frågeövergångar(PeriodiskaSystemet(), argument.läge, argument.antal, attrapp)
+        skriv_fördelning(f"frågeövergång ({argument.läge}, {'attrapp' if attrapp else 'Tk'})", tider)
+        return 0
+
+    resultat = kör_svit(argument.filter, argument.upprepningar, argument.min_tid)
+    baslinje = {}
+    if argument.baslinje:
+        with open(argument.baslinje, 'r', encoding="utf-8") as fil:
+            baslinje = json.load(fil)['mätningar']
+    regressioner = jämför(resultat, baslinje, argument.tröskel)
+    if argument.spara_baslinje:
+        with open(argument.spara_baslinje, 'w', encoding="utf-8") as fil:
+            json.dump({'python': platform.python_version(), 'plattform': platform.platform(),
+                       'mätningar': resultat}, fil, ensure_ascii=False, indent=2)
+    if regressioner:
+        print(f"{len(regressioner)} mätningar är mer än {argument.tröskel:.0%} långsammare än baslinjen:")
+        for namn in regressioner:
+            print(f"  {namn}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
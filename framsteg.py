@@ -0,0 +1,150 @@
+"""Lokal lagring av träningsresultat i SQLite.
+
+Varje besvarad fråga blir en rad i tabellen svar. Skrivningarna görs av en egen tråd som
+samlar ihop händelser och skriver dem i omgångar, så att rättningen av ett svar aldrig
+behöver vänta på disken. Databasen körs i WAL-läge så att frågor mot historiken kan göras
+samtidigt som skrivtråden arbetar."""
+
+import queue
+import sqlite3
+import threading
+import time
+
+
+FRAMSTEGSFIL = 'framsteg.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS svar (
+    id INTEGER PRIMARY KEY,
+    tid REAL NOT NULL,
+    användare TEXT NOT NULL,
+    session TEXT NOT NULL,
+    atomnummer INTEGER NOT NULL,
+    läge TEXT NOT NULL,
+    rätt INTEGER NOT NULL,
+    försök INTEGER NOT NULL,
+    latens REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS svar_användare ON svar (användare, tid);
+CREATE INDEX IF NOT EXISTS svar_atom ON svar (atomnummer, läge, tid);
+"""
+
+_INFOGA = """INSERT INTO svar (tid, användare, session, atomnummer, läge, rätt, försök, latens)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_STOPP = object()
+
+
+class Framstegslager:
+    """Buffrad skrivare och enkla frågor mot en SQLite-fil med svarshändelser.
+
+    Parametrar:
+        filnamn: Sökväg till databasen, skapas om den inte finns.
+        batchstorlek: Så många händelser skrivs som mest i en transaktion.
+        flushintervall: Längsta tid (sekunder) en händelse ligger kvar i bufferten.
+    """
+
+    def __init__(self, filnamn=FRAMSTEGSFIL, batchstorlek=500, flushintervall=1.0):
+        self.filnamn = filnamn
+        self.batchstorlek = batchstorlek
+        self.flushintervall = flushintervall
+        anslutning = self._anslut()
+        try:
+            anslutning.execute("PRAGMA journal_mode=WAL")
+            anslutning.executescript(_SCHEMA)
+        finally:
+            anslutning.close()
+        self._kö = queue.SimpleQueue()
+        self._skrivet = threading.Condition()
+        self._antal_köade = 0
+        self._antal_skrivna = 0
+        self._tråd = threading.Thread(target=self._skrivloop, name="framsteg", daemon=True)
+        self._tråd.start()
+
+    def _anslut(self):
+        anslutning = sqlite3.connect(self.filnamn, timeout=30)
+        anslutning.execute("PRAGMA synchronous=NORMAL")
+        return anslutning
+
+    def registrera(self, användare, session, atomnummer, läge, rätt, försök, latens):
+        """Köar en svarshändelse för skrivning och returnerar direkt.
+
+        latens är tiden i sekunder från att frågan visades till sista svaret."""
+
+        self._antal_köade += 1
+        self._kö.put((time.time(), användare, session, atomnummer, läge, int(rätt), försök, latens))
+
+    def töm(self):
+        """Väntar tills allt som hittills köats har skrivits till databasen."""
+
+        mål = self._antal_köade
+        self._kö.put(None)
+        with self._skrivet:
+            self._skrivet.wait_for(lambda: self._antal_skrivna >= mål or not self._tråd.is_alive())
+
+    def stäng(self):
+        """Skriver det som återstår och stoppar skrivtråden."""
+
+        if self._tråd.is_alive():
+            self._kö.put(_STOPP)
+            self._tråd.join()
+
+    def _skrivloop(self):
+        anslutning = self._anslut()
+        batch = []
+        stopp = False
+        while not stopp:
+            try:
+                händelse = self._kö.get(timeout=self.flushintervall)
+            except queue.Empty:
+                händelse = None
+            while händelse is not None and händelse is not _STOPP:
+                batch.append(händelse)
+                if len(batch) >= self.batchstorlek:
+                    break
+                try:
+                    händelse = self._kö.get_nowait()
+                except queue.Empty:
+                    händelse = None
+            stopp = händelse is _STOPP
+            if batch:
+                with anslutning:
+                    anslutning.executemany(_INFOGA, batch)
+                with self._skrivet:
+                    self._antal_skrivna += len(batch)
+                    self._skrivet.notify_all()
+                batch = []
+            else:
+                with self._skrivet:
+                    self._skrivet.notify_all()
+        anslutning.close()
+
+    def _fråga(self, sql, parametrar):
+        self.töm()
+        anslutning = self._anslut()
+        try:
+            anslutning.row_factory = sqlite3.Row
+            return [dict(rad) for rad in anslutning.execute(sql, parametrar)]
+        finally:
+            anslutning.close()
+
+    def historik_för_användare(self, användare, gräns=100):
+        """De senaste svaren för en användare, nyast först."""
+
+        return self._fråga("SELECT * FROM svar WHERE användare = ? ORDER BY tid DESC LIMIT ?",
+                           (användare, gräns))
+
+    def historik_för_grundämne(self, atomnummer, läge=None, gräns=100):
+        """De senaste svaren som gäller ett grundämne, valfritt bara i ett läge, nyast först."""
+
+        if läge is None:
+            return self._fråga("SELECT * FROM svar WHERE atomnummer = ? ORDER BY tid DESC LIMIT ?",
+                               (atomnummer, gräns))
+        return self._fråga("SELECT * FROM svar WHERE atomnummer = ? AND läge = ? ORDER BY tid DESC LIMIT ?",
+                           (atomnummer, läge, gräns))
+
+    def sammanfattning_för_användare(self, användare):
+        """Antal svar och andel rätt per läge för en användare."""
+
+        return self._fråga("""SELECT läge, COUNT(*) AS antal, AVG(rätt) AS andel_rätt, AVG(försök) AS medel_försök
+                              FROM svar WHERE användare = ? GROUP BY läge ORDER BY läge""", (användare,))
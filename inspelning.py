@@ -0,0 +1,245 @@
+"""Inspelning och snabb uppspelning av träningssessioner.
+
+En Inspelare ger Träning (i p_uppgift.py och GUI.py) en slumpgenerator med känt frö och
+lindar in varje Träningssession som skapas, så att varje anrop som påverkar sessionen skrivs
+till en logg. Loggen är JSON Lines: först ett huvud med frö och inställningar, sedan en kort
+lista per händelse:
+
+    ["s", id, läge]                             ny session nummer id
+    ["f", id, atomnummer]                       nästa_fråga (atomnummer null när positionsläget är klart)
+    ["a", id, svar, utfall, ms]                 svara, med utfallet och millisekunder sedan frågan ställdes
+    ["ö", id, atomnummer, [alternativ, ...]]    ställ_fråga
+    ["å", id, [atomnummer, ...], rätt, fel]     återställ från en sparad positionsfil
+
+Eftersom all slump kommer från fröet och sessionerna skapas och anropas i samma ordning
+spelar spela_upp upp loggen helt utan terminal och fönster, i full fart, och kontrollerar
+att varje fråga och varje utfall blir desamma som när loggen spelades in. Slutar loggen på
+.gz komprimeras den med gzip.
+
+    python p_uppgift.py --spela-in session.jsonl
+    python inspelning.py session.jsonl --upprepningar 100
+"""
+
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+from collections import namedtuple
+
+from session import Träningssession, ANTAL_ALTERNATIV
+from repetition import skapa_schema
+
+
+FORMAT = 'periodiska-systemet-inspelning'
+VERSION = 1
+
+Avvikelse = namedtuple('Avvikelse', ['händelse', 'väntat', 'fick'])
+Avvikelse.__doc__ = """En händelse vars resultat inte blev detsamma vid uppspelningen som vid inspelningen:
+händelsens nummer i loggen (0 = första händelsen efter huvudet), inspelat och uppspelat värde."""
+
+Uppspelning = namedtuple('Uppspelning', ['sessioner', 'händelser', 'svar', 'sekunder', 'avvikelser'])
+Uppspelning.__doc__ = """Resultatet av spela_upp: antal sessioner, händelser och svar, tiden i sekunder
+för själva uppspelningen (utan inläsning av loggen) och en lista med Avvikelse."""
+
+
+def _öppna(filnamn, läge):
+    if str(filnamn).endswith('.gz'):
+        return gzip.open(filnamn, läge + 't', encoding="utf-8")
+    return open(filnamn, läge, encoding="utf-8")
+
+
+def _kodat_svar(svar):
+    return list(svar) if isinstance(svar, tuple) else svar
+
+
+class InspeladSession:
+    """Ombud för en Träningssession som skriver nästa_fråga, svara, ställ_fråga och återställ
+    till inspelarens logg. Allt annat läses direkt från den inlindade sessionen."""
+
+    __slots__ = ('session', 'inspelare', 'id')
+
+    def __init__(self, session, inspelare, id):
+        self.session = session
+        self.inspelare = inspelare
+        self.id = id
+
+    def __getattr__(self, namn):
+        return getattr(self.session, namn)
+
+    def nästa_fråga(self):
+        fråga = self.session.nästa_fråga()
+        atom = self.session.atom if fråga is not None else None
+        self.inspelare.skriv(["f", self.id, atom.atomnummer if atom else None])
+        return fråga
+
+    def ställ_fråga(self, rätt_index, alternativ=()):
+        fråga = self.session.ställ_fråga(rätt_index, alternativ)
+        self.inspelare.skriv(["ö", self.id, self.session.atom.atomnummer, list(fråga.alternativ)])
+        return fråga
+
+    def svara(self, svar):
+        ms = round((time.perf_counter() - self.session.frågetid) * 1000)
+        resultat = self.session.svara(svar)
+        self.inspelare.skriv(["a", self.id, _kodat_svar(svar), resultat.utfall, ms])
+        return resultat
+
+    def återställ(self, filnamn):
+        if not self.session.återställ(filnamn):
+            return False
+        self.inspelare.skriv(["å", self.id, [atom.atomnummer for atom in self.session.besvarade()],
+                              self.session.antal_rätt, self.session.antal_fel])
+        return True
+
+
+class Inspelare:
+    """Skriver en logg över alla Träningssessioner som skapas med spela_in().
+
+    slump är den random.Random som Träning ska använda; den sås med frö, eller med ett
+    slumpat frö som sparas i loggen om frö är None. Varje händelse skrivs och töms direkt till
+    filen så att loggen går att spela upp även om programmet kraschar."""
+
+    def __init__(self, filnamn, frö=None, repetition=False, antal_alternativ=ANTAL_ALTERNATIV):
+        self.frö = frö if frö is not None else random.randrange(2**32)
+        self.slump = random.Random(self.frö)
+        self.antal_sessioner = 0
+        self.fil = _öppna(filnamn, 'w')
+        self.skriv({'format': FORMAT, 'version': VERSION, 'frö': self.frö, 'repetition': repetition,
+                    'antal_alternativ': antal_alternativ})
+
+    def skriv(self, händelse):
+        self.fil.write(json.dumps(händelse, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self.fil.flush()
+
+    def spela_in(self, session):
+        """Registrerar en nyskapad session och returnerar ett InspeladSession-ombud för den."""
+
+        id = self.antal_sessioner
+        self.antal_sessioner += 1
+        self.skriv(["s", id, session.läge])
+        return InspeladSession(session, self, id)
+
+    def stäng(self):
+        self.fil.close()
+
+
+def läs_logg(filnamn):
+    """Läser en logg och returnerar (huvud, lista med händelser). Ger ValueError om filen
+    inte är en inspelning i ett format som stöds."""
+
+    with _öppna(filnamn, 'r') as fil:
+        try:
+            huvud = json.loads(fil.readline())
+        except ValueError:
+            huvud = None
+        if not isinstance(huvud, dict) or huvud.get('format') != FORMAT or huvud.get('version') != VERSION:
+            raise ValueError(f"{filnamn} är ingen inspelning")
+        return huvud, [json.loads(rad) for rad in fil if rad.strip()]
+
+
+def spela_upp(system, huvud, händelser):
+    """Spelar upp en inläst logg mot system och returnerar en Uppspelning.
+
+    Sessionerna skapas som Träning gör det, med samma frö, samma Repetitionsschema per läge
+    och samma antal alternativ, och händelserna körs i tur och ordning. Varje dragen fråga och
+    varje utfall jämförs med loggen; en avvikelse betyder att frågelogiken ändrats sedan
+    inspelningen."""
+
+    slump = random.Random(huvud['frö'])
+    antal_alternativ = huvud.get('antal_alternativ', ANTAL_ALTERNATIV)
+    scheman = {} if huvud.get('repetition') else None
+    rad = {nummer: i for i, nummer in enumerate(system.kolumn('atomnummer'))}
+    sessioner = []
+    avvikelser = []
+    antal_svar = 0
+    start = time.perf_counter()
+    for nummer, händelse in enumerate(händelser):
+        typ = händelse[0]
+        if typ == "s":
+            läge = händelse[2]
+            schema = None
+            if scheman is not None:
+                schema = scheman.get(läge)
+                if schema is None:
+                    schema = scheman[läge] = skapa_schema(system, läge, slump)
+            sessioner.append(Träningssession(system, läge, slump, antal_alternativ=antal_alternativ,
+                                             schema=schema))
+            continue
+        session = sessioner[händelse[1]]
+        if typ == "a":
+            antal_svar += 1
+            svar = händelse[2]
+            utfall = session.svara(tuple(svar) if isinstance(svar, list) else svar).utfall
+            if utfall != händelse[3]:
+                avvikelser.append(Avvikelse(nummer, händelse[3], utfall))
+        elif typ == "f":
+            fråga = session.nästa_fråga()
+            atomnummer = session.atom.atomnummer if fråga is not None else None
+            if atomnummer != händelse[2]:
+                avvikelser.append(Avvikelse(nummer, händelse[2], atomnummer))
+        elif typ == "ö":
+            session.ställ_fråga(rad[händelse[2]], händelse[3])
+        elif typ == "å":
+            session.återuppta([rad[atomnummer] for atomnummer in händelse[2]], händelse[3], händelse[4])
+        else:
+            raise ValueError(f"Okänd händelse {typ!r} i loggen")
+    return Uppspelning(len(sessioner), len(händelser), antal_svar, time.perf_counter() - start, avvikelser)
+
+
+def _positivt_heltal(text):
+    try:
+        värde = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"måste vara ett heltal, inte {text!r}") from None
+    if värde < 1:
+        raise argparse.ArgumentTypeError(f"måste vara minst 1, inte {värde}")
+    return värde
+
+
+def main(argv=None):
+    from p_uppgift import PeriodiskaSystemet, CACHEFIL
+
+    parser = argparse.ArgumentParser(
+        description="Spela upp inspelade träningssessioner och kontrollera att de ger samma frågor och utfall.")
+    parser.add_argument('loggar', nargs='+', metavar='LOGG', help="inspelning från --spela-in")
+    parser.add_argument('--upprepningar', type=_positivt_heltal, metavar='N', default=1,
+                        help="spela upp varje logg N gånger, t.ex. för att mäta genomströmningen (standard: 1)")
+    parser.add_argument('--cache', default=CACHEFIL,
+                        help=f"kompilerad cachefil för grundämnena (standard: {CACHEFIL})")
+    argument = parser.parse_args(argv)
+
+    system = PeriodiskaSystemet(cachefil=argument.cache)
+    loggar = []
+    for filnamn in argument.loggar:
+        try:
+            loggar.append((filnamn, *läs_logg(filnamn)))
+        except (OSError, ValueError) as fel:
+            parser.error(str(fel))
+
+    totalt_svar = 0
+    totalt_händelser = 0
+    totalt_sekunder = 0.0
+    antal_avvikande = 0
+    for filnamn, huvud, händelser in loggar:
+        for _ in range(argument.upprepningar):
+            resultat = spela_upp(system, huvud, händelser)
+            totalt_svar += resultat.svar
+            totalt_händelser += resultat.händelser
+            totalt_sekunder += resultat.sekunder
+        if resultat.avvikelser:
+            antal_avvikande += 1
+            print(f"{filnamn}: {len(resultat.avvikelser)} avvikelser, första vid händelse "
+                  f"{resultat.avvikelser[0].händelse}: väntade {resultat.avvikelser[0].väntat!r}, "
+                  f"fick {resultat.avvikelser[0].fick!r}")
+        else:
+            print(f"{filnamn}: {resultat.sessioner} sessioner, {resultat.svar} svar, inga avvikelser")
+    if totalt_sekunder > 0:
+        print(f"Spelade upp {totalt_händelser} händelser ({totalt_svar} svar) på {totalt_sekunder * 1000:.1f} ms: "
+              f"{totalt_händelser / totalt_sekunder:,.0f} händelser/s, {totalt_svar / totalt_sekunder:,.0f} svar/s")
+    if antal_avvikande:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Valfri mätning av antal anrop och latens för programmets heta vägar.
+
+Moduler anmäler sina mätpunkter med mätpunkt(klass, 'metod', ...). Så länge mätningen inte
+är aktiverad ändras ingenting, så det kostar ingenting. aktivera() byter ut de anmälda
+metoderna mot omslag som tar tiden med time.perf_counter_ns och lägger den i ett histogram
+per mätpunkt. Resultatet kan skrivas som JSON eller i Prometheus textformat."""
+
+import bisect
+import functools
+import json
+import sys
+import threading
+import time
+
+
+# Övre gränser (sekunder) för histogrammens hinkar; allt större hamnar i +Inf.
+GRÄNSER = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+           1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+FORMAT = ('json', 'prometheus')
+
+# Anmälda mätpunkter: namn -> (ägare, attribut, ursprunglig funktion).
+_mätpunkter = {}
+
+# Histogram per mätpunkt, skapas när mätningen aktiveras.
+histogram = {}
+
+_aktiv = False
+
+
+class Histogram:
+    """Antal anrop, total tid och antal anrop per hink i GRÄNSER för en mätpunkt.
+
+    Uppdateringarna görs under ett lås, eftersom mätpunkterna anropas både från GUI:ts
+    huvudtråd och från inläsningstråden."""
+
+    __slots__ = ('antal', 'summa', 'hinkar', '_lås')
+
+    def __init__(self):
+        self._lås = threading.Lock()
+        self.nollställ()
+
+    def nollställ(self):
+        with self._lås:
+            self.antal = 0
+            self.summa = 0.0
+            self.hinkar = [0] * (len(GRÄNSER) + 1)
+
+    def registrera(self, sekunder):
+        hink = bisect.bisect_left(GRÄNSER, sekunder)
+        with self._lås:
+            self.antal += 1
+            self.summa += sekunder
+            self.hinkar[hink] += 1
+
+    def kumulativa(self):
+        """Antal anrop som tagit högst respektive gräns i GRÄNSER, följt av totalen."""
+
+        with self._lås:
+            hinkar = list(self.hinkar)
+        summa = 0
+        resultat = []
+        for antal in hinkar:
+            summa += antal
+            resultat.append(summa)
+        return resultat
+
+
+def mätpunkt(ägare, *attribut):
+    """Anmäler metoderna (eller modulfunktionerna) attribut hos ägare som mätpunkter.
+    Mätpunkten heter 'Klass.metod' eller 'modul.funktion'."""
+
+    for namn in attribut:
+        punkt = f"{getattr(ägare, '__qualname__', ägare.__name__)}.{namn}"
+        _mätpunkter[punkt] = (ägare, namn, vars(ägare)[namn])
+        if _aktiv:
+            _installera(punkt)
+
+
+def _installera(punkt):
+    ägare, namn, funktion = _mätpunkter[punkt]
+    mätning = histogram.setdefault(punkt, Histogram())
+    klocka = time.perf_counter_ns
+
+    @functools.wraps(funktion)
+    def omslag(*argument, **nyckelargument):
+        start = klocka()
+        try:
+            return funktion(*argument, **nyckelargument)
+        finally:
+            mätning.registrera((klocka() - start) / 1e9)
+    setattr(ägare, namn, omslag)
+
+
+def aktivera():
+    """Börjar mäta alla anmälda mätpunkter (och de som anmäls senare)."""
+
+    global _aktiv
+    if not _aktiv:
+        _aktiv = True
+        for punkt in _mätpunkter:
+            _installera(punkt)
+
+
+def avaktivera():
+    """Slutar mäta och återställer de ursprungliga metoderna. Histogrammen behålls."""
+
+    global _aktiv
+    _aktiv = False
+    for ägare, namn, funktion in _mätpunkter.values():
+        setattr(ägare, namn, funktion)
+
+
+def nollställ():
+    """Tömmer alla histogram."""
+
+    for mätning in histogram.values():
+        mätning.nollställ()
+
+
+def som_json():
+    """Mätvärdena som en JSON-sträng med antal, summa, medel och hinkar per mätpunkt."""
+
+    data = {}
+    for punkt, mätning in sorted(histogram.items()):
+        data[punkt] = {
+            'antal': mätning.antal,
+            'summa_s': mätning.summa,
+            'medel_s': mätning.summa / mätning.antal if mätning.antal else 0.0,
+            'hinkar': {str(gräns): antal for gräns, antal in zip(GRÄNSER + ('+Inf',), mätning.kumulativa())},
+        }
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def som_prometheus():
+    """Mätvärdena i Prometheus textformat, som histogrammet periodiska_anrop_sekunder."""
+
+    rader = ["# HELP periodiska_anrop_sekunder Tid per anrop av mätpunkten.",
+             "# TYPE periodiska_anrop_sekunder histogram"]
+    for punkt, mätning in sorted(histogram.items()):
+        etikett = f'punkt="{punkt}"'
+        for gräns, antal in zip(GRÄNSER + ('+Inf',), mätning.kumulativa()):
+            rader.append(f'periodiska_anrop_sekunder_bucket{{{etikett},le="{gräns}"}} {antal}')
+        rader.append(f"periodiska_anrop_sekunder_sum{{{etikett}}} {mätning.summa!r}")
+        rader.append(f"periodiska_anrop_sekunder_count{{{etikett}}} {mätning.antal}")
+    return "\n".join(rader) + "\n"
+
+
+def skriv(filnamn, format='json'):
+    """Skriver mätvärdena till filnamn ('-' betyder standard ut) i format ur FORMAT."""
+
+    text = som_json() + "\n" if format == 'json' else som_prometheus()
+    if filnamn == '-':
+        sys.stdout.write(text)
+        return
+    with open(filnamn, 'w', encoding="utf-8") as fil:
+        fil.write(text)
@@ -0,0 +1,128 @@
+"""Lastgenerator för frågeservern i server.py.
+
+Öppnar många samtidiga anslutningar mot servern (som standard på localhost) och låter var
+och en ställa frågor och svara så fort den hinner under en bestämd tid: en förfrågan
+'fråga' följd av en förfrågan 'svara' med ett slumpvis valt alternativ. Tiden för varje
+förfrågan mäts med time.perf_counter_ns från att raden skickas tills svarsraden kommit, och
+till sist skrivs antal förfrågningar per sekund och latensens median, p95, p99 och max.
+
+    python server.py &
+    python lasttest.py --anslutningar 2000 --sekunder 10
+
+Med --starta-server startar lasttestet själv en server i en egen process och stänger den
+efteråt.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from array import array
+
+from server import VÄRD, PORT, höj_filgräns
+from session import LÄGEN, percentil
+
+
+async def klient(värd, port, läge, slut_ns, latenser, slump):
+    """En anslutning som frågar och svarar tills slut_ns. Returnerar antalet felsvar."""
+
+    läsare, skrivare = await asyncio.open_connection(värd, port)
+    klocka = time.perf_counter_ns
+    fråga = json.dumps({'kommando': 'fråga', 'läge': läge}, ensure_ascii=False).encode() + b"\n"
+    fel = 0
+    try:
+        while klocka() < slut_ns:
+            start = klocka()
+            skrivare.write(fråga)
+            svar = json.loads(await läsare.readline())
+            latenser.append(klocka() - start)
+            if 'fel' in svar:
+                fel += 1
+                continue
+            if svar['fråga'] is None:
+                continue
+            if svar['alternativ']:
+                val = slump.choice(svar['alternativ'])
+            else:
+                val = [slump.randint(1, 7), slump.randint(1, 18)]
+            start = klocka()
+            skrivare.write(json.dumps({'kommando': 'svara', 'läge': läge, 'svar': val},
+                                      ensure_ascii=False).encode() + b"\n")
+            svar = json.loads(await läsare.readline())
+            latenser.append(klocka() - start)
+            fel += 'fel' in svar
+    finally:
+        skrivare.close()
+    return fel
+
+
+async def kör_last(värd, port, anslutningar, sekunder, läge, frö=None):
+    """Kör lasttestet och returnerar (latenser i ns, antal felsvar, faktisk tid i sekunder)."""
+
+    slump = random.Random(frö)
+    latenser = array('q')
+    start = time.perf_counter_ns()
+    slut_ns = start + int(sekunder * 1e9)
+    resultat = await asyncio.gather(*(klient(värd, port, läge, slut_ns, latenser, slump)
+                                      for _ in range(anslutningar)), return_exceptions=True)
+    tid = (time.perf_counter_ns() - start) / 1e9
+    misslyckade = [r for r in resultat if isinstance(r, BaseException)]
+    if misslyckade:
+        print(f"{len(misslyckade)} anslutningar misslyckades, t.ex.: {misslyckade[0]!r}", file=sys.stderr)
+    return latenser, sum(r for r in resultat if not isinstance(r, BaseException)), tid
+
+
+async def starta_server(port):
+    """Startar server.py i en egen process och väntar tills den lyssnar."""
+
+    skript = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py')
+    process = await asyncio.create_subprocess_exec(sys.executable, skript, '--port', str(port),
+                                                   stdout=asyncio.subprocess.PIPE)
+    rad = await process.stdout.readline()
+    if not rad.startswith(b"Lyssnar"):
+        process.kill()
+        raise RuntimeError("Servern startade inte")
+    return process
+
+
+async def huvud(argument):
+    process = await starta_server(argument.port) if argument.starta_server else None
+    try:
+        return await kör_last(argument.värd, argument.port, argument.anslutningar, argument.sekunder,
+                              argument.läge, argument.frö)
+    finally:
+        if process is not None:
+            process.terminate()
+            await process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Belasta frågeservern och mät genomströmning och latens.")
+    parser.add_argument('--värd', default=VÄRD, help=f"serverns adress (standard: {VÄRD})")
+    parser.add_argument('--port', type=int, default=PORT, help=f"serverns port (standard: {PORT})")
+    parser.add_argument('--anslutningar', type=int, metavar='N', default=1000,
+                        help="antal samtidiga anslutningar (standard: 1000)")
+    parser.add_argument('--sekunder', type=float, default=10.0, help="hur länge lasten pågår (standard: 10)")
+    parser.add_argument('--läge', choices=LÄGEN, default='namn', help="träningsläge att fråga i (standard: namn)")
+    parser.add_argument('--frö', type=int, default=None, help="frö för klienternas val av svar")
+    parser.add_argument('--starta-server', action='store_true',
+                        help="starta server.py i en egen process under testet")
+    argument = parser.parse_args(argv)
+
+    höj_filgräns()
+    latenser, fel, tid = asyncio.run(huvud(argument))
+    if not latenser:
+        print("Inga förfrågningar besvarades")
+        sys.exit(1)
+    tider = sorted(latenser)
+    print(f"{len(tider)} förfrågningar på {tid:.2f} s över {argument.anslutningar} anslutningar: "
+          f"{len(tider) / tid:,.0f} förfrågningar/s, {fel} felsvar")
+    print(f"Latens: p50 {percentil(tider, 0.50) / 1e6:.2f} ms, p95 {percentil(tider, 0.95) / 1e6:.2f} ms, "
+          f"p99 {percentil(tider, 0.99) / 1e6:.2f} ms, max {tider[-1] / 1e6:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
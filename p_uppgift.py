@@ -1,77 +1,665 @@
 import random
 import itertools
+import bisect
+import argparse
+import contextlib
+import getpass
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import sys
+import unicodedata
+import uuid
+import zlib
+from array import array
 
+from tabeller import Tabell
+from session import (Träningssession, LÄGEN, RÄTT, FEL, OGILTIG, ANTAL_ALTERNATIV, MIN_ALTERNATIV,
+                     MAX_ALTERNATIV)
+from repetition import skapa_schema
+from framsteg import Framstegslager, FRAMSTEGSFIL
+import instrumentering
+import batch
+import inspelning
+
+
+
+CACHEFIL = 'periodiska_systemet.bin'
+
+# Hur många slumpvisa dragningar per saknat alternativ distraktorer gör i en grupp eller period.
+FÖRSÖK_PER_ALTERNATIV = 3
+
+# Huvud i cachefilen: magiskt värde, version, antal atomer, fingeravtryck (mtime_ns, storlek,
+# sha256) för båda källfilerna, längd på text-blocken för beteckningar och namn samt crc32
+# över resten av filen. Därefter följer kolumnerna massa, atomnummer, period, grupp och texten.
+_CACHE_MAGI = b'PSYS'
+_CACHE_VERSION = 1
+_CACHE_HUVUD = struct.Struct('<4sHIqq32sqq32sIII')
+_CACHE_START = (_CACHE_HUVUD.size + 7) // 8 * 8
+
+
+def källfingeravtryck(filnamn):
+    """Returnerar (mtime_ns, storlek, sha256) för en källfil; används för att ogiltigförklara cachen."""
+
+    info = os.stat(filnamn)
+    summa = hashlib.sha256()
+    with open(filnamn, 'rb') as fil:
+        for block in iter(lambda: fil.read(1 << 20), b""):
+            summa.update(block)
+    return info.st_mtime_ns, info.st_size, summa.digest()
+
+
+_KOMMA_TILL_PUNKT = str.maketrans(",", ".")
+
+
+def normalisera(text):
+    """Gör om text till gemener utan accenter och prickar (t.ex. "Järn" -> "jarn") för sökning."""
+
+    return "".join(tecken for tecken in unicodedata.normalize('NFKD', text.casefold())
+                   if not unicodedata.combining(tecken))
+
+
+def _bigram(text):
+    """Bokstavspar i text, med ett mellanslag först så att första bokstaven också ger ett par."""
+
+    text = " " + text
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def redigeringsavstånd(a, b, gräns=None):
+    """Levenshtein-avståndet mellan a och b. Om gräns anges avbryts beräkningen när avståndet
+    säkert är större än gräns, och då returneras gräns + 1."""
+
+    if len(a) < len(b):
+        a, b = b, a
+    föregående = list(range(len(b) + 1))
+    for i, tecken_a in enumerate(a, 1):
+        aktuell = [i]
+        for j, tecken_b in enumerate(b, 1):
+            aktuell.append(min(föregående[j] + 1, aktuell[j - 1] + 1,
+                               föregående[j - 1] + (tecken_a != tecken_b)))
+        if gräns is not None and min(aktuell) > gräns:
+            return gräns + 1
+        föregående = aktuell
+    return föregående[-1]
+
+
+class Inläsningsfel(ValueError):
+    """En felaktig rad i en datafil, med filnamn och radnummer (räknat från 1)."""
+
+    def __init__(self, filnamn, radnummer, orsak, rad=""):
+        super().__init__(f"{filnamn}:{radnummer}: {orsak}: {rad.strip()!r}")
+        self.filnamn = filnamn
+        self.radnummer = radnummer
+        self.orsak = orsak
+
+
+def _tolka_position(fält, filnamn, radnummer, rad):
+    """Tolkar [period, grupp] från en rad i positionsfilen. Tom lista betyder okänd position."""
+
+    if not fält:
+        return None, None
+    if len(fält) != 2:
+        raise Inläsningsfel(filnamn, radnummer, "förväntade period och grupp", rad)
+    try:
+        period, grupp = int(fält[0]), int(fält[1])
+    except ValueError:
+        raise Inläsningsfel(filnamn, radnummer, "period och grupp måste vara heltal", rad) from None
+    if not (1 <= period <= 7 and 1 <= grupp <= 18):
+        raise Inläsningsfel(filnamn, radnummer, "period eller grupp utanför tabellen", rad)
+    return period, grupp
+
+
+def _tolka_atomrad(fält, filnamn, radnummer, rad):
+    """Tolkar beteckning, namn, atomnummer och massa från en rad i huvudfilen."""
+
+    if len(fält) < 4:
+        raise Inläsningsfel(filnamn, radnummer, "förväntade beteckning, namn, atomnummer och massa", rad)
+    try:
+        return fält[0], fält[1], int(fält[2]), float(fält[3].translate(_KOMMA_TILL_PUNKT))
+    except ValueError:
+        raise Inläsningsfel(filnamn, radnummer, "atomnummer eller massa är inte ett tal", rad) from None
+
+
+def _läs_positioner_med_nyckel(extra_filnamn, felhantering):
+    """Läser en positionsfil där varje rad börjar med beteckning eller atomnummer.
+    Returnerar en dict från nyckel (som text) till (period, grupp)."""
+
+    positioner = {}
+    with open(extra_filnamn, 'r', encoding="utf-8") as fil:
+        for radnummer, rad in enumerate(fil, 1):
+            fält = rad.split()
+            if not fält:
+                continue
+            try:
+                if fält[0] in positioner:
+                    raise Inläsningsfel(extra_filnamn, radnummer, f"{fält[0]} finns redan", rad)
+                positioner[fält[0]] = _tolka_position(fält[1:], extra_filnamn, radnummer, rad)
+            except Inläsningsfel as fel:
+                felhantering(fel)
+    return positioner
+
+
+def _har_nyckelkolumn(extra_filnamn):
+    """Avgör formatet på positionsfilen från första icke-tomma raden: tre fält (nyckel, period,
+    grupp) betyder nyckelformat, annars paras raderna ihop med huvudfilen efter position."""
+
+    with open(extra_filnamn, 'r', encoding="utf-8") as fil:
+        for rad in fil:
+            fält = rad.split()
+            if fält:
+                return len(fält) == 3
+    return False
+
+
+def _höj_fel(fel):
+    raise fel
+
+
+def läs_atomposter(filnamn, extra_filnamn, felhantering=None):
+    """Generator som läser huvudfilen rad för rad och ger en post per grundämne eller isotop:
+    (beteckning, namn, atomnummer, massa, period, grupp), där period och grupp kan vara None.
+
+    Positionsfilen kan antingen ha en nyckel först på varje rad (beteckning eller atomnummer,
+    t.ex. "Fe 4 8" eller "26 4 8") och kopplas då ihop med huvudfilen på nyckel, så att
+    ordningen inte spelar roll och flera isotoper kan dela samma atomnummer. Annars paras
+    raderna ihop efter position och det rapporteras som fel om filerna har olika längd.
+
+    Felaktiga rader skickas som Inläsningsfel till felhantering och hoppas över; utan
+    felhantering höjs felet. Huvudfilen hålls aldrig i minnet i sin helhet."""
+
+    felhantering = felhantering or _höj_fel
+    if _har_nyckelkolumn(extra_filnamn):
+        positioner = _läs_positioner_med_nyckel(extra_filnamn, felhantering)
+        with open(filnamn, 'r', encoding="utf-8") as fil:
+            for radnummer, rad in enumerate(fil, 1):
+                fält = rad.split()
+                if not fält:
+                    continue
+                try:
+                    beteckning, namn, atomnummer, massa = _tolka_atomrad(fält, filnamn, radnummer, rad)
+                except Inläsningsfel as fel:
+                    felhantering(fel)
+                    continue
+                period, grupp = positioner.get(beteckning) or positioner.get(str(atomnummer)) or (None, None)
+                yield beteckning, namn, atomnummer, massa, period, grupp
+        return
+
+    with (open(filnamn, 'r', encoding="utf-8") as file1,
+          open(extra_filnamn, 'r', encoding="utf-8") as file2):
+        for radnummer, (rad1, rad2) in enumerate(itertools.zip_longest(file1, file2), 1):
+            if rad1 is None:
+                if rad2.strip():
+                    felhantering(Inläsningsfel(extra_filnamn, radnummer, f"saknar motsvarande rad i {filnamn}", rad2))
+                continue
+            fält = rad1.split()
+            if not fält:
+                if rad2 is not None and rad2.strip():
+                    felhantering(Inläsningsfel(filnamn, radnummer, "tom rad där positionsfilen har data", rad1))
+                continue
+            try:
+                if rad2 is None:
+                    raise Inläsningsfel(extra_filnamn, radnummer, f"filen är kortare än {filnamn}")
+                beteckning, namn, atomnummer, massa = _tolka_atomrad(fält, filnamn, radnummer, rad1)
+                period, grupp = _tolka_position(rad2.split(), extra_filnamn, radnummer, rad2)
+            except Inläsningsfel as fel:
+                felhantering(fel)
+                continue
+            yield beteckning, namn, atomnummer, massa, period, grupp
+
+
+def _kolumnvy(egenskap):
+    """Skapar en property som läser egenskap för atomens rad i systemets kolumner."""
+
+    def läs(self):
+        return self._kolumner[egenskap][self._index]
+    return property(läs)
+
+
+def _positionsvy(egenskap):
+    """Som _kolumnvy men för period och grupp, där 0 i kolumnen betyder att värdet saknas."""
+
+    def läs(self):
+        return self._kolumner[egenskap][self._index] or None
+    return property(läs)
 
 
 class Atom:
     """Representerar ett grundämne med dess viktigaste egenskaper såsom namn, beteckning,
-    atomnummer, massa, period och grupp."""
+    atomnummer, massa, period och grupp.
+
+    Objektet är en lätt vy (__slots__) över rad index i PeriodiskaSystemets kolumner och
+    lagrar inga egna värden."""
+
+    __slots__ = ('_kolumner', '_index')
+
+    def __init__(self, kolumner, index):
+        self._kolumner = kolumner
+        self._index = index
+
+    @property
+    def index(self):
+        """Atomens rad i PeriodiskaSystemets kolumner och i listan atomer."""
 
-    def __init__(self, beteckning, namn, atomnummer, massa, period, grupp):
-        self.beteckning = beteckning
-        self.namn = namn
-        self.atomnummer = atomnummer
-        self.massa = massa
-        self.period = period
-        self.grupp = grupp
+        return self._index
+
+    beteckning = _kolumnvy('beteckning')
+    namn = _kolumnvy('namn')
+    atomnummer = _kolumnvy('atomnummer')
+    massa = _kolumnvy('massa')
+    period = _positionsvy('period')
+    grupp = _positionsvy('grupp')
 
 class PeriodiskaSystemet:
     """Läser in och lagrar information om grundämnen från textfiler och erbjuder möjligheten
-    att söka efter ett visst grundämne via namn eller beteckning."""
-
-    def __init__(self, filnamn='avikt.txt', extra_filnamn='period_group.txt'):
+    att söka efter ett visst grundämne via namn eller beteckning.
+
+    Datan lagras kolumnvis i self.kolumner, en sammanhängande array (eller lista för text)
+    per egenskap. Period och grupp lagras som 0 när de saknas. self.atomer innehåller
+    Atom-vyer över raderna.
+
+    Extra datamängder, t.ex. namn på andra språk eller en isotoptabell, är tabellfiler (se
+    tabeller.py) som minnesmappas skrivskyddat och delas mellan alla processer som läser dem."""
+
+    def __init__(self, filnamn='avikt.txt', extra_filnamn='period_group.txt', cachefil=None, datamängder=None):
+        """Läser in datan. Om cachefil anges läses den kompilerade binärfilen in i stället
+        för textfilerna när den är giltig, annars tolkas textfilerna och cachen skrivs om.
+        datamängder mappar namn till tabellfiler som registreras med registrera_datamängd."""
+
+        self.kolumner = {
+            'beteckning': [],
+            'namn': [],
+            'atomnummer': array('i'),
+            'massa': array('d'),
+            'period': array('b'),
+            'grupp': array('b'),
+        }
         self.atomer=[]
-        self.läs_in_data(filnamn, extra_filnamn)
-
-    def läs_in_data(self, filnamn, extra_filnamn):
-        """Läser in data från två textfiler och skapar Atom-objekt som lagras i listan atomer.
-        Fil 1 innehåller allmän information och fil 2 innehåller period- och gruppdata."""
-
-        with (open(filnamn, 'r', encoding="utf-8") as file1, 
-            open(extra_filnamn, 'r', encoding="utf-8") as file2, 
-            ):
-            for rad1, rad2 in itertools.zip_longest(file1, file2, fillvalue=""):
-                komma_till_pukt = str.maketrans(",", ".")
-                rad1 = rad1.rstrip("\n")
-                rad2 = rad2.rstrip("\n")
-                en_atom = (rad1 + " " + rad2).split()
-                if len(en_atom) >= 6:
-                    atom = Atom(
-                        beteckning=en_atom[0],
-                        namn=en_atom[1],
-                        atomnummer=int(en_atom[2]),
-                        massa=float(en_atom[3].translate(komma_till_pukt)),
-                        period=int(en_atom[4]),
-                        grupp=int(en_atom[5])
-                    )
-                else:
-                    atom = Atom(
-                        beteckning=en_atom[0],
-                        namn=en_atom[1],
-                        atomnummer=int(en_atom[2]),
-                        massa=float(en_atom[3].translate(komma_till_pukt)),
-                        period=None,
-                        grupp=None
-                    )
-                self.atomer.append(atom)
-
+        self.datamängder = {}
+        for namn, tabellfil in (datamängder or {}).items():
+            self.registrera_datamängd(namn, tabellfil)
+        if cachefil is None or not self.läs_in_cache(cachefil, filnamn, extra_filnamn):
+            self.läs_in_data(filnamn, extra_filnamn)
+            if cachefil is not None:
+                try:
+                    self.skriv_cache(cachefil, filnamn, extra_filnamn)
+                except OSError:
+                    pass
+        self.bygg_index()
+
+    def __len__(self):
+        return len(self.atomer)
+
+    def kolumn(self, egenskap):
+        """Returnerar hela kolumnen för egenskap, i samma ordning som self.atomer.
+        Period och grupp innehåller 0 där värdet saknas."""
+
+        return self.kolumner[egenskap]
+
+    def registrera_datamängd(self, namn, tabellfil):
+        """Minnesmappar tabellfilen och gör den tillgänglig som datamängd(namn).
+        Ger ValueError om filen inte är en giltig tabellfil."""
+
+        self.datamängder[namn] = Tabell(tabellfil)
+        return self.datamängder[namn]
+
+    def datamängd(self, namn):
+        """Den registrerade datamängden namn som en tabeller.Tabell."""
+
+        return self.datamängder[namn]
+
+    def uppslag(self, namn, atom):
+        """Raderna i datamängden namn som hör till atom, som dicts. Datamängden måste ha
+        atomnummer som nyckelkolumn och slås upp med binärsökning."""
+
+        tabell = self.datamängder[namn]
+        return [tabell.rad(i) for i in tabell.rader(atom.atomnummer)]
+
+    def lägg_till_atom(self, beteckning, namn, atomnummer, massa, period, grupp):
+        """Lägger till en rad i kolumnerna och returnerar Atom-vyn för den."""
+
+        kolumner = self.kolumner
+        kolumner['beteckning'].append(beteckning)
+        kolumner['namn'].append(namn)
+        kolumner['atomnummer'].append(atomnummer)
+        kolumner['massa'].append(massa)
+        kolumner['period'].append(period or 0)
+        kolumner['grupp'].append(grupp or 0)
+        atom = Atom(kolumner, len(self.atomer))
+        self.atomer.append(atom)
+        return atom
+
+    def läs_in_data(self, filnamn, extra_filnamn, felhantering=None):
+        """Läser in data från två textfiler och lägger till en rad per grundämne i kolumnerna.
+        Fil 1 innehåller allmän information och fil 2 innehåller period- och gruppdata.
+        Raderna läses strömmande via läs_atomposter, se den för format och felhantering."""
+
+        lägg_till_atom = self.lägg_till_atom
+        for post in läs_atomposter(filnamn, extra_filnamn, felhantering):
+            lägg_till_atom(*post)
+
+    def skriv_cache(self, cachefil, filnamn, extra_filnamn):
+        """Kompilerar de inlästa kolumnerna till en binärfil som läs_in_cache kan minnesmappa.
+        Filen skrivs först till en temporär fil och byts sedan in atomärt."""
+
+        kolumner = self.kolumner
+        beteckningar = "\0".join(kolumner['beteckning']).encode("utf-8")
+        namn = "\0".join(kolumner['namn']).encode("utf-8")
+        data = b"".join([
+            array('d', kolumner['massa']).tobytes(),
+            array('i', kolumner['atomnummer']).tobytes(),
+            array('b', kolumner['period']).tobytes(),
+            array('b', kolumner['grupp']).tobytes(),
+            beteckningar,
+            namn,
+        ])
+        huvud = _CACHE_HUVUD.pack(
+            _CACHE_MAGI, _CACHE_VERSION, len(self.atomer),
+            *källfingeravtryck(filnamn), *källfingeravtryck(extra_filnamn),
+            len(beteckningar), len(namn), zlib.crc32(data),
+        )
+        tillfällig = f"{cachefil}.{os.getpid()}.tmp"
+        with open(tillfällig, 'wb') as fil:
+            fil.write(huvud.ljust(_CACHE_START, b"\0"))
+            fil.write(data)
+        os.replace(tillfällig, cachefil)
+
+    def läs_in_cache(self, cachefil, filnamn, extra_filnamn):
+        """Minnesmappar en cachefil skriven av skriv_cache och använder den som kolumner.
+
+        De numeriska kolumnerna blir skrivskyddade memoryview-objekt direkt över filen.
+        Returnerar False (utan att ändra något) om filen saknas, är trasig eller om någon
+        källfils mtime eller innehåll har ändrats sedan cachen skrevs."""
+
+        try:
+            with open(cachefil, 'rb') as fil:
+                karta = mmap.mmap(fil.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            (magi, version, antal, *fingeravtryck,
+             längd_beteckningar, längd_namn, crc) = _CACHE_HUVUD.unpack_from(karta)
+            slut = _CACHE_START + 14 * antal + längd_beteckningar + längd_namn
+            giltig = (magi == _CACHE_MAGI and version == _CACHE_VERSION
+                      and tuple(fingeravtryck[:3]) == källfingeravtryck(filnamn)
+                      and tuple(fingeravtryck[3:]) == källfingeravtryck(extra_filnamn)
+                      and len(karta) == slut and zlib.crc32(karta[_CACHE_START:]) == crc)
+        except (OSError, struct.error):
+            giltig = False
+        if not giltig:
+            karta.close()
+            return False
+
+        vy = memoryview(karta)
+        position = _CACHE_START
+        kolumner = {}
+        for egenskap, typ, storlek in (('massa', 'd', 8), ('atomnummer', 'i', 4),
+                                       ('period', 'b', 1), ('grupp', 'b', 1)):
+            kolumner[egenskap] = vy[position:position + storlek * antal].cast(typ)
+            position += storlek * antal
+        for egenskap, längd in (('beteckning', längd_beteckningar), ('namn', längd_namn)):
+            kolumner[egenskap] = str(vy[position:position + längd], "utf-8").split("\0") if antal else []
+            position += längd
+
+        self._cache_karta = karta
+        self.kolumner.update(kolumner)
+        self.atomer = [Atom(self.kolumner, i) for i in range(antal)]
+        return True
+
+    def bygg_index(self):
+        """Bygger uppslagsindex över atomerna en gång efter inläsningen.
+
+        _index mappar beteckning och namn (casefold) till Atom-objekt, _nummer_index mappar
+        atomnummer till Atom-objekt och _prefix_nycklar är de sorterade nycklarna i _index
+        som används för sökning på början av ett namn eller en beteckning. Vid krockar vinner
+        den atom som kommer först i self.atomer, precis som vid den tidigare linjära sökningen.
+
+        Här räknas också frågepoolerna och svarstexterna per träningsläge ut (se frågepool och
+        svarstexter), så att de delas av alla sessioner i stället för att byggas per fråga, och
+        indexen som distraktorer använder: _ordning[egenskap] är atomindexen sorterade efter
+        massa respektive atomnummer, _rang[egenskap][i] är atom i:s plats i den ordningen och
+        _grupper och _perioder mappar grupp och period till atomindexen i dem."""
+
+        n = len(self.atomer)
+        perioder, grupper = self.kolumner['period'], self.kolumner['grupp']
+        self._frågepooler = {läge: range(n) for läge in LÄGEN}
+        self._frågepooler['position'] = tuple(i for i in range(n) if perioder[i] and grupper[i])
+        self._svarstexter = {läge: tuple(map(str, self.kolumner[läge])) for läge in LÄGEN if läge != 'position'}
+        self._ordning = {}
+        self._rang = {}
+        for egenskap in ('massa', 'atomnummer'):
+            kolumn = self.kolumner[egenskap]
+            ordning = array('i', sorted(range(n), key=kolumn.__getitem__))
+            rang = array('i', bytes(4 * n))
+            for plats, i in enumerate(ordning):
+                rang[i] = plats
+            self._ordning[egenskap] = ordning
+            self._rang[egenskap] = rang
+        self._grupper = {}
+        self._perioder = {}
+        for i in range(n):
+            if grupper[i]:
+                self._grupper.setdefault(grupper[i], array('i')).append(i)
+            if perioder[i]:
+                self._perioder.setdefault(perioder[i], array('i')).append(i)
+
+        self._index = {}
+        self._nummer_index = {}
+        for atom in self.atomer:
+            self._index.setdefault(atom.beteckning.casefold(), atom)
+            self._index.setdefault(atom.namn.casefold(), atom)
+            self._nummer_index.setdefault(atom.atomnummer, atom)
+        self._prefix_nycklar = sorted(self._index)
+        self._sök_nycklar = None
+
+    def frågepool(self, läge):
+        """Oföränderlig sekvens med index för de atomer som kan frågas om i läge: alla atomer
+        i flervalslägena och atomerna med både period och grupp i positionsläget."""
+
+        return self._frågepooler[läge]
+
+    def svarstexter(self, läge):
+        """Tuple med svaret på flervalsläget läge som text för varje atom, i samma ordning som
+        self.atomer."""
+
+        return self._svarstexter[läge]
+
+    def distraktorer(self, läge, i, antal, slump=random):
+        """Väljer antal felaktiga men rimliga svarsalternativ till atom i i flervalsläget läge
+        och returnerar deras atomindex som en lista.
+
+        För massa och atomnummer tas alternativen bland de antal närmaste grannarna åt varje
+        håll i sorteringsordningen. För namn och beteckning dras de slumpvis ur samma grupp och
+        sedan samma period, högst FÖRSÖK_PER_ALTERNATIV gånger per alternativ och hink, så att
+        inget kopieras eller blandas. Räcker de inte fylls det på med slumpvisa atomer.
+        Alternativen har alltid olika svarstext, så tiden beror bara på antal och varken på
+        hinkarnas storlek eller på antalet grundämnen."""
+
+        texter = self._svarstexter[läge]
+        valda = []
+        använda = {texter[i]}
+        if läge in self._rang:
+            plats = self._rang[läge][i]
+            grannar = self._ordning[läge][max(0, plats - antal):plats + 1 + antal]
+            for j in slump.sample(grannar, len(grannar)):
+                if len(valda) == antal:
+                    break
+                if texter[j] not in använda:
+                    använda.add(texter[j])
+                    valda.append(j)
+        else:
+            for hink in (self._grupper.get(self.kolumner['grupp'][i]), self._perioder.get(self.kolumner['period'][i])):
+                if not hink:
+                    continue
+                for _ in range(FÖRSÖK_PER_ALTERNATIV * (antal - len(valda))):
+                    j = hink[slump.randrange(len(hink))]
+                    if texter[j] not in använda:
+                        använda.add(texter[j])
+                        valda.append(j)
+                        if len(valda) == antal:
+                            break
+        while len(valda) < antal:
+            j = slump.randrange(len(texter))
+            if texter[j] not in använda:
+                använda.add(texter[j])
+                valda.append(j)
+        return valda
+
+    def _slå_upp(self, sokterm):
+        """Slår upp en sökterm (beteckning, namn eller atomnummer) i indexen utan utskrift."""
+
+        nyckel = sokterm.strip().casefold()
+        atom = self._index.get(nyckel)
+        if atom is None and nyckel.isdigit():
+            atom = self._nummer_index.get(int(nyckel))
+        return atom
 
     def hitta_atom(self, sokterm):
-        """Söker efter ett grundämne baserat på namn eller beteckning.
+        """Söker efter ett grundämne baserat på namn, beteckning eller atomnummer.
         Returnerar motsvarande Atom-objekt eller None om inget hittas."""
 
+        return self._slå_upp(sokterm)
+
+    def hitta_atomer(self, sokterm_lista):
+        """Söker upp många söktermer i ett anrop, t.ex. när svarsblad rättas.
+        Returnerar en lista i samma ordning som sokterm_lista med Atom-objekt eller None."""
+
+        slå_upp = self._slå_upp
+        return [slå_upp(sokterm) for sokterm in sokterm_lista]
+
+    def hitta_atomer_med_prefix(self, prefix):
+        """Returnerar alla atomer vars namn eller beteckning börjar med prefix (utan dubbletter),
+        i bokstavsordning efter den matchande nyckeln."""
+
+        prefix = prefix.strip().casefold()
+        nycklar = self._prefix_nycklar
+        träffar = []
+        sedda = set()
+        for i in range(bisect.bisect_left(nycklar, prefix), len(nycklar)):
+            nyckel = nycklar[i]
+            if not nyckel.startswith(prefix):
+                break
+            atom = self._index[nyckel]
+            if id(atom) not in sedda:
+                sedda.add(id(atom))
+                träffar.append(atom)
+        return träffar
+
+    def bygg_sökindex(self):
+        """Bygger indexet för föreslå: normaliserade nycklar (beteckning och namn utan accenter),
+        sorterade för prefixsökning, och ett bigram-index från bokstavspar till nyckelnummer.
+        Gör ingenting om indexet redan finns; annars byggs det senast när föreslå anropas."""
+
+        if self._sök_nycklar is not None:
+            return
+        nycklar = []
         for atom in self.atomer:
-           if atom.beteckning.lower() == sokterm.lower() or atom.namn.lower() == sokterm.lower():
-               return atom
-        print("Den sökta atomen finns inte")
-        return None
+            nycklar.append((normalisera(atom.beteckning), atom.index))
+            nycklar.append((normalisera(atom.namn), atom.index))
+        nycklar.sort()
+        bigram_index = {}
+        for nummer, (nyckel, _) in enumerate(nycklar):
+            for bigram in set(_bigram(nyckel)):
+                bigram_index.setdefault(bigram, []).append(nummer)
+        self._sök_nycklar = nycklar
+        self._sök_texter = [nyckel for nyckel, _ in nycklar]
+        self._bigram_index = bigram_index
+
+    def föreslå(self, sokterm, antal=8, max_kandidater=64):
+        """Returnerar upp till antal atomer som liknar sokterm, bäst först.
+
+        Versaler och accenter ignoreras, så "jarn" hittar Järn. Nycklar som börjar med söktermen
+        kommer först; övriga kandidater hämtas via bigram-indexet (högst max_kandidater med
+        flest gemensamma bokstavspar) och rangordnas efter redigeringsavståndet mellan söktermen
+        och nyckelns början och därefter antalet gemensamma bokstavspar, så att felstavningar
+        som "slver" också ger träff."""
+
+        fråga = normalisera(sokterm.strip())
+        if not fråga:
+            return []
+        self.bygg_sökindex()
+        texter = self._sök_texter
+        kandidater = {}
+        for nummer in range(bisect.bisect_left(texter, fråga), len(texter)):
+            if not texter[nummer].startswith(fråga) or len(kandidater) >= max_kandidater:
+                break
+            kandidater[nummer] = (0, 0, 0, len(texter[nummer]))
+        gemensamma = {}
+        for bigram in set(_bigram(fråga)):
+            for nummer in self._bigram_index.get(bigram, ()):
+                gemensamma[nummer] = gemensamma.get(nummer, 0) + 1
+        gräns = max(1, len(fråga) // 2)
+        for nummer in heapq.nlargest(max_kandidater, gemensamma, key=gemensamma.__getitem__):
+            if nummer in kandidater:
+                continue
+            text = texter[nummer]
+            avstånd = min(redigeringsavstånd(fråga, text[:längd], gräns)
+                          for längd in (len(fråga) - 1, len(fråga), len(fråga) + 1))
+            if avstånd <= gräns:
+                kandidater[nummer] = (1, avstånd, -gemensamma[nummer], redigeringsavstånd(fråga, text))
+        förslag = []
+        sedda = set()
+        for nummer in sorted(kandidater, key=lambda n: (kandidater[n], texter[n])):
+            index = self._sök_nycklar[nummer][1]
+            if index not in sedda:
+                sedda.add(index)
+                förslag.append(self.atomer[index])
+                if len(förslag) == antal:
+                    break
+        return förslag
+
+instrumentering.mätpunkt(PeriodiskaSystemet, 'läs_in_data', 'läs_in_cache', 'bygg_index', 'hitta_atom')
 
 class Träning:
     """Hantera olika träningslägen och frågesporter baserade på information från det
     periodiska systemet."""
 
-    def __init__(self, system):
+    def __init__(self, system, slump=None, repetition=False, framsteg=None, användare=None,
+                 antal_alternativ=ANTAL_ALTERNATIV, inspelare=None):
         self.system = system
+        self.slump = slump
+        self.antal_alternativ = antal_alternativ
+        self.scheman = {} if repetition else None
+        self.framsteg = framsteg
+        self.användare = användare or getpass.getuser()
+        self.körning = uuid.uuid4().hex
+        self.inspelare = inspelare
+        self.sessioner = {}
+
+    def skapa_session(self, läge):
+        """Skapar en Träningssession för läge. Med spridd repetition återanvänds ett
+        Repetitionsschema per läge så att grundämnen man redan kan kommer mer sällan.
+        Med en inspelare skrivs sessionen till dess logg (se inspelning.py)."""
+
+        schema = None
+        if self.scheman is not None:
+            schema = self.scheman.get(läge)
+            if schema is None:
+                schema = self.scheman[läge] = skapa_schema(self.system, läge, self.slump)
+        lyssnare = self.registrera_svar if self.framsteg is not None else None
+        session = Träningssession(self.system, läge, self.slump, antal_alternativ=self.antal_alternativ,
+                                  schema=schema, lyssnare=lyssnare)
+        if self.inspelare is not None:
+            session = self.inspelare.spela_in(session)
+        return session
+
+    def session_för(self, läge):
+        """Returnerar Träningssessionen för läge. Den återanvänds för alla frågor i läget, så
+        en ny fråga bygger inget som växer med antalet grundämnen. När positionsläget har gått
+        igenom alla grundämnen börjar en ny session."""
+
+        session = self.sessioner.get(läge)
+        if session is None or session.klar:
+            session = self.sessioner[läge] = self.skapa_session(läge)
+        return session
+
+    def registrera_svar(self, session, rätt, försök, latens):
+        """Sparar en färdigbesvarad fråga i framstegslagret."""
+
+        self.framsteg.registrera(self.användare, self.körning, session.atom.atomnummer,
+                                 session.läge, rätt, försök, latens)
 
     def starta_träning(self, träningstyp):
         """Startar valt träningsläge och återvänder till menyn tills användaren avslutar."""
@@ -83,6 +671,8 @@ class Träning:
                 atom = self.system.hitta_atom(hitta_atom)
                 if atom:
                     print(f"{atom.beteckning} | {atom.namn} | {atom.atomnummer} | {atom.massa} | {atom.period} | {atom.grupp}")
+                else:
+                    print("Den sökta atomen finns inte")
             elif träningstyp in ['atomnummer', 'beteckning', 'namn', 'massa']:
                 self.frågor_om_atom_egenskaper(träningstyp)
             elif träningstyp == 'position':
@@ -106,94 +696,72 @@ class Träning:
             print("------------------------------------------------")
 
     def frågor_om_atom_egenskaper(self, egenskap):
-        """Ställer en fråga med tre svarsalternativ där användaren ska välja rätt atomnummer/beteckning/namn/massa."""
-
-        atomlist = self.system.atomer.copy()
-        aktuell_lista = random.sample(atomlist, 3)
-        rätt_atom = random.choice(aktuell_lista)
-
-        if egenskap == 'atomnummer':
-            fråga = f"Vilket atomnummer har {rätt_atom.namn} ({rätt_atom.beteckning})?"
-        elif egenskap == 'beteckning':
-            fråga = f"Vilken beteckning har {rätt_atom.namn}?"
-        elif egenskap == 'namn':
-            fråga = f"Vilket namn har grundämnet med beteckningen {rätt_atom.beteckning}?"
-        else:
-            fråga = f"Vilen atommassa har {rätt_atom.namn} ({rätt_atom.beteckning})?"
+        """Ställer en fråga med antal_alternativ svarsalternativ där användaren ska välja rätt atomnummer/beteckning/namn/massa.
+        Rättningen sköts av en Träningssession; ogiltig inmatning kostar inget försök."""
+
+        session = self.session_för(egenskap)
+        fråga = session.nästa_fråga()
+        alternativ = fråga.alternativ
 
         print("------------------------------------------")
-        print(fråga)
+        print(fråga.text)
         print("------------------------------------------")
+        print("   ".join(f"{i}. {alt}" for i, alt in enumerate(alternativ, 1)))
 
-        alternativ = [getattr(atom, egenskap) for atom in aktuell_lista]
-        print(f"1. {alternativ[0]}   2. {alternativ[1]}   3. {alternativ[2]}")
-
-        försök = 3
-        for i in range(försök):
-            svar = input("Ange svar (1-3): ")
+        while True:
+            svar = input(f"Ange svar (1-{len(alternativ)}): ")
             try:
                 svar_index = int(svar) - 1
-                if 0 <= svar_index <= 2:
-                    if alternativ[svar_index] == getattr(rätt_atom, egenskap):
-                        print("Rätt Svar")
-                        return True
-                    else:
-                        print(f"Fel Svar.", end=" ")
-                else:
-                    print(f"Ange ett svar mellan 1 och 3.", end=" ")
-            except:
-                print(f"Ange en gltig input.", end=" ")
-            försök_kvar = försök - (i + 1)
-            if försök_kvar > 0:
-                print("Försök igen!")
+            except ValueError:
+                print("Ange en giltig input.")
+                continue
+            if not 0 <= svar_index < len(alternativ):
+                print(f"Ange ett svar mellan 1 och {len(alternativ)}.")
+                continue
+            resultat = session.svara(alternativ[svar_index])
+            if resultat.utfall == RÄTT:
+                print("Rätt Svar")
+                return True
+            if resultat.utfall == FEL:
+                print("Fel Svar. Försök igen!")
             else:
-                print(f"Inga fler försök. Rätt svar är {getattr(rätt_atom, egenskap)}")
-        return False
+                print(f"Fel Svar. Inga fler försök. Rätt svar är {resultat.rätt_svar}")
+                return False
 
 
     def frågor_om_position(self):
         """Ställer en fråga där användaren ska avgöra period och grupp för ett givet grundämne."""
 
-        atomlist = self.system.atomer.copy()
-        atomlist_med_period_grupp = [atom for atom in atomlist if atom.period is not None and atom.grupp is not None]
-        rätt_atom = random.choice(atomlist_med_period_grupp)
-        rätt_period = rätt_atom.period
-        rätt_grupp = rätt_atom.grupp
+        session = self.session_för('position')
+        fråga = session.nästa_fråga()
         print("------------------------------------------")
-        print(f"Vilken period och grupp tillhör {rätt_atom.namn} ({rätt_atom.beteckning})")
+        print(fråga.text)
         print("------------------------------------------")
-        försök = 3
-        for i in range(försök):
+        while True:
             svar_period = input("Ange period: ")
             svar_grupp = input("Ange grupp: ")
-            try:
-                svar_period_num = int(svar_period)
-                svar_grupp_num = int(svar_grupp)
-                if 1 <= svar_period_num <= 7 and 1 <= svar_grupp_num <= 18:
-                    if svar_period_num == rätt_period and svar_grupp_num == rätt_grupp:
-                        print("Rätt Svar")
-                        return True
-                    else:
-                        print(f"Fel Svar.", end=" ")
-                else:
-                    print(f"Ange en period mellan 1 och 7 samt ange en grupp mellan 1 och 18.", end=" ")
-            except:
-                print(f"Ange en gltig input.", end=" ")
-            försök_kvar = försök - (i + 1)
-            if försök_kvar > 0:
-                print("Försök igen!")
+            resultat = session.svara((svar_period, svar_grupp))
+            if resultat.utfall == RÄTT:
+                print("Rätt Svar")
+                return True
+            if resultat.utfall == OGILTIG:
+                print("Ange en period mellan 1 och 7 samt ange en grupp mellan 1 och 18.")
+            elif resultat.utfall == FEL:
+                print("Fel Svar. Försök igen!")
             else:
-                print("Inga fler försök. Rätt svar är:")
+                rätt_period, rätt_grupp = resultat.rätt_svar
+                print("Fel Svar. Inga fler försök. Rätt svar är:")
                 print(f"Period: {rätt_period}")
                 print(f"Grupp: {rätt_grupp}")
-        return False
+                return False
 
 class Meny:
     """Visar huvudmenyn och hanterar användarens val av träningsläge."""
 
-    def __init__(self):
-        self.p_s = PeriodiskaSystemet()
-        self.träning = Träning(self.p_s)
+    def __init__(self, system=None, slump=None, repetition=False, framsteg=None, användare=None,
+                 antal_alternativ=ANTAL_ALTERNATIV, inspelare=None):
+        self.p_s = system if system is not None else PeriodiskaSystemet()
+        self.träning = Träning(self.p_s, slump, repetition, framsteg, användare, antal_alternativ, inspelare)
         
     def visa_huvudmeny(self):
         """Visar huvudmenyn och anropar rätt träningsmetod baserat på användarens val."""
@@ -229,11 +797,150 @@ class Meny:
             except ValueError:
                 print("Ange ett tal!")
 
-def main():
+def tolka_datamängd(text):
+    """Tolkar ett --datamängd-värde 'NAMN=FIL' till (namn, fil). Används som argparse-typ, så
+    fel rapporteras via parser.error."""
+
+    namn, likhetstecken, tabellfil = text.partition('=')
+    namn, tabellfil = namn.strip(), tabellfil.strip()
+    if not likhetstecken or not namn or not tabellfil:
+        raise argparse.ArgumentTypeError(f"ange datamängden som NAMN=FIL, inte {text!r}")
+    if not os.path.isfile(tabellfil):
+        raise argparse.ArgumentTypeError(f"tabellfilen {tabellfil!r} finns inte")
+    return namn, tabellfil
+
+
+def skapa_argumentparser(beskrivning):
+    """Skapar argumentparsern med de flaggor som delas av terminal- och GUI-versionen."""
+
+    parser = argparse.ArgumentParser(description=beskrivning)
+    parser.add_argument('--kompilera', action='store_true',
+                        help="kompilera textfilerna till cachefilen och avsluta")
+    parser.add_argument('--cache', default=CACHEFIL,
+                        help=f"sökväg till den kompilerade cachefilen (standard: {CACHEFIL})")
+    parser.add_argument('--ingen-cache', action='store_true',
+                        help="tolka alltid textfilerna och använd ingen cache")
+    parser.add_argument('--frö', type=int, default=None,
+                        help="frö för slumpgeneratorn så att samma frågor kommer i samma ordning")
+    parser.add_argument('--repetition', action='store_true',
+                        help="välj frågor med spridd repetition i stället för helt slumpmässigt")
+    parser.add_argument('--framsteg', metavar='FIL', default=None,
+                        help=f"spara varje svar i en SQLite-databas, t.ex. {FRAMSTEGSFIL}")
+    parser.add_argument('--användare', default=None,
+                        help="namn som svaren sparas under (standard: inloggad användare)")
+    parser.add_argument('--alternativ', type=int, metavar='N', default=ANTAL_ALTERNATIV,
+                        choices=range(MIN_ALTERNATIV, MAX_ALTERNATIV + 1),
+                        help=f"antal svarsalternativ i flervalsfrågorna, {MIN_ALTERNATIV}-{MAX_ALTERNATIV} "
+                             f"(standard: {ANTAL_ALTERNATIV})")
+    parser.add_argument('--mätvärden', metavar='FIL', default=None,
+                        help="mät antal anrop och latens för de heta vägarna och skriv dem till FIL "
+                             "när programmet avslutas ('-' för standard ut)")
+    parser.add_argument('--mätformat', choices=instrumentering.FORMAT, default='json',
+                        help="format för --mätvärden (standard: json)")
+    parser.add_argument('--spela-in', metavar='FIL', default=None,
+                        help="spela in frö och alla svar till FIL så att sessionerna kan spelas upp "
+                             "med inspelning.py (.gz komprimeras)")
+    parser.add_argument('--datamängd', action='append', type=tolka_datamängd, metavar='NAMN=FIL', default=[],
+                        help="registrera en extra datamängd, en tabellfil kompilerad med tabeller.py "
+                             "(kan anges flera gånger)")
+    return parser
+
+
+def ladda_system(argument):
+    """Skapar PeriodiskaSystemet enligt kommandoradsflaggorna från skapa_argumentparser."""
+
+    if argument.kompilera:
+        system = PeriodiskaSystemet()
+        system.skriv_cache(argument.cache, 'avikt.txt', 'period_group.txt')
+        print(f"Skrev {len(system)} grundämnen till {argument.cache}")
+        return None
+    return PeriodiskaSystemet(cachefil=None if argument.ingen_cache else argument.cache,
+                              datamängder=dict(argument.datamängd))
+
+
+def skapa_slump(argument):
+    """Returnerar en random.Random med fröet från --frö, eller None för den globala slumpen."""
+
+    return None if argument.frö is None else random.Random(argument.frö)
+
+
+def öppna_framsteg(argument):
+    """Öppnar framstegslagret från --framsteg, eller returnerar None om flaggan saknas."""
+
+    return None if argument.framsteg is None else Framstegslager(argument.framsteg)
+
+
+def öppna_inspelning(argument):
+    """Öppnar en Inspelare för --spela-in, eller returnerar None om flaggan saknas.
+    Inspelarens slump sås med --frö, eller med ett slumpat frö som sparas i loggen."""
+
+    if argument.spela_in is None:
+        return None
+    return inspelning.Inspelare(argument.spela_in, argument.frö, argument.repetition, argument.alternativ)
+
+
+def starta_mätvärden(argument):
+    """Aktiverar instrumenteringen om --mätvärden angetts. Anropas innan datan läses in."""
+
+    if argument.mätvärden is not None:
+        instrumentering.aktivera()
+
+
+def skriv_mätvärden(argument):
+    """Skriver mätvärdena enligt --mätvärden och --mätformat, om flaggan angetts."""
+
+    if argument.mätvärden is not None:
+        instrumentering.skriv(argument.mätvärden, argument.mätformat)
+
+
+def rätta_batch(system, argument):
+    """Rättar svarsposterna i --batch och skriver resultaten till --batch-utdata."""
+
+    cachefil = None if argument.ingen_cache else argument.cache
+    with contextlib.ExitStack() as filer:
+        indata = sys.stdin if argument.batch == '-' else filer.enter_context(
+            open(argument.batch, 'r', encoding="utf-8"))
+        utdata = sys.stdout if argument.batch_utdata == '-' else filer.enter_context(
+            open(argument.batch_utdata, 'w', encoding="utf-8"))
+        batch.rätta_ström(system, indata, utdata, argument.alternativ, argument.processer, cachefil)
+
+
+def main(argv=None):
     """Startar programmet genom att skapa en meny och visa den för användaren."""
 
-    meny = Meny()
-    meny.visa_huvudmeny()
+    parser = skapa_argumentparser("Träna på det periodiska systemet i terminalen.")
+    parser.add_argument('--batch', metavar='FIL', default=None,
+                        help="rätta svarsposter (JSON Lines, se batch.py) från FIL ('-' för standard in) "
+                             "i stället för att starta menyn")
+    parser.add_argument('--batch-utdata', metavar='FIL', default='-',
+                        help="fil som resultaten från --batch skrivs till (standard: standard ut)")
+    parser.add_argument('--processer', type=int, metavar='N', default=1,
+                        help="antal processer som rättar --batch parallellt (standard: 1)")
+    argument = parser.parse_args(argv)
+    if argument.processer < 1:
+        parser.error(f"--processer måste vara minst 1, inte {argument.processer}")
+    starta_mätvärden(argument)
+    framsteg = None
+    inspelare = None
+    try:
+        system = ladda_system(argument)
+        if system is None:
+            return
+        if argument.batch is not None:
+            rätta_batch(system, argument)
+            return
+        framsteg = öppna_framsteg(argument)
+        inspelare = öppna_inspelning(argument)
+        slump = inspelare.slump if inspelare is not None else skapa_slump(argument)
+        meny = Meny(system, slump, argument.repetition, framsteg, argument.användare, argument.alternativ,
+                    inspelare)
+        meny.visa_huvudmeny()
+    finally:
+        if framsteg is not None:
+            framsteg.stäng()
+        if inspelare is not None:
+            inspelare.stäng()
+        skriv_mätvärden(argument)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
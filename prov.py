@@ -0,0 +1,276 @@
+"""Generering av utskrivbara prov i många unika varianter, med facit.
+
+Varje variant består av samma sorters frågor som Träning ställer, t.ex. fem om atommassor
+och fem om positioner, och bestäms helt av grundfröet och variantens nummer. Varianterna
+genereras i block i en processpool där varje arbetsprocess läser in sitt eget
+PeriodiskaSystemet från den kompilerade cachefilen, så att bara variantnummer skickas till
+processerna och bara färdig text skickas tillbaka. Texten skrivs till filen block för block
+i variantordning, så minnet växer inte med antalet varianter.
+
+I textformatet hamnar facit för varje variant på en egen sida efter provet, eller med
+--facit i en separat facitfil med en rad per variant, så att de utskrivna proven inte
+innehåller svaren.
+
+Exempel:
+
+    python prov.py --antal 5000 --format csv --utdata prov.csv --frågor massa=5,position=5
+    python prov.py --antal 30 --utdata prov.txt --facit facit.txt
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+from collections import deque
+
+from p_uppgift import PeriodiskaSystemet, CACHEFIL
+from session import (Träningssession, LÄGEN, ANTAL_ALTERNATIV, MIN_ALTERNATIV, MAX_ALTERNATIV)
+
+
+FORMAT = ('csv', 'json', 'text')
+
+# Antal varianter som en arbetsprocess genererar åt gången.
+BLOCKSTORLEK = 200
+
+STANDARDFRÅGOR = 'atomnummer=4,beteckning=4,namn=4,massa=4,position=4'
+
+CSV_KOLUMNER = ('variant', 'fråga_nr', 'läge', 'fråga', 'alternativ', 'svar', 'svar_text')
+
+
+def tolka_sammansättning(text, system=None):
+    """Tolkar 'läge=antal,...' till en tuple med par (läge, antal).
+
+    Varje läge måste finnas i LÄGEN och antal vara ett heltal som är minst 1 och, om system
+    anges, högst antalet möjliga frågor i läget. Ger annars ValueError med en förklaring."""
+
+    sammansättning = []
+    for del_ in text.split(','):
+        läge, likhetstecken, antal = (d.strip() for d in del_.partition('='))
+        if läge not in LÄGEN:
+            raise ValueError(f"Okänt träningsläge {läge!r}, välj bland {', '.join(LÄGEN)}")
+        if not likhetstecken or not antal:
+            raise ValueError(f"Ange antal frågor som {läge}=ANTAL")
+        try:
+            antal = int(antal)
+        except ValueError:
+            raise ValueError(f"Antalet frågor i läget {läge} måste vara ett heltal, inte {antal!r}") from None
+        if antal < 1:
+            raise ValueError(f"Antalet frågor i läget {läge} måste vara minst 1")
+        if system is not None and antal > len(system.frågepool(läge)):
+            raise ValueError(f"Det finns bara {len(system.frågepool(läge))} möjliga frågor i läget {läge}")
+        sammansättning.append((läge, antal))
+    return tuple(sammansättning)
+
+
+def generera_variant(system, frö, nummer, sammansättning, antal_alternativ=ANTAL_ALTERNATIV, salt=0):
+    """Genererar variant nummer och returnerar en lista med frågor som dicts med nycklarna
+    läge, fråga, alternativ och svar. Inget grundämne frågas om två gånger i samma läge.
+
+    svar är alternativets bokstav i flervalslägena och 'period,grupp' i positionsläget.
+    salt ger en annan variant med samma nummer, om två varianter skulle bli likadana."""
+
+    slump = random.Random(f"{frö}:{nummer}:{salt}")
+    frågor = []
+    for läge, antal in sammansättning:
+        if antal > len(system.frågepool(läge)):
+            raise ValueError(f"Det finns bara {len(system.frågepool(läge))} möjliga frågor i läget {läge}")
+        session = Träningssession(system, läge, slump, antal_alternativ=antal_alternativ)
+        använda = set()
+        while len(använda) < antal:
+            fråga = session.nästa_fråga()
+            if session.rätt_index in använda:
+                continue
+            använda.add(session.rätt_index)
+            rätt_svar = session.rätt_svar()
+            if läge == 'position':
+                svar = f"{rätt_svar[0]},{rätt_svar[1]}"
+                svar_text = svar
+            else:
+                svar = chr(ord('A') + fråga.alternativ.index(rätt_svar))
+                svar_text = rätt_svar
+            frågor.append({'läge': läge, 'fråga': fråga.text, 'alternativ': list(fråga.alternativ),
+                           'svar': svar, 'svar_text': svar_text})
+            session.svara(rätt_svar)
+    return frågor
+
+
+def fingeravtryck(frågor):
+    """Kort hash av en variants frågor och alternativ, för att upptäcka dubbletter."""
+
+    return hashlib.blake2b(json.dumps(frågor, ensure_ascii=False).encode(), digest_size=16).digest()
+
+
+def formatera_facit(frågor):
+    """Facit för en variant på en rad, t.ex. '1 B, 2 D, 3 4,17'."""
+
+    return ", ".join(f"{i} {fråga['svar']}" for i, fråga in enumerate(frågor, 1))
+
+
+def formatera(nummer, frågor, format, med_facit=True):
+    """Formaterar en variant som text i format ur FORMAT.
+
+    I textformatet följer facit på en egen sida efter provet om med_facit är sant."""
+
+    if format == 'json':
+        return json.dumps({'variant': nummer, 'frågor': frågor}, ensure_ascii=False)
+    if format == 'csv':
+        utdata = io.StringIO()
+        skrivare = csv.writer(utdata, lineterminator="\n")
+        for fråga_nr, fråga in enumerate(frågor, 1):
+            skrivare.writerow((nummer, fråga_nr, fråga['läge'], fråga['fråga'], " | ".join(fråga['alternativ']),
+                               fråga['svar'], fråga['svar_text']))
+        return utdata.getvalue()
+    rader = [f"Prov, variant {nummer}", ""]
+    for fråga_nr, fråga in enumerate(frågor, 1):
+        rader.append(f"{fråga_nr}. {fråga['fråga']}")
+        if fråga['alternativ']:
+            rader.append("    " + "    ".join(f"{chr(ord('A') + i)}) {alt}"
+                                            for i, alt in enumerate(fråga['alternativ'])))
+        else:
+            rader.append("    Period: ____   Grupp: ____")
+        rader.append("")
+    # Sidbrytning efter provet, så att facit och nästa variant börjar på en ny sida vid utskrift.
+    text = "\n".join(rader) + "\n\f\n"
+    if med_facit:
+        text += f"Facit för variant {nummer}: {formatera_facit(frågor)}\n\f\n"
+    return text
+
+
+def generera_block(system, frö, början, slut, sammansättning, antal_alternativ, format, separat_facit=False):
+    """Genererar varianterna början till slut - 1. Returnerar en lista med (fingeravtryck,
+    formaterad text, facitrad), en per variant; facitraden är None om inte separat_facit."""
+
+    block = []
+    for nummer in range(början, slut):
+        frågor = generera_variant(system, frö, nummer, sammansättning, antal_alternativ)
+        block.append(_formatera_variant(nummer, frågor, format, separat_facit))
+    return block
+
+
+def _formatera_variant(nummer, frågor, format, separat_facit):
+    return (fingeravtryck(frågor), formatera(nummer, frågor, format, med_facit=not separat_facit),
+            f"Variant {nummer}: {formatera_facit(frågor)}\n" if separat_facit else None)
+
+
+# PeriodiskaSystemet i en arbetsprocess, inläst av _starta_arbetare.
+_system = None
+
+
+def _starta_arbetare(cachefil):
+    global _system
+    _system = PeriodiskaSystemet(cachefil=cachefil)
+
+
+def _generera_block(*argument):
+    return generera_block(_system, *argument)
+
+
+def generera_prov(utdata, antal, frö, sammansättning, antal_alternativ=ANTAL_ALTERNATIV, format='text',
+                  processer=None, cachefil=CACHEFIL, system=None, facit=None):
+    """Genererar antal varianter och skriver dem till filobjektet utdata.
+
+    Anges filobjektet facit skrivs facit dit, en rad per variant, i stället för efter varje
+    variant i utdata.
+
+    Högst två block per process är ute samtidigt. Av varje variant sparas bara ett
+    fingeravtryck på 16 byte; skulle två varianter bli identiska genereras den senare om med
+    ett nytt salt. Returnerar antalet omgenererade varianter."""
+
+    if system is None:
+        system = PeriodiskaSystemet(cachefil=cachefil)
+    processer = processer or os.cpu_count() or 1
+    separat_facit = facit is not None
+    sedda = set()
+    omgjorda = 0
+    första = True
+
+    def skriv(block, början):
+        nonlocal första, omgjorda
+        for nummer, (avtryck, text, facitrad) in enumerate(block, början):
+            salt = 0
+            while avtryck in sedda:
+                salt += 1
+                omgjorda += 1
+                frågor = generera_variant(system, frö, nummer, sammansättning, antal_alternativ, salt)
+                avtryck, text, facitrad = _formatera_variant(nummer, frågor, format, separat_facit)
+            sedda.add(avtryck)
+            if format == 'json':
+                text = ("[\n" if första else ",\n") + text
+            första = False
+            utdata.write(text)
+            if facitrad is not None:
+                facit.write(facitrad)
+
+    if format == 'csv':
+        csv.writer(utdata, lineterminator="\n").writerow(CSV_KOLUMNER)
+    block = ((början, min(början + BLOCKSTORLEK, antal)) for början in range(0, antal, BLOCKSTORLEK))
+    if processer <= 1:
+        for början, slut in block:
+            skriv(generera_block(system, frö, början, slut, sammansättning, antal_alternativ, format,
+                                 separat_facit), början)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processer, initializer=_starta_arbetare,
+                                                    initargs=(cachefil,)) as pool:
+            pågående = deque()
+            for början, slut in block:
+                pågående.append((början, pool.submit(_generera_block, frö, början, slut, sammansättning,
+                                                     antal_alternativ, format, separat_facit)))
+                if len(pågående) >= 2 * processer:
+                    början, framtid = pågående.popleft()
+                    skriv(framtid.result(), början)
+            while pågående:
+                början, framtid = pågående.popleft()
+                skriv(framtid.result(), början)
+    if format == 'json':
+        utdata.write("[]\n" if första else "\n]\n")
+    return omgjorda
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generera utskrivbara prov i unika varianter med facit.")
+    parser.add_argument('--antal', type=int, default=100, help="antal varianter (standard: 100)")
+    parser.add_argument('--frö', default='0', help="grundfrö; samma frö ger samma varianter (standard: 0)")
+    parser.add_argument('--frågor', default=STANDARDFRÅGOR,
+                        help=f"frågor per variant som läge=antal,... (standard: {STANDARDFRÅGOR})")
+    parser.add_argument('--alternativ', type=int, metavar='N', default=ANTAL_ALTERNATIV,
+                        choices=range(MIN_ALTERNATIV, MAX_ALTERNATIV + 1),
+                        help=f"antal svarsalternativ i flervalsfrågorna (standard: {ANTAL_ALTERNATIV})")
+    parser.add_argument('--format', choices=FORMAT, default='text')
+    parser.add_argument('--utdata', metavar='FIL', default='-', help="fil att skriva till ('-' för standard ut)")
+    parser.add_argument('--facit', metavar='FIL', default=None,
+                        help="skriv facit till en egen fil, en rad per variant, i stället för efter varje prov")
+    parser.add_argument('--processer', type=int, metavar='N', default=None,
+                        help="antal arbetsprocesser (standard: en per kärna)")
+    parser.add_argument('--cache', default=CACHEFIL,
+                        help=f"kompilerad cachefil som arbetsprocesserna läser (standard: {CACHEFIL})")
+    argument = parser.parse_args(argv)
+    system = PeriodiskaSystemet(cachefil=argument.cache)
+    try:
+        sammansättning = tolka_sammansättning(argument.frågor, system)
+    except ValueError as fel:
+        parser.error(str(fel))
+
+    if argument.utdata == '-':
+        utdata = sys.stdout
+    else:
+        utdata = open(argument.utdata, 'w', encoding="utf-8", newline="")
+    facit = open(argument.facit, 'w', encoding="utf-8") if argument.facit else None
+    try:
+        omgjorda = generera_prov(utdata, argument.antal, argument.frö, sammansättning, argument.alternativ,
+                                 argument.format, argument.processer, argument.cache, system, facit)
+    finally:
+        if utdata is not sys.stdout:
+            utdata.close()
+        if facit is not None:
+            facit.close()
+    if omgjorda:
+        print(f"{omgjorda} varianter genererades om för att undvika dubbletter", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Spridd repetition (Leitner-lådor) som urvalsstrategi för Träningssession.
+
+Varje grundämne ligger i en låda; rätt svar på första försöket flyttar det en låda upp och
+ger längre tid till nästa gång, annars börjar det om i första lådan. Tiden räknas i antal
+besvarade frågor. Förfallotiderna hålls i en heap så att både val av nästa grundämne och
+omschemaläggning tar O(log n), och ett schema per användare och läge är litet nog att
+hålla tusentals samtidigt."""
+
+import heapq
+import random
+from array import array
+
+
+# Antal besvarade frågor tills ett grundämne i respektive låda kommer tillbaka.
+INTERVALL = (2, 5, 12, 30, 70, 150)
+
+
+class Repetitionsschema:
+    """Leitner-schema över en uppsättning atomindex.
+
+    Parametrar:
+        index: Atomindex (rader i PeriodiskaSystemet) som ska tränas.
+        slump: Slumpgenerator för startordningen; standard är modulen random.
+        intervall: Antal frågor till nästa repetition för varje låda.
+    """
+
+    __slots__ = ('_kö', '_låda', '_steg', '_löpnummer', '_aktuell', 'intervall')
+
+    def __init__(self, index, slump=None, intervall=INTERVALL):
+        index = list(index)
+        (slump if slump is not None else random).shuffle(index)
+        self._kö = [(0, löpnummer, i) for löpnummer, i in enumerate(index)]
+        self._löpnummer = len(index)
+        self._låda = array('b', bytes(max(index, default=-1) + 1))
+        self._steg = 0
+        self._aktuell = None
+        self.intervall = intervall
+
+    def __len__(self):
+        return len(self._kö) + (self._aktuell is not None)
+
+    def välj(self):
+        """Tar ut det grundämne som förfaller först och returnerar dess atomindex.
+        Är inget förfallet ännu tas det som förfaller närmast."""
+
+        if self._aktuell is not None:
+            self._lägg_tillbaka(self._aktuell, self._steg)
+        förfaller, löpnummer, i = heapq.heappop(self._kö)
+        self._aktuell = i
+        return i
+
+    def registrera(self, rätt):
+        """Registrerar utfallet för det senast valda grundämnet och schemalägger det igen."""
+
+        i = self._aktuell
+        if i is None:
+            return
+        self._aktuell = None
+        self._steg += 1
+        låda = min(self._låda[i] + 1, len(self.intervall) - 1) if rätt else 0
+        self._låda[i] = låda
+        self._lägg_tillbaka(i, self._steg + self.intervall[låda])
+
+    def låda(self, i):
+        """Lådan som atomindex i ligger i (0 = nytt eller senast fel)."""
+
+        return self._låda[i]
+
+    def _lägg_tillbaka(self, i, förfaller):
+        heapq.heappush(self._kö, (förfaller, self._löpnummer, i))
+        self._löpnummer += 1
+
+
+def skapa_schema(system, läge, slump=None):
+    """Skapar ett Repetitionsschema över de grundämnen som kan frågas om i läge."""
+
+    return Repetitionsschema(system.frågepool(läge), slump)
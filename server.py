@@ -0,0 +1,177 @@
+"""Frågeserver för många elever samtidigt, med asyncio på en enda kärna.
+
+Servern lyssnar på en lokal TCP-port och pratar JSON Lines: en förfrågan per rad och ett
+svar per rad, i samma ordning. Alla anslutningar delar ett PeriodiskaSystemet; varje
+anslutning har en Träningssession per läge som skapas när läget används första gången, så
+en anslutning kostar bara några hundra byte utöver själva socketen. Förfrågningarna är:
+
+    {"kommando": "lägen"}                                   -> {"lägen": [...]}
+    {"kommando": "fråga", "läge": "namn"}                   -> {"fråga": "...", "alternativ": [...]}
+    {"kommando": "svara", "läge": "namn", "svar": "Järn"}   -> {"utfall": "rätt", "försök_kvar": 3,
+                                                                "rätt_svar": "Järn"}
+    {"kommando": "tillstånd", "läge": "namn"}               -> Träningssession.tillstånd()
+    {"kommando": "sök", "term": "Fe"}                       -> {"atom": {...}} eller {"atom": null}
+
+I positionsläget är svar "period,grupp" eller [period, grupp], och fråga ger {"fråga": null}
+när alla grundämnen är besvarade. Har förfrågan ett "id" skickas det tillbaka i svaret. En
+felaktig förfrågan ger {"fel": "..."} och anslutningen fortsätter; en för lång rad stänger
+den. Lasttestet i lasttest.py mäter servern.
+
+    python server.py --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from p_uppgift import PeriodiskaSystemet, CACHEFIL
+from session import Träningssession, LÄGEN, ANTAL_ALTERNATIV, MIN_ALTERNATIV, MAX_ALTERNATIV
+
+
+VÄRD = '127.0.0.1'
+PORT = 8765
+
+# Längsta tillåtna förfrågan i byte.
+MAX_RAD = 4096
+
+# Hur många anslutningar som får vänta på att tas emot.
+KÖLÄNGD = 4096
+
+
+def höj_filgräns():
+    """Höjer processens gräns för antalet öppna filer till det högsta tillåtna, så att
+    tusentals anslutningar ryms. Gör inget där modulen resource saknas (Windows)."""
+
+    if resource is None:
+        return
+    mjuk, hård = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hård == resource.RLIM_INFINITY or hård > mjuk:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hård, hård))
+        except (ValueError, OSError):
+            pass
+
+
+class Frågeserver:
+    """Hanterar anslutningarna mot ett delat PeriodiskaSystemet.
+
+    All logik körs i händelseloopen utan trådar och utan blockerande anrop, så servern tål
+    tusentals samtidiga anslutningar på en kärna. slump delas av alla sessioner."""
+
+    def __init__(self, system, antal_alternativ=ANTAL_ALTERNATIV, slump=None):
+        self.system = system
+        self.antal_alternativ = antal_alternativ
+        self.slump = slump if slump is not None else random.Random()
+        self.anslutningar = 0
+        self.förfrågningar = 0
+        self._dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    def behandla(self, sessioner, förfrågan):
+        """Besvarar en avkodad förfrågan; sessioner är anslutningens dict läge -> Träningssession."""
+
+        kommando = förfrågan['kommando']
+        if kommando == 'lägen':
+            return {'lägen': list(LÄGEN)}
+        if kommando == 'sök':
+            atom = self.system.hitta_atom(str(förfrågan['term']))
+            if atom is None:
+                return {'atom': None}
+            return {'atom': {'beteckning': atom.beteckning, 'namn': atom.namn, 'atomnummer': atom.atomnummer,
+                             'massa': atom.massa, 'period': atom.period, 'grupp': atom.grupp}}
+        if kommando not in ('fråga', 'svara', 'tillstånd'):
+            raise ValueError(f"Okänt kommando: {kommando!r}")
+        läge = förfrågan['läge']
+        session = sessioner.get(läge)
+        if session is None or (kommando == 'fråga' and session.klar):
+            session = Träningssession(self.system, läge, self.slump, antal_alternativ=self.antal_alternativ)
+            sessioner[läge] = session
+        if kommando == 'fråga':
+            fråga = session.nästa_fråga()
+            if fråga is None:
+                return {'fråga': None}
+            return {'fråga': fråga.text, 'alternativ': list(fråga.alternativ)}
+        if kommando == 'svara':
+            resultat = session.svara(förfrågan['svar'])
+            return {'utfall': resultat.utfall, 'försök_kvar': resultat.försök_kvar,
+                    'rätt_svar': resultat.rätt_svar}
+        return session.tillstånd()
+
+    async def hantera(self, läsare, skrivare):
+        """Läser förfrågningar från en anslutning rad för rad och skriver svaren."""
+
+        self.anslutningar += 1
+        sessioner = {}
+        loads = json.loads
+        try:
+            while True:
+                try:
+                    rad = await läsare.readline()
+                except ValueError:
+                    skrivare.write(self._dumps({'fel': "för lång rad"}).encode() + b"\n")
+                    break
+                if not rad:
+                    break
+                if not rad.strip():
+                    continue
+                self.förfrågningar += 1
+                id = None
+                try:
+                    förfrågan = loads(rad)
+                    if not isinstance(förfrågan, dict):
+                        raise ValueError("Förfrågan måste vara ett JSON-objekt")
+                    id = förfrågan.get('id')
+                    svar = self.behandla(sessioner, förfrågan)
+                except (ValueError, KeyError, TypeError) as fel:
+                    svar = {'fel': str(fel)}
+                if id is not None:
+                    svar['id'] = id
+                skrivare.write(self._dumps(svar).encode() + b"\n")
+                await skrivare.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.anslutningar -= 1
+            skrivare.close()
+
+    async def kör(self, värd=VÄRD, port=PORT, startad=None):
+        """Startar servern och kör tills den avbryts. startad(server) anropas när den lyssnar."""
+
+        server = await asyncio.start_server(self.hantera, värd, port, limit=MAX_RAD, backlog=KÖLÄNGD)
+        if startad is not None:
+            startad(server)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Starta en frågeserver (JSON Lines över TCP) för många elever.")
+    parser.add_argument('--värd', default=VÄRD, help=f"adress att lyssna på (standard: {VÄRD})")
+    parser.add_argument('--port', type=int, default=PORT, help=f"port att lyssna på (standard: {PORT})")
+    parser.add_argument('--alternativ', type=int, metavar='N', default=ANTAL_ALTERNATIV,
+                        choices=range(MIN_ALTERNATIV, MAX_ALTERNATIV + 1),
+                        help=f"antal svarsalternativ i flervalsfrågorna (standard: {ANTAL_ALTERNATIV})")
+    parser.add_argument('--cache', default=CACHEFIL,
+                        help=f"kompilerad cachefil för grundämnena (standard: {CACHEFIL})")
+    argument = parser.parse_args(argv)
+
+    höj_filgräns()
+    frågeserver = Frågeserver(PeriodiskaSystemet(cachefil=argument.cache), argument.alternativ)
+
+    def startad(server):
+        adresser = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+        print(f"Lyssnar på {adresser}", flush=True)
+
+    try:
+        asyncio.run(frågeserver.kör(argument.värd, argument.port, startad))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
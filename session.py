@@ -0,0 +1,465 @@
+"""Huvudlös motor för träningssessioner, fristående från input() och tkinter.
+
+En Träningssession håller allt som hör till en användares pågående träning i ett läge och
+läser bara från ett delat PeriodiskaSystemet, så en process kan ha väldigt många sessioner
+samtidigt. Träning i p_uppgift.py och GUI.py är tunna skal ovanpå motorn."""
+
+import json
+import os
+import random
+import sys
+import time
+from array import array
+from collections import namedtuple
+
+import instrumentering
+
+
+LÄGEN = ('atomnummer', 'beteckning', 'namn', 'massa', 'position')
+
+FRÅGETEXTER = {
+    'atomnummer': "Vilket atomnummer har {namn} ({beteckning})?",
+    'beteckning': "Vilken beteckning har {namn}?",
+    'namn': "Vilket namn har grundämnet med beteckningen {beteckning}?",
+    'massa': "Vilken atommassa har {namn} ({beteckning})?",
+    'position': "Vilken period och grupp tillhör {namn} ({beteckning})?",
+}
+
+# Antal svarsalternativ i flervalslägena: standard och tillåtet intervall.
+ANTAL_ALTERNATIV = 3
+MIN_ALTERNATIV = 2
+MAX_ALTERNATIV = 8
+
+# Utfall från Träningssession.svara.
+RÄTT = 'rätt'
+FEL = 'fel'
+SLUT = 'slut'
+OGILTIG = 'ogiltig'
+
+Fråga = namedtuple('Fråga', ['text', 'alternativ'])
+Fråga.__doc__ = """En fråga: frågetext och svarsalternativ som text (tom tuple i positionsläget)."""
+
+Svar = namedtuple('Svar', ['utfall', 'försök_kvar', 'rätt_svar'])
+Svar.__doc__ = """Resultatet av ett svar. rätt_svar fylls bara i när utfallet är RÄTT eller SLUT;
+i positionsläget är det en tuple (period, grupp)."""
+
+Sammanfattning = namedtuple('Sammanfattning', ['antal', 'rätt', 'per_minut', 'p50_ms', 'p95_ms'])
+Sammanfattning.__doc__ = """Sammanfattning av en tidsbegränsad omgång: antal svar och rätta svar, svar
+per minut och median (p50) respektive 95:e percentilen (p95) av reaktionstiden i millisekunder."""
+
+
+def tolka_position(svar):
+    """Tolkar ett positionssvar, antingen texten 'period,grupp' eller ett par (period, grupp).
+    Returnerar (period, grupp) som heltal eller None om svaret inte är en giltig position."""
+
+    delar = svar.split(',') if isinstance(svar, str) else svar
+    try:
+        period, grupp = map(int, delar)
+    except (TypeError, ValueError):
+        return None
+    if not (1 <= period <= 7 and 1 <= grupp <= 18):
+        return None
+    return period, grupp
+
+
+class Kortlek:
+    """Blandad kortlek med atomindex som dras utan återläggning.
+
+    Alla kort ligger i en array där de första len(self) är kvar i leken och resten är dragna.
+    dra() byter plats på ett slumpvis valt kort och det sista kortet som är kvar och
+    returnerar det; ta_bort() flyttar sedan gränsen ett steg så att kortet räknas som draget.
+    Båda tar O(1) och inget kort behöver sökas upp eller flyttas efter det.
+
+    Parametrar:
+        index: Alla atomindex som ingår i leken.
+        slump: Objekt med randrange (t.ex. random.Random); standard är modulen random.
+        dragna: Atomindex ur index som redan är dragna, t.ex. från en sparad träning.
+    """
+
+    __slots__ = ('kort', 'kvar', 'slump')
+
+    def __init__(self, index, slump=None, dragna=()):
+        dragna = list(dragna)
+        redan_dragna = set(dragna)
+        self.kort = array('i', (i for i in index if i not in redan_dragna))
+        self.kvar = len(self.kort)
+        self.kort.extend(reversed(dragna))
+        self.slump = slump if slump is not None else random
+
+    def __len__(self):
+        return self.kvar
+
+    def dra(self):
+        """Väljer ett slumpvis kort bland de som är kvar och returnerar det. Kortet ligger kvar
+        i leken tills ta_bort() anropas, så ett nytt dra() kan välja om det."""
+
+        sista = self.kvar - 1
+        j = self.slump.randrange(self.kvar)
+        kort = self.kort
+        kort[j], kort[sista] = kort[sista], kort[j]
+        return kort[sista]
+
+    def lägg_överst(self, i):
+        """Flyttar atomindex i, som måste vara kvar i leken, dit dra() lägger det dragna kortet,
+        som om det just hade dragits. Ger ValueError om i inte är kvar i leken."""
+
+        plats = self.kort.index(i, 0, self.kvar)
+        sista = self.kvar - 1
+        self.kort[plats], self.kort[sista] = self.kort[sista], i
+
+    def ta_bort(self):
+        """Tar bort det senast dragna kortet ur leken."""
+
+        self.kvar -= 1
+
+    def kopia(self):
+        """En oberoende kopia av leken i samma ordning och med samma slump."""
+
+        kopia = Kortlek((), self.slump)
+        kopia.kort = self.kort[:]
+        kopia.kvar = self.kvar
+        return kopia
+
+    def dragna(self):
+        """De kort som har tagits bort ur leken, i den ordning de togs bort."""
+
+        return self.kort[:self.kvar - 1:-1] if self.kvar else self.kort[::-1]
+
+
+class Träningssession:
+    """En användares träning i ett av lägena i LÄGEN.
+
+    Anropa nästa_fråga() för att få en ny Fråga och svara(x) en eller flera gånger tills
+    utfallet är RÄTT eller SLUT. I positionsläget dras varje grundämne med känd position
+    en gång ur en Kortlek; när alla är besvarade returnerar nästa_fråga() None och klar blir
+    True. Framstegen i positionsläget kan sparas med spara() och återupptas med återställ().
+
+    Parametrar:
+        system: Delat PeriodiskaSystemet som bara läses.
+        läge: Ett av LÄGEN.
+        slump: Objekt med sample/choice/randrange (t.ex. random.Random); standard är modulen random.
+        max_försök: Antal försök per fråga.
+        antal_alternativ: Antal svarsalternativ i flervalslägena (MIN_ALTERNATIV-MAX_ALTERNATIV).
+            De felaktiga alternativen väljs med PeriodiskaSystemet.distraktorer så att de
+            liknar rätt svar.
+        schema: Valfritt Repetitionsschema (se repetition.py) som väljer vilket grundämne
+            som frågas om. Positionsläget tar då aldrig slut.
+        lyssnare: Valfri funktion som anropas med (session, rätt, försök, latens) när en
+            fråga är färdigbesvarad; latens är sekunder sedan frågan drogs.
+    """
+
+    __slots__ = ('system', 'läge', 'slump', 'max_försök', 'antal_alternativ', 'schema', 'lyssnare',
+                 'försök_kvar', 'rätt_index', 'alternativ', 'återstående', 'besvarad', 'frågetid',
+                 'antal_rätt', 'antal_fel')
+
+    def __init__(self, system, läge, slump=None, max_försök=3, antal_alternativ=ANTAL_ALTERNATIV, schema=None,
+                 lyssnare=None):
+        if läge not in LÄGEN:
+            raise ValueError(f"Okänt träningsläge: {läge!r}")
+        if not MIN_ALTERNATIV <= antal_alternativ <= MAX_ALTERNATIV:
+            raise ValueError(f"antal_alternativ måste vara mellan {MIN_ALTERNATIV} och {MAX_ALTERNATIV}")
+        self.system = system
+        self.läge = läge
+        self.slump = slump if slump is not None else random
+        self.max_försök = max_försök
+        self.antal_alternativ = antal_alternativ
+        self.schema = schema
+        self.lyssnare = lyssnare
+        self.frågetid = 0.0
+        self.försök_kvar = max_försök
+        self.rätt_index = None
+        self.alternativ = ()
+        self.besvarad = True
+        self.antal_rätt = 0
+        self.antal_fel = 0
+        self.återstående = None
+        if läge == 'position' and schema is None:
+            self.återstående = Kortlek(system.frågepool('position'), self.slump)
+
+    @property
+    def atom(self):
+        """Atom-objektet som den aktuella (eller senast besvarade) frågan gäller, eller None."""
+
+        return None if self.rätt_index is None else self.system.atomer[self.rätt_index]
+
+    @property
+    def klar(self):
+        """True när positionsläget har gått igenom alla grundämnen."""
+
+        return self.återstående is not None and not self.återstående
+
+    def nästa_fråga(self):
+        """Drar nästa fråga och returnerar den som Fråga, eller None om positionsläget är klart."""
+
+        self.försök_kvar = self.max_försök
+        if self.läge == 'position':
+            if self.schema is not None:
+                self.rätt_index = self.schema.välj()
+            elif not self.återstående:
+                self.rätt_index = None
+                self.besvarad = True
+                return None
+            else:
+                self.rätt_index = self.återstående.dra()
+        else:
+            if self.schema is None:
+                self.rätt_index = self.slump.choice(self.system.frågepool(self.läge))
+            else:
+                self.rätt_index = self.schema.välj()
+            index = self.system.distraktorer(self.läge, self.rätt_index, self.antal_alternativ - 1, self.slump)
+            index.insert(self.slump.randrange(self.antal_alternativ), self.rätt_index)
+            texter = self.system.svarstexter(self.läge)
+            self.alternativ = tuple(texter[i] for i in index)
+        self.besvarad = False
+        self.frågetid = time.perf_counter()
+        return Fråga(self.frågetext(), self.alternativ)
+
+    def ställ_fråga(self, rätt_index, alternativ=()):
+        """Ställer en bestämd fråga i stället för att dra en, t.ex. när en tidigare dragen fråga
+        ska rättas igen. rätt_index är atomens index och alternativ svarstexterna (tomt i
+        positionsläget). Returnerar frågan som Fråga, precis som nästa_fråga()."""
+
+        if self.återstående is not None:
+            self.återstående.lägg_överst(rätt_index)
+        self.försök_kvar = self.max_försök
+        self.rätt_index = rätt_index
+        self.alternativ = tuple(alternativ)
+        self.besvarad = False
+        self.frågetid = time.perf_counter()
+        return Fråga(self.frågetext(), self.alternativ)
+
+    def frågetext(self):
+        """Frågetexten för den aktuella frågan."""
+
+        atom = self.atom
+        return FRÅGETEXTER[self.läge].format(namn=atom.namn, beteckning=atom.beteckning)
+
+    def rätt_svar(self):
+        """Rätt svar på den aktuella frågan: text i flervalslägena, (period, grupp) i positionsläget."""
+
+        atom = self.atom
+        if self.läge == 'position':
+            return atom.period, atom.grupp
+        return self.system.svarstexter(self.läge)[self.rätt_index]
+
+    def svara(self, svar):
+        """Rättar ett svar på den aktuella frågan och returnerar ett Svar.
+
+        I flervalslägena är svar texten för ett av alternativen, i positionsläget 'period,grupp'
+        eller (period, grupp). Ett ogiltigt svar, eller ett svar när ingen fråga är aktiv,
+        ger utfallet OGILTIG och kostar inget försök."""
+
+        if self.besvarad:
+            return Svar(OGILTIG, self.försök_kvar, None)
+        if self.läge == 'position':
+            svar = tolka_position(svar)
+            if svar is None:
+                return Svar(OGILTIG, self.försök_kvar, None)
+        rätt_svar = self.rätt_svar()
+        if svar == rätt_svar:
+            self.antal_rätt += 1
+            self._avsluta_fråga(self.försök_kvar == self.max_försök)
+            return Svar(RÄTT, self.försök_kvar, rätt_svar)
+        self.försök_kvar -= 1
+        if self.försök_kvar > 0:
+            return Svar(FEL, self.försök_kvar, None)
+        self.antal_fel += 1
+        self._avsluta_fråga(False)
+        return Svar(SLUT, 0, rätt_svar)
+
+    def _avsluta_fråga(self, direkt_rätt):
+        self.besvarad = True
+        if self.återstående is not None:
+            self.återstående.ta_bort()
+        if self.schema is not None:
+            self.schema.registrera(direkt_rätt)
+        if self.lyssnare is not None:
+            rätt = self.försök_kvar > 0
+            försök = self.max_försök - self.försök_kvar + rätt
+            self.lyssnare(self, rätt, försök, time.perf_counter() - self.frågetid)
+
+    def spara(self, filnamn):
+        """Sparar positionslägets framsteg (besvarade grundämnen och poäng) i en liten JSON-fil,
+        så att träningen kan återupptas med återställ(). Grundämnena sparas som atomnummer."""
+
+        if self.återstående is None:
+            raise ValueError("Bara positionsläget utan repetitionsschema kan sparas")
+        atomnummer = self.system.kolumn('atomnummer')
+        data = {
+            'läge': self.läge,
+            'besvarade': [atomnummer[i] for i in self.återstående.dragna()],
+            'antal_rätt': self.antal_rätt,
+            'antal_fel': self.antal_fel,
+        }
+        tillfällig = f"{filnamn}.{os.getpid()}.tmp"
+        with open(tillfällig, 'w', encoding="utf-8") as fil:
+            json.dump(data, fil, ensure_ascii=False)
+        os.replace(tillfällig, filnamn)
+
+    def återställ(self, filnamn):
+        """Läser in framsteg som sparats med spara() och fortsätter därifrån.
+        Returnerar False, utan att ändra något, om filen saknas, är trasig eller gäller ett
+        annat läge."""
+
+        if self.återstående is None:
+            return False
+        try:
+            with open(filnamn, 'r', encoding="utf-8") as fil:
+                data = json.load(fil)
+            if data['läge'] != self.läge:
+                return False
+            rad = {nummer: i for i, nummer in enumerate(self.system.kolumn('atomnummer'))}
+            pool = self.system.frågepool(self.läge)
+            i_pool = set(pool)
+            besvarade = [rad[nummer] for nummer in data['besvarade'] if rad.get(nummer) in i_pool]
+            antal_rätt, antal_fel = int(data['antal_rätt']), int(data['antal_fel'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        self.återuppta(besvarade, antal_rätt, antal_fel)
+        return True
+
+    def återuppta(self, besvarade, antal_rätt, antal_fel):
+        """Fortsätter positionsläget med atomindexen i besvarade redan klara, som återställ()
+        gör efter att ha läst filen. Indexen måste ingå i frågepoolen."""
+
+        self.återstående = Kortlek(self.system.frågepool(self.läge), self.slump, besvarade)
+        self.antal_rätt = antal_rätt
+        self.antal_fel = antal_fel
+        self.rätt_index = None
+        self.besvarad = True
+
+    def besvarade(self):
+        """Atom-objekten som positionsläget är klart med, i den ordning de besvarades."""
+
+        if self.återstående is None:
+            return []
+        return [self.system.atomer[i] for i in self.återstående.dragna()]
+
+    def tillstånd(self):
+        """Returnerar sessionens tillstånd som en dict, t.ex. för att visa eller skicka vidare."""
+
+        return {
+            'läge': self.läge,
+            'fråga': None if self.rätt_index is None else self.frågetext(),
+            'alternativ': list(self.alternativ),
+            'försök_kvar': self.försök_kvar,
+            'besvarad': self.besvarad,
+            'antal_rätt': self.antal_rätt,
+            'antal_fel': self.antal_fel,
+            'återstående': None if self.återstående is None else len(self.återstående),
+            'klar': self.klar,
+        }
+
+
+instrumentering.mätpunkt(Träningssession, 'nästa_fråga', 'svara')
+
+
+def percentil(värden, andel):
+    """Returnerar percentilen andel (0-1) av de redan sorterade värdena."""
+
+    if not värden:
+        return 0
+    return värden[min(len(värden) - 1, int(andel * len(värden)))]
+
+
+class Reaktionstider:
+    """Reaktionstiderna för svaren i en tidsbegränsad omgång, i nanosekunder från
+    time.perf_counter_ns. Tiderna lagras i en array så att även långa omgångar tar lite minne."""
+
+    __slots__ = ('tider', 'antal_rätt')
+
+    def __init__(self):
+        self.tider = array('q')
+        self.antal_rätt = 0
+
+    def __len__(self):
+        return len(self.tider)
+
+    def registrera(self, tid_ns, rätt):
+        """Lägger till reaktionstiden för ett svar."""
+
+        self.tider.append(tid_ns)
+        self.antal_rätt += rätt
+
+    def sammanfattning(self, varaktighet_ns):
+        """Sammanfattar omgången, som pågick i varaktighet_ns nanosekunder, som en Sammanfattning."""
+
+        tider = sorted(self.tider)
+        minuter = varaktighet_ns / 60e9
+        return Sammanfattning(len(tider), self.antal_rätt, len(tider) / minuter if minuter > 0 else 0.0,
+                              percentil(tider, 0.50) / 1e6, percentil(tider, 0.95) / 1e6)
+
+
+class Frågebatch:
+    """Ett antal förgenererade frågor i ett läge, lagrade som indexarrayer.
+
+    rätt_index[i] är atomen som fråga i gäller. I flervalslägena ligger alternativens
+    atomindex för fråga i i alternativ_index[i * antal_alternativ:(i + 1) * antal_alternativ].
+    Frågetexter och alternativ byggs först när en fråga hämtas med batch[i]."""
+
+    __slots__ = ('system', 'läge', 'antal_alternativ', 'alternativ_index', 'rätt_index')
+
+    def __init__(self, system, läge, antal_alternativ, alternativ_index, rätt_index):
+        self.system = system
+        self.läge = läge
+        self.antal_alternativ = antal_alternativ
+        self.alternativ_index = alternativ_index
+        self.rätt_index = rätt_index
+
+    def __len__(self):
+        return len(self.rätt_index)
+
+    def __getitem__(self, i):
+        atom = self.system.atomer[self.rätt_index[i]]
+        text = FRÅGETEXTER[self.läge].format(namn=atom.namn, beteckning=atom.beteckning)
+        if self.läge == 'position':
+            return Fråga(text, ())
+        texter = self.system.svarstexter(self.läge)
+        k = self.antal_alternativ
+        return Fråga(text, tuple(texter[j] for j in self.alternativ_index[i * k:(i + 1) * k]))
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def rätt_svar(self, i):
+        """Rätt svar på fråga i, i samma form som Träningssession.rätt_svar."""
+
+        atom = self.system.atomer[self.rätt_index[i]]
+        if self.läge == 'position':
+            return atom.period, atom.grupp
+        return self.system.svarstexter(self.läge)[self.rätt_index[i]]
+
+
+def generera_frågor(system, läge, antal, frö=None, antal_alternativ=ANTAL_ALTERNATIV):
+    """Genererar antal frågor i läge på en gång och returnerar en Frågebatch.
+
+    Alla slumptal dras i ett svep ur en egen random.Random(frö), så samma frö ger alltid
+    exakt samma frågeström och den globala random-modulen påverkas inte. I flervalslägena
+    har varje fråga antal_alternativ (MIN_ALTERNATIV-MAX_ALTERNATIV) alternativ med olika
+    svarstext; i positionsläget dras atomer med känd position med återläggning."""
+
+    if läge not in LÄGEN:
+        raise ValueError(f"Okänt träningsläge: {läge!r}")
+    slump = random.Random(frö)
+    if läge == 'position':
+        rätt_index = array('i', slump.choices(system.frågepool('position'), k=antal))
+        return Frågebatch(system, läge, 0, array('i'), rätt_index)
+
+    k = antal_alternativ
+    if not MIN_ALTERNATIV <= k <= MAX_ALTERNATIV:
+        raise ValueError(f"antal_alternativ måste vara mellan {MIN_ALTERNATIV} och {MAX_ALTERNATIV}")
+    texter = system.svarstexter(läge)
+    n = len(texter)
+    if len(set(texter)) < k:
+        raise ValueError(f"Det finns bara {len(set(texter))} olika svar i läget {läge}")
+    alternativ_index = array('i', slump.choices(range(n), k=antal * k))
+    for start in range(0, antal * k, k):
+        # Två atomer kan ha samma svarstext (t.ex. samma massa), så dubbletter jämförs på texten.
+        while len({texter[j] for j in alternativ_index[start:start + k]}) < k:
+            alternativ_index[start:start + k] = array('i', slump.sample(range(n), k))
+    rätt_position = slump.choices(range(k), k=antal)
+    rätt_index = array('i', (alternativ_index[i * k + p] for i, p in enumerate(rätt_position)))
+    return Frågebatch(system, läge, k, alternativ_index, rätt_index)
+
+
+instrumentering.mätpunkt(sys.modules[__name__], 'generera_frågor')
@@ -0,0 +1,234 @@
+"""Skrivskyddade tabeller i ett kompakt binärformat som minnesmappas, t.ex. extra datamängder
+som grundämnesnamn på andra språk eller en isotoptabell med tusentals nuklider.
+
+En tabellfil har ett huvud, en katalog med en post per kolumn och sedan kolumnerna efter
+varandra. Numeriska kolumner lagras som arrayer och läses som memoryview direkt över filen;
+textkolumner lagras som en array med startpositioner följd av all text i UTF-8 och avkodas
+först när ett värde läses. Inget kopieras alltså in i processen, så många processer på samma
+dator delar samma sidor i operativsystemets cache och fler arbetsprocesser tar inte mer minne
+för datan.
+
+Om tabellen har en nyckelkolumn är raderna sorterade efter den, och alla rader med ett visst
+nyckelvärde hittas med binärsökning (Tabell.rader).
+
+Kompilera en CSV-fil med rubrikrad till en tabellfil:
+
+    python tabeller.py isotoper.csv isotoper.tab --typ atomnummer:i --typ massa:d --nyckel atomnummer
+"""
+
+import argparse
+import bisect
+import csv
+import mmap
+import os
+import struct
+import zlib
+from array import array
+
+
+_MAGI = b'PTAB'
+_VERSION = 1
+# Huvud: magiskt värde, version, antal rader, antal kolumner, nyckelkolumn och crc32 över datan.
+_HUVUD = struct.Struct('<4sHII32sI')
+# Katalogpost per kolumn: namn, typ, position och längd i byte.
+_KATALOGPOST = struct.Struct('<32scxxxxxxxQQ')
+
+# Längsta kolumnnamn i byte (UTF-8), så långt som katalogposten och huvudet rymmer.
+MAX_NAMNLÄNGD = 32
+
+# Typkoder: array-typer för tal och 's' för text.
+TYPER = ('b', 'i', 'q', 'd', 's')
+
+
+def _justera(position):
+    return (position + 7) // 8 * 8
+
+
+class Textkolumn:
+    """Sekvens med texter över en startpositionsarray och ett UTF-8-block i en tabellfil."""
+
+    __slots__ = ('_positioner', '_data')
+
+    def __init__(self, positioner, data):
+        self._positioner = positioner
+        self._data = data
+
+    def __len__(self):
+        return len(self._positioner) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("tabellindex utanför intervallet")
+        return str(self._data[self._positioner[i]:self._positioner[i + 1]], "utf-8")
+
+
+class Tabell:
+    """En minnesmappad tabellfil skriven av skriv_tabell.
+
+    kolumner mappar kolumnnamn till en memoryview (tal) eller Textkolumn (text), alla med
+    len(tabell) värden. Ger ValueError om filen inte är en giltig tabellfil."""
+
+    def __init__(self, filnamn):
+        with open(filnamn, 'rb') as fil:
+            self._karta = mmap.mmap(fil.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magi, version, antal, antal_kolumner, nyckel, crc = _HUVUD.unpack_from(self._karta)
+            katalog = []
+            for k in range(antal_kolumner):
+                namn, typ, position, längd = _KATALOGPOST.unpack_from(self._karta,
+                                                                      _HUVUD.size + k * _KATALOGPOST.size)
+                katalog.append((namn.rstrip(b"\0").decode("utf-8"), typ.decode("ascii"), position, längd))
+            nyckel = nyckel.rstrip(b"\0").decode("utf-8") or None
+            början = _justera(_HUVUD.size + antal_kolumner * _KATALOGPOST.size)
+            with memoryview(self._karta) as vy:
+                giltig = (magi == _MAGI and version == _VERSION
+                          and all(typ in TYPER and position + längd <= len(vy)
+                                  for _, typ, position, längd in katalog)
+                          and zlib.crc32(vy[början:]) == crc)
+        except (struct.error, UnicodeDecodeError):
+            giltig = False
+        if not giltig:
+            self._karta.close()
+            raise ValueError(f"{filnamn} är ingen giltig tabellfil")
+
+        vy = memoryview(self._karta)
+        self.antal = antal
+        self.nyckel = nyckel
+        self.kolumner = {}
+        for namn, typ, position, längd in katalog:
+            if typ == 's':
+                positioner = vy[position:position + 4 * (antal + 1)].cast('I')
+                kolumn = Textkolumn(positioner, vy[position + 4 * (antal + 1):position + längd])
+            else:
+                kolumn = vy[position:position + längd].cast(typ)
+            self.kolumner[namn] = kolumn
+
+    def __len__(self):
+        return self.antal
+
+    def kolumn(self, namn):
+        """Hela kolumnen namn som en sekvens."""
+
+        return self.kolumner[namn]
+
+    def rad(self, i):
+        """Rad i som en dict kolumnnamn -> värde."""
+
+        return {namn: kolumn[i] for namn, kolumn in self.kolumner.items()}
+
+    def rader(self, värde):
+        """range med index för alla rader där nyckelkolumnen är värde, hittade med binärsökning."""
+
+        if self.nyckel is None:
+            raise ValueError("Tabellen har ingen nyckelkolumn")
+        nycklar = self.kolumner[self.nyckel]
+        return range(bisect.bisect_left(nycklar, värde), bisect.bisect_right(nycklar, värde))
+
+
+def skriv_tabell(filnamn, kolumner, nyckel=None):
+    """Skriver en tabellfil. kolumner mappar kolumnnamn till (typ, värden) med typ ur TYPER
+    och lika många värden i varje kolumn. Anges nyckel sorteras raderna efter den kolumnen.
+    Filen skrivs först till en temporär fil och byts sedan in atomärt. Ger ValueError om ett
+    kolumnnamn är längre än MAX_NAMNLÄNGD byte eller nyckel inte är en av kolumnerna."""
+
+    for namn in kolumner:
+        if len(namn.encode("utf-8")) > MAX_NAMNLÄNGD:
+            raise ValueError(f"Kolumnnamnet {namn!r} är längre än {MAX_NAMNLÄNGD} byte")
+    if nyckel is not None and nyckel not in kolumner:
+        raise ValueError(f"Nyckelkolumnen {nyckel!r} finns inte bland kolumnerna {', '.join(kolumner)}")
+    längder = {len(värden) for typ, värden in kolumner.values()}
+    if len(längder) > 1:
+        raise ValueError("Alla kolumner måste ha lika många värden")
+    antal = längder.pop() if längder else 0
+    ordning = range(antal)
+    if nyckel is not None:
+        nyckelvärden = kolumner[nyckel][1]
+        ordning = sorted(ordning, key=nyckelvärden.__getitem__)
+
+    block = []
+    for namn, (typ, värden) in kolumner.items():
+        if typ not in TYPER:
+            raise ValueError(f"Okänd kolumntyp {typ!r} för {namn}")
+        if typ == 's':
+            texter = [str(värden[i]).encode("utf-8") for i in ordning]
+            positioner = array('I', [0])
+            for text in texter:
+                positioner.append(positioner[-1] + len(text))
+            data = positioner.tobytes() + b"".join(texter)
+        else:
+            data = array(typ, (värden[i] for i in ordning)).tobytes()
+        block.append((namn, typ, data))
+
+    position = _justera(_HUVUD.size + len(block) * _KATALOGPOST.size)
+    katalog = []
+    data = bytearray()
+    for namn, typ, innehåll in block:
+        utfyllnad = _justera(len(data)) - len(data)
+        data += b"\0" * utfyllnad
+        katalog.append(_KATALOGPOST.pack(namn.encode("utf-8"), typ.encode("ascii"), position + len(data),
+                                         len(innehåll)))
+        data += innehåll
+    huvud = _HUVUD.pack(_MAGI, _VERSION, antal, len(block), (nyckel or "").encode("utf-8"), zlib.crc32(data))
+    tillfällig = f"{filnamn}.{os.getpid()}.tmp"
+    with open(tillfällig, 'wb') as fil:
+        fil.write((huvud + b"".join(katalog)).ljust(position, b"\0"))
+        fil.write(data)
+    os.replace(tillfällig, filnamn)
+
+
+def kompilera_csv(källfil, målfil, typer=None, nyckel=None, avgränsare=','):
+    """Kompilerar en CSV-fil med rubrikrad till en tabellfil. typer mappar kolumnnamn till en
+    typ ur TYPER; övriga kolumner blir text. Returnerar antalet rader."""
+
+    typer = typer or {}
+    with open(källfil, 'r', encoding="utf-8", newline="") as fil:
+        läsare = csv.reader(fil, delimiter=avgränsare)
+        rubriker = next(läsare)
+        värden = [[] for _ in rubriker]
+        for radnummer, rad in enumerate(läsare, 2):
+            if not rad:
+                continue
+            if len(rad) != len(rubriker):
+                raise ValueError(f"{källfil}:{radnummer}: fel antal kolumner")
+            for kolumn, värde in zip(värden, rad):
+                kolumn.append(värde)
+    kolumner = {}
+    for namn, kolumn in zip(rubriker, värden):
+        typ = typer.get(namn, 's')
+        if typ == 'd':
+            kolumn = [float(v.replace(",", ".")) for v in kolumn]
+        elif typ != 's':
+            kolumn = [int(v) for v in kolumn]
+        kolumner[namn] = (typ, kolumn)
+    skriv_tabell(målfil, kolumner, nyckel)
+    return len(värden[0]) if värden else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kompilera en CSV-fil till en minnesmappad tabellfil.")
+    parser.add_argument('källfil')
+    parser.add_argument('målfil')
+    parser.add_argument('--typ', action='append', default=[], metavar='KOLUMN:TYP',
+                        help=f"typ för en kolumn, en av {', '.join(TYPER)} (standard: s, text)")
+    parser.add_argument('--nyckel', default=None, help="kolumn som raderna sorteras och söks efter")
+    parser.add_argument('--avgränsare', default=',')
+    argument = parser.parse_args(argv)
+    typer = {}
+    for text in argument.typ:
+        namn, _, typ = text.rpartition(':')
+        if typ not in TYPER or not namn:
+            parser.error(f"ogiltig --typ {text!r}")
+        typer[namn] = typ
+    try:
+        antal = kompilera_csv(argument.källfil, argument.målfil, typer, argument.nyckel, argument.avgränsare)
+    except (OSError, ValueError) as fel:
+        parser.error(str(fel))
+    print(f"Skrev {antal} rader till {argument.målfil}")
+
+
+if __name__ == '__main__':
+    main()
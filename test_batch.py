@@ -0,0 +1,76 @@
+"""Tester för rättningen av svarsposter i batch.py. Körs med pytest från projektkatalogen."""
+
+import io
+import json
+import random
+
+import pytest
+
+from batch import Rättare, rätta_rader, rätta_ström
+from p_uppgift import PeriodiskaSystemet
+from session import Träningssession
+
+
+@pytest.fixture(scope='module')
+def system():
+    return PeriodiskaSystemet()
+
+
+def _första_fråga(system, läge, frö):
+    session = Träningssession(system, läge, random.Random(frö))
+    fråga = session.nästa_fråga()
+    return session, fråga
+
+
+def test_rättar_mot_samma_fråga_som_en_ny_session(system):
+    rättare = Rättare(system)
+    for frö in range(20):
+        session, fråga = _första_fråga(system, 'namn', frö)
+        rätt_nummer = fråga.alternativ.index(session.rätt_svar()) + 1
+        fel_nummer = [n for n in range(1, len(fråga.alternativ) + 1) if n != rätt_nummer]
+        resultat = rättare.rätta({'elev': 'a', 'läge': 'namn', 'frö': frö,
+                                  'svar': fel_nummer[:1] + [rätt_nummer]})
+        assert (resultat['utfall'], resultat['försök']) == ('rätt', 2)
+        assert resultat['atomnummer'] == session.atom.atomnummer
+        resultat = rättare.rätta({'läge': 'namn', 'frö': frö, 'svar': fel_nummer * 2})
+        assert (resultat['utfall'], resultat['försök']) == ('fel', 3)
+
+
+def test_positionsläget_och_ogiltiga_svar(system):
+    session, _ = _första_fråga(system, 'position', 7)
+    period, grupp = session.rätt_svar()
+    rättare = Rättare(system)
+    resultat = rättare.rätta({'läge': 'position', 'frö': 7, 'svar': ["x", [0, 0], f"{period},{grupp}"]})
+    assert (resultat['utfall'], resultat['försök']) == ('rätt', 1)
+    assert rättare.rätta({'läge': 'position', 'frö': 7, 'svar': []})['utfall'] == 'obesvarad'
+    assert rättare.rätta({'läge': 'massa', 'frö': 7, 'svar': [0, 99, True, "a"]})['försök'] == 0
+
+
+def test_ensamt_svar_räknas_som_ett_försök(system):
+    session, fråga = _första_fråga(system, 'beteckning', 3)
+    rätt_nummer = fråga.alternativ.index(session.rätt_svar()) + 1
+    rättare = Rättare(system)
+    for svar in (rätt_nummer, str(rätt_nummer)):
+        resultat = rättare.rätta({'läge': 'beteckning', 'frö': 3, 'svar': svar})
+        assert (resultat['utfall'], resultat['försök']) == ('rätt', 1)
+    assert rättare.rätta({'läge': 'beteckning', 'frö': 3, 'svar': "12"})['försök'] == 0
+
+
+def test_rader_som_inte_går_att_rätta_ger_fel_med_radnummer(system):
+    rader = ['{"läge": "namn", "frö": 1, "svar": [1]}', "", "inte json", '{"läge": "namn"}', '[1, 2]']
+    utdata = [json.loads(rad) for rad in rätta_rader(Rättare(system), rader)]
+    assert 'utfall' in utdata[0]
+    assert [rad.get('rad') for rad in utdata[1:]] == [3, 4, 5]
+    assert all('fel' in rad for rad in utdata[1:])
+
+
+def test_flera_processer_ger_samma_utdata_i_samma_ordning(system, monkeypatch):
+    monkeypatch.setattr('batch.BLOCKSTORLEK', 7)
+    slump = random.Random(1)
+    rader = "".join(json.dumps({'elev': str(n), 'läge': slump.choice(('namn', 'massa', 'position')),
+                                'frö': slump.randrange(30), 'svar': [slump.randint(1, 3), "2,3"]}) + "\n"
+                    for n in range(60))
+    ett, flera = io.StringIO(), io.StringIO()
+    assert rätta_ström(system, io.StringIO(rader), ett) == 60
+    assert rätta_ström(system, io.StringIO(rader), flera, processer=2) == 60
+    assert flera.getvalue() == ett.getvalue()
@@ -0,0 +1,91 @@
+"""Tester för inspelning och uppspelning i inspelning.py. Körs med pytest från projektkatalogen."""
+
+import json
+
+import pytest
+
+from inspelning import Inspelare, läs_logg, spela_upp, main
+from p_uppgift import PeriodiskaSystemet
+from repetition import skapa_schema
+from session import Träningssession, RÄTT, SLUT
+
+
+@pytest.fixture(scope='module')
+def system():
+    return PeriodiskaSystemet()
+
+
+def _spela_in(system, filnamn, repetition=False, positionsfil=None):
+    """Spelar in några sessioner som Träning skulle skapa dem och returnerar antalet svar."""
+
+    inspelare = Inspelare(filnamn, frö=11, repetition=repetition)
+    slump = inspelare.slump
+    scheman = {}
+    antal_svar = 0
+    for läge in ('namn', 'massa', 'position', 'namn'):
+        schema = None
+        if repetition:
+            schema = scheman.get(läge) or scheman.setdefault(läge, skapa_schema(system, läge, slump))
+        session = inspelare.spela_in(Träningssession(system, läge, slump, schema=schema))
+        if positionsfil and läge == 'position':
+            assert session.återställ(positionsfil)
+        for n in range(15):
+            if session.nästa_fråga() is None:
+                break
+            svar = session.rätt_svar() if n % 3 else ((1, 1) if läge == 'position' else "fel")
+            while session.svara(svar).utfall not in (RÄTT, SLUT):
+                antal_svar += 1
+            antal_svar += 1
+    inspelare.stäng()
+    return antal_svar
+
+
+@pytest.mark.parametrize('filnamn', ('logg.jsonl', 'logg.jsonl.gz'))
+@pytest.mark.parametrize('repetition', (False, True))
+def test_uppspelning_ger_samma_frågor_och_utfall(system, tmp_path, filnamn, repetition):
+    filnamn = str(tmp_path / filnamn)
+    antal_svar = _spela_in(system, filnamn, repetition)
+    huvud, händelser = läs_logg(filnamn)
+    assert huvud['frö'] == 11 and huvud['repetition'] == repetition
+    resultat = spela_upp(system, huvud, händelser)
+    assert resultat.avvikelser == []
+    assert (resultat.sessioner, resultat.svar) == (4, antal_svar)
+
+
+def test_uppspelning_med_återställd_positionsfil(system, tmp_path):
+    positionsfil = str(tmp_path / 'position.json')
+    session = Träningssession(system, 'position')
+    for _ in range(30):
+        session.nästa_fråga()
+        session.svara(session.rätt_svar())
+    session.spara(positionsfil)
+    filnamn = str(tmp_path / 'logg.jsonl')
+    _spela_in(system, filnamn, positionsfil=positionsfil)
+    huvud, händelser = läs_logg(filnamn)
+    assert any(händelse[0] == "å" for händelse in händelser)
+    assert spela_upp(system, huvud, händelser).avvikelser == []
+
+
+def test_ändrad_logg_ger_avvikelser(system, tmp_path):
+    filnamn = str(tmp_path / 'logg.jsonl')
+    _spela_in(system, filnamn)
+    huvud, händelser = läs_logg(filnamn)
+    nummer = next(n for n, händelse in enumerate(händelser) if händelse[0] == "a")
+    händelser[nummer][3] = "ändrat"
+    avvikelser = spela_upp(system, huvud, händelser).avvikelser
+    assert avvikelser[0].händelse == nummer and avvikelser[0].väntat == "ändrat"
+
+
+def test_läs_logg_avvisar_annat_än_inspelningar(tmp_path):
+    for innehåll in ("", "inte json\n", json.dumps({'format': 'annat', 'version': 1}) + "\n"):
+        filnamn = tmp_path / 'fel.jsonl'
+        filnamn.write_text(innehåll, encoding="utf-8")
+        with pytest.raises(ValueError):
+            läs_logg(str(filnamn))
+
+
+@pytest.mark.parametrize('upprepningar', ('0', '-3', 'x'))
+def test_main_avvisar_upprepningar_under_ett(tmp_path, upprepningar):
+    with pytest.raises(SystemExit) as avslut:
+        main([str(tmp_path / 'logg.jsonl'), '--upprepningar', upprepningar])
+    assert avslut.value.code == 2
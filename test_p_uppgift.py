@@ -0,0 +1,154 @@
+"""Tester för PeriodiskaSystemet i p_uppgift.py. Körs med pytest från projektkatalogen."""
+
+import os
+import random
+import shutil
+
+import pytest
+
+from p_uppgift import PeriodiskaSystemet, Inläsningsfel, läs_atomposter
+from session import LÄGEN, MAX_ALTERNATIV
+
+KATALOG = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def källfiler(tmp_path):
+    """Kopior av datafilerna i en tillfällig katalog, så att testerna kan ändra dem."""
+
+    filer = []
+    for namn in ('avikt.txt', 'period_group.txt'):
+        shutil.copy(os.path.join(KATALOG, namn), tmp_path / namn)
+        filer.append(str(tmp_path / namn))
+    return filer
+
+
+def _kolumner(system):
+    return {egenskap: list(kolumn) for egenskap, kolumn in system.kolumner.items()}
+
+
+def test_cache_ger_samma_data_som_textfilerna(källfiler, tmp_path):
+    cachefil = str(tmp_path / 'cache.bin')
+    från_text = PeriodiskaSystemet(*källfiler, cachefil=cachefil)
+    assert os.path.isfile(cachefil)
+    assert not hasattr(från_text, '_cache_karta')
+    från_cache = PeriodiskaSystemet(*källfiler, cachefil=cachefil)
+    assert hasattr(från_cache, '_cache_karta')
+    assert _kolumner(från_cache) == _kolumner(från_text)
+    assert från_cache.atomer[5].namn == från_text.atomer[5].namn
+
+
+def test_cache_ogiltigförklaras_när_källfilen_ändras(källfiler, tmp_path):
+    cachefil = str(tmp_path / 'cache.bin')
+    PeriodiskaSystemet(*källfiler, cachefil=cachefil)
+    with open(källfiler[0], 'r', encoding="utf-8", newline="") as fil:
+        text = fil.read()
+    with open(källfiler[0], 'w', encoding="utf-8", newline="") as fil:
+        fil.write(text.replace("Aktinium", "Aktinium2", 1))
+    system = PeriodiskaSystemet(*källfiler, cachefil=cachefil)
+    assert not hasattr(system, '_cache_karta')
+    assert "Aktinium2" in system.kolumn('namn')
+    assert "Aktinium2" in PeriodiskaSystemet(*källfiler, cachefil=cachefil).kolumn('namn')
+
+
+@pytest.mark.parametrize('position', (0, 4, -1))
+def test_trasig_cache_läses_om_från_textfilerna(källfiler, tmp_path, position):
+    cachefil = str(tmp_path / 'cache.bin')
+    väntat = _kolumner(PeriodiskaSystemet(*källfiler, cachefil=cachefil))
+    with open(cachefil, 'r+b') as fil:
+        fil.seek(position, os.SEEK_END if position < 0 else os.SEEK_SET)
+        byte = fil.read(1)
+        fil.seek(-1, os.SEEK_CUR)
+        fil.write(bytes([byte[0] ^ 0xFF]))
+    system = PeriodiskaSystemet(*källfiler, cachefil=cachefil)
+    assert not hasattr(system, '_cache_karta')
+    assert _kolumner(system) == väntat
+
+
+def test_läs_in_cache_avvisar_filer_som_inte_är_cachefiler(källfiler, tmp_path):
+    system = PeriodiskaSystemet(*källfiler)
+    skräp = tmp_path / 'skräp.bin'
+    skräp.write_bytes(b"inte en cache" * 10)
+    assert system.läs_in_cache(str(skräp), *källfiler) is False
+    assert system.läs_in_cache(str(tmp_path / 'saknas.bin'), *källfiler) is False
+
+
+def _skriv(katalog, namn, rader):
+    filnamn = katalog / namn
+    filnamn.write_text("".join(rad + "\n" for rad in rader), encoding="utf-8")
+    return str(filnamn)
+
+
+def test_läs_atomposter_parar_ihop_raderna_efter_position(tmp_path):
+    huvud = _skriv(tmp_path, 'a.txt', ["H\tVäte\t1\t1,008", "Uue\tUnunennium\t119\t315"])
+    extra = _skriv(tmp_path, 'p.txt', ["1\t1", "\t"])
+    assert list(läs_atomposter(huvud, extra)) == [("H", "Väte", 1, 1.008, 1, 1),
+                                                   ("Uue", "Ununennium", 119, 315.0, None, None)]
+
+
+def test_läs_atomposter_kopplar_ihop_på_nyckel(tmp_path):
+    huvud = _skriv(tmp_path, 'a.txt', ["Fe\tJärn\t26\t55,845", "H\tVäte\t1\t1,008"])
+    extra = _skriv(tmp_path, 'p.txt', ["1 1 1", "Fe 4 8"])
+    assert [post[4:] for post in läs_atomposter(huvud, extra)] == [(4, 8), (1, 1)]
+
+
+@pytest.mark.parametrize('huvudrader, extrarader, radnummer, orsak', [
+    (["H\tVäte\t1"], ["1\t1"], 1, "förväntade beteckning"),
+    (["H\tVäte\tett\t1,008"], ["1\t1"], 1, "inte ett tal"),
+    (["H\tVäte\t1\t1,008", "He\tHelium\t2\t4,0026"], ["1\t1", "1\t19"], 2, "utanför tabellen"),
+    (["H\tVäte\t1\t1,008"], ["1\tx"], 1, "heltal"),
+    (["H\tVäte\t1\t1,008", "He\tHelium\t2\t4,0026"], ["1\t1"], 2, "kortare än"),
+    (["H\tVäte\t1\t1,008"], ["H 1 1", "H 1 2"], 2, "finns redan"),
+])
+def test_läs_atomposter_rapporterar_felaktiga_rader(tmp_path, huvudrader, extrarader, radnummer, orsak):
+    huvud = _skriv(tmp_path, 'a.txt', huvudrader)
+    extra = _skriv(tmp_path, 'p.txt', extrarader)
+    with pytest.raises(Inläsningsfel) as fel:
+        list(läs_atomposter(huvud, extra))
+    assert fel.value.radnummer == radnummer
+    assert orsak in fel.value.orsak
+
+
+def test_läs_atomposter_hoppar_över_fel_med_felhantering(tmp_path):
+    huvud = _skriv(tmp_path, 'a.txt', ["H\tVäte\t1\t1,008", "X\tTrasig", "He\tHelium\t2\t4,0026"])
+    extra = _skriv(tmp_path, 'p.txt', ["1\t1", "1\t2", "1\t18"])
+    fel = []
+    poster = list(läs_atomposter(huvud, extra, fel.append))
+    assert [post[0] for post in poster] == ["H", "He"]
+    assert [(f.filnamn, f.radnummer) for f in fel] == [(huvud, 2)]
+
+
+@pytest.fixture(scope='module')
+def system():
+    return PeriodiskaSystemet()
+
+
+@pytest.mark.parametrize('läge', [läge for läge in LÄGEN if läge != 'position'])
+def test_distraktorer_har_olika_texter_skilda_från_rätt_svar(system, läge):
+    texter = system.svarstexter(läge)
+    slump = random.Random(2)
+    for antal in range(1, MAX_ALTERNATIV):
+        for i in range(len(system)):
+            valda = system.distraktorer(läge, i, antal, slump)
+            assert len(valda) == antal
+            valda_texter = {texter[j] for j in valda}
+            assert len(valda_texter) == antal and texter[i] not in valda_texter
+
+
+@pytest.mark.parametrize('läge', ('massa', 'atomnummer'))
+def test_distraktorer_tas_bland_grannarna_i_sorteringsordningen(system, läge):
+    ordning = sorted(range(len(system)), key=system.kolumn(läge).__getitem__)
+    rang = {i: plats for plats, i in enumerate(ordning)}
+    slump = random.Random(3)
+    for i in range(len(system)):
+        valda = system.distraktorer(läge, i, 3, slump)
+        assert all(abs(rang[j] - rang[i]) <= 3 for j in valda)
+
+
+def test_distraktorer_för_namn_tas_helst_ur_samma_grupp_eller_period(system):
+    perioder, grupper = system.kolumn('period'), system.kolumn('grupp')
+    slump = random.Random(4)
+    i = system.hitta_atom('Ne').index
+    for _ in range(100):
+        for j in system.distraktorer('namn', i, 3, slump):
+            assert perioder[j] == perioder[i] or grupper[j] == grupper[i]
@@ -0,0 +1,67 @@
+"""Tester för provgenereringen i prov.py. Körs med pytest från projektkatalogen."""
+
+import io
+import json
+
+import pytest
+
+from p_uppgift import PeriodiskaSystemet
+from prov import generera_variant, generera_prov, tolka_sammansättning
+
+
+@pytest.fixture(scope='module')
+def system():
+    return PeriodiskaSystemet()
+
+
+SAMMANSÄTTNING = (('massa', 3), ('namn', 2), ('position', 2))
+
+
+def test_varianten_bestäms_av_frö_och_nummer(system):
+    variant = generera_variant(system, 'a', 5, SAMMANSÄTTNING)
+    assert generera_variant(system, 'a', 5, SAMMANSÄTTNING) == variant
+    assert generera_variant(system, 'a', 6, SAMMANSÄTTNING) != variant
+    assert generera_variant(system, 'b', 5, SAMMANSÄTTNING) != variant
+    assert generera_variant(system, 'a', 5, SAMMANSÄTTNING, salt=1) != variant
+    assert [fråga['läge'] for fråga in variant] == ['massa'] * 3 + ['namn'] * 2 + ['position'] * 2
+    for läge in ('massa', 'namn', 'position'):
+        frågor = [fråga['fråga'] for fråga in variant if fråga['läge'] == läge]
+        assert len(set(frågor)) == len(frågor)
+
+
+def test_dubbletter_genereras_om(system):
+    utdata = io.StringIO()
+    omgjorda = generera_prov(utdata, 1500, 0, (('namn', 1),), antal_alternativ=2, format='json', processer=1,
+                             system=system)
+    varianter = json.loads(utdata.getvalue())
+    assert len(varianter) == 1500 and omgjorda > 0
+    assert len({json.dumps(variant['frågor']) for variant in varianter}) == 1500
+
+
+def test_samma_prov_med_flera_processer(system):
+    ett, flera = io.StringIO(), io.StringIO()
+    generera_prov(ett, 450, 'x', SAMMANSÄTTNING, format='csv', processer=1, system=system)
+    generera_prov(flera, 450, 'x', SAMMANSÄTTNING, format='csv', processer=2, cachefil=None, system=system)
+    assert flera.getvalue() == ett.getvalue()
+    assert len(ett.getvalue().splitlines()) == 1 + 450 * 7
+
+
+def test_facit_står_inte_på_provsidan(system):
+    utdata = io.StringIO()
+    generera_prov(utdata, 3, 0, SAMMANSÄTTNING, processer=1, system=system)
+    sidor = utdata.getvalue().split("\f")
+    prov, facit = sidor[0::2][:3], sidor[1::2][:3]
+    assert all("Prov, variant" in sida and "Facit" not in sida for sida in prov)
+    assert all(sida.strip().startswith("Facit för variant") for sida in facit)
+
+    utdata, facitfil = io.StringIO(), io.StringIO()
+    generera_prov(utdata, 3, 0, SAMMANSÄTTNING, processer=1, system=system, facit=facitfil)
+    assert "Facit" not in utdata.getvalue()
+    assert facitfil.getvalue().splitlines()[2].startswith("Variant 2: 1 ")
+
+
+def test_tolka_sammansättning(system):
+    assert tolka_sammansättning("massa=2, position=1", system) == (('massa', 2), ('position', 1))
+    for text in ("massa", "massa=", "massa=0", "massa=-1", "massa=x", "okänt=1", "position=1000"):
+        with pytest.raises(ValueError):
+            tolka_sammansättning(text, system)
@@ -0,0 +1,95 @@
+"""Tester för session.py. Körs med pytest från projektkatalogen."""
+
+import random
+
+import pytest
+
+from p_uppgift import PeriodiskaSystemet
+from session import (generera_frågor, Kortlek, Träningssession, LÄGEN, RÄTT, MIN_ALTERNATIV,
+                     MAX_ALTERNATIV)
+
+
+@pytest.fixture(scope='module')
+def system():
+    return PeriodiskaSystemet()
+
+
+@pytest.mark.parametrize('läge', LÄGEN)
+@pytest.mark.parametrize('antal_alternativ', (MIN_ALTERNATIV, 3, MAX_ALTERNATIV))
+def test_generera_frågor_har_olika_alternativ(system, läge, antal_alternativ):
+    batch = generera_frågor(system, läge, 20000, frö=1, antal_alternativ=antal_alternativ)
+    for i, fråga in enumerate(batch):
+        assert len(set(fråga.alternativ)) == len(fråga.alternativ)
+        if läge != 'position':
+            assert len(fråga.alternativ) == antal_alternativ
+            assert batch.rätt_svar(i) in fråga.alternativ
+
+
+@pytest.mark.parametrize('antal_alternativ', (0, 1, MAX_ALTERNATIV + 1))
+def test_generera_frågor_avvisar_fel_antal_alternativ(system, antal_alternativ):
+    with pytest.raises(ValueError):
+        generera_frågor(system, 'namn', 10, frö=1, antal_alternativ=antal_alternativ)
+
+
+def test_kortlek_drar_varje_kort_en_gång():
+    lek = Kortlek(range(50), random.Random(3))
+    dragna = []
+    while lek:
+        dragna.append(lek.dra())
+        lek.ta_bort()
+    assert sorted(dragna) == list(range(50))
+    assert list(lek.dragna()) == dragna
+
+
+def test_kortlek_med_dragna_kort_och_kopia():
+    lek = Kortlek(range(10), random.Random(1), dragna=[4, 7])
+    assert len(lek) == 8
+    assert list(lek.dragna()) == [4, 7]
+    kopia = lek.kopia()
+    kort = lek.dra()
+    lek.ta_bort()
+    assert kort not in (4, 7)
+    assert len(kopia) == 8 and list(kopia.dragna()) == [4, 7]
+    lek.lägg_överst(kopia.dra())
+    with pytest.raises(ValueError):
+        lek.lägg_överst(4)
+
+
+def _besvara(session, antal):
+    for _ in range(antal):
+        session.nästa_fråga()
+        assert session.svara(session.rätt_svar()).utfall == RÄTT
+
+
+def test_spara_och_återställ_positionsläget(system, tmp_path):
+    filnamn = str(tmp_path / 'position.json')
+    session = Träningssession(system, 'position', random.Random(5))
+    _besvara(session, 10)
+    session.nästa_fråga()
+    session.svara((1, 1) if session.rätt_svar() != (1, 1) else (1, 2))
+    session.spara(filnamn)
+
+    ny = Träningssession(system, 'position', random.Random(6))
+    assert ny.återställ(filnamn)
+    assert [atom.atomnummer for atom in ny.besvarade()] == [atom.atomnummer for atom in session.besvarade()]
+    assert (ny.antal_rätt, ny.antal_fel) == (10, 0)
+    assert len(ny.återstående) == len(system.frågepool('position')) - 10
+    frågade = {atom.index for atom in ny.besvarade()}
+    while ny.nästa_fråga() is not None:
+        assert ny.rätt_index not in frågade
+        frågade.add(ny.rätt_index)
+        ny.svara(ny.rätt_svar())
+    assert ny.klar and frågade == set(system.frågepool('position'))
+
+
+def test_återställ_avvisar_saknad_trasig_eller_fel_fil(system, tmp_path):
+    session = Träningssession(system, 'position', random.Random(5))
+    trasig = tmp_path / 'trasig.json'
+    trasig.write_text("{inte json", encoding="utf-8")
+    annat_läge = tmp_path / 'namn.json'
+    annat_läge.write_text('{"läge": "namn", "besvarade": [], "antal_rätt": 0, "antal_fel": 0}', encoding="utf-8")
+    for filnamn in (tmp_path / 'saknas.json', trasig, annat_läge):
+        assert not session.återställ(str(filnamn))
+    assert len(session.återstående) == len(system.frågepool('position'))
+    with pytest.raises(ValueError):
+        Träningssession(system, 'namn').spara(str(tmp_path / 'namn.json'))
@@ -0,0 +1,86 @@
+"""Tester för tabellformatet i tabeller.py. Körs med pytest från projektkatalogen."""
+
+import pytest
+
+from p_uppgift import PeriodiskaSystemet
+from tabeller import Tabell, skriv_tabell, kompilera_csv, main, MAX_NAMNLÄNGD
+
+
+KOLUMNER = {
+    'atomnummer': ('i', [26, 1, 26, 8]),
+    'massa': ('d', [55.93, 1.008, 53.94, 15.99]),
+    'nuklid': ('s', ["Fe-56", "H-1", "Fe-54", "O-16"]),
+}
+
+
+def test_skriv_och_läs_tabell_sorterad_efter_nyckel(tmp_path):
+    filnamn = str(tmp_path / 't.tab')
+    skriv_tabell(filnamn, KOLUMNER, nyckel='atomnummer')
+    tabell = Tabell(filnamn)
+    assert len(tabell) == 4 and tabell.nyckel == 'atomnummer'
+    assert list(tabell.kolumn('atomnummer')) == [1, 8, 26, 26]
+    assert tabell.kolumn('nuklid')[1:] == ["O-16", "Fe-56", "Fe-54"]
+    assert [tabell.rad(i)['nuklid'] for i in tabell.rader(26)] == ["Fe-56", "Fe-54"]
+    assert list(tabell.rader(2)) == []
+
+
+def test_tabell_utan_nyckel_och_tom_tabell(tmp_path):
+    filnamn = str(tmp_path / 't.tab')
+    skriv_tabell(filnamn, {'namn': ('s', ["Järn", "Väte"])})
+    tabell = Tabell(filnamn)
+    assert tabell.rad(0) == {'namn': "Järn"} and tabell.kolumn('namn')[-1] == "Väte"
+    with pytest.raises(ValueError):
+        tabell.rader("Järn")
+    skriv_tabell(filnamn, {})
+    assert len(Tabell(filnamn)) == 0
+
+
+@pytest.mark.parametrize('kolumner, nyckel', [
+    ({'a': ('i', [1, 2]), 'b': ('i', [1])}, None),
+    ({'a': ('x', [1])}, None),
+    ({'x' * (MAX_NAMNLÄNGD + 1): ('i', [1])}, None),
+    ({'å' * (MAX_NAMNLÄNGD // 2 + 1): ('i', [1])}, None),
+    ({'a': ('i', [1])}, 'b'),
+])
+def test_skriv_tabell_avvisar_felaktiga_kolumner(tmp_path, kolumner, nyckel):
+    with pytest.raises(ValueError):
+        skriv_tabell(str(tmp_path / 't.tab'), kolumner, nyckel)
+
+
+@pytest.mark.parametrize('ändring', ('magi', 'data', 'kort'))
+def test_tabell_avvisar_trasiga_filer(tmp_path, ändring):
+    filnamn = tmp_path / 't.tab'
+    skriv_tabell(str(filnamn), KOLUMNER, nyckel='atomnummer')
+    data = bytearray(filnamn.read_bytes())
+    if ändring == 'magi':
+        data[0:4] = b"XXXX"
+    elif ändring == 'data':
+        data[-1] ^= 0xFF
+    else:
+        del data[10:]
+    filnamn.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        Tabell(str(filnamn))
+
+
+def test_kompilera_csv_och_uppslag(tmp_path):
+    källfil = tmp_path / 'isotoper.csv'
+    källfil.write_text("atomnummer,nuklid,massa\n26,Fe-56,\"55,93\"\n1,H-1,1.008\n26,Fe-54,53.94\n",
+                       encoding="utf-8")
+    målfil = str(tmp_path / 'isotoper.tab')
+    assert kompilera_csv(str(källfil), målfil, {'atomnummer': 'i', 'massa': 'd'}, 'atomnummer') == 3
+    system = PeriodiskaSystemet(datamängder={'isotoper': målfil})
+    järn = system.hitta_atom('Fe')
+    assert [rad['nuklid'] for rad in system.uppslag('isotoper', järn)] == ["Fe-56", "Fe-54"]
+    assert system.uppslag('isotoper', system.hitta_atom('He')) == []
+
+
+def test_main_rapporterar_fel_som_användningsfel(tmp_path, capsys):
+    källfil = tmp_path / 'a.csv'
+    källfil.write_text("a,b\n1,x\n", encoding="utf-8")
+    for källa, argument in ((källfil, ['--nyckel', 'c']), (källfil, ['--typ', 'a:z']),
+                            (källfil, ['--typ', 'b:i']), (tmp_path / 'saknas.csv', [])):
+        with pytest.raises(SystemExit) as avslut:
+            main([str(källa), str(tmp_path / 'a.tab'), *argument])
+        assert avslut.value.code == 2
+    assert "error:" in capsys.readouterr().err